@@ -0,0 +1,56 @@
+"""Measure per-request token verification cost with and without the token cache.
+
+    python benchmarks/auth_overhead.py --requests 20000
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret')
+
+from utils.auth import AuthManager  # noqa: E402
+
+
+def measure(manager: AuthManager, tokens: list, requests: int) -> float:
+    """Average microseconds per verify_token call"""
+    started = time.perf_counter()
+    for i in range(requests):
+        manager.verify_token(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=50, help='distinct tokens in rotation')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    os.environ['TOKEN_CACHE_SIZE'] = '0'
+    uncached = AuthManager()
+    os.environ['TOKEN_CACHE_SIZE'] = '4096'
+    cached = AuthManager()
+
+    tokens = [uncached.generate_token(f"user-{i}", f"user-{i}@example.com") for i in range(args.clients)]
+
+    results = {
+        'requests': args.requests,
+        'clients': args.clients,
+        'uncached_us_per_request': round(measure(uncached, tokens, args.requests), 2),
+        'cached_us_per_request': round(measure(cached, tokens, args.requests), 2),
+        'cache_hit_rate': round(cached.cache_stats()['hit_rate'], 4)
+    }
+    results['speedup'] = round(results['uncached_us_per_request'] / results['cached_us_per_request'], 1)
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for key, value in results.items():
+            print(f"{key:26} {value}")
+
+
+if __name__ == '__main__':
+    main()
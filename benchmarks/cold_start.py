@@ -0,0 +1,115 @@
+"""Profile a cold start of the API Lambda: import time per module and time to first response.
+
+Each run starts a fresh interpreter, imports ``lambda_function`` under
+``-X importtime`` and sends one API Gateway event through the Mangum
+handler, so the numbers match what a new Lambda container pays.
+
+    python benchmarks/cold_start.py --runs 5 --path /downloads/abc
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Runs inside the fresh interpreter
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+event = {
+    "version": "2.0",
+    "routeKey": "$default",
+    "rawPath": PATH,
+    "rawQueryString": "",
+    "headers": {"host": "localhost"},
+    "requestContext": {"http": {"method": "GET", "path": PATH, "sourceIp": "127.0.0.1"}, "stage": "$default"},
+    "isBase64Encoded": False
+}
+response = lambda_function.handler(event, None)
+responded = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - started) * 1000,
+    "status_code": response["statusCode"],
+    "yt_dlp_loaded": "yt_dlp" in sys.modules,
+    "boto3_loaded": "boto3" in sys.modules
+}))
+'''
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)')
+
+
+def run_once(path: str) -> dict:
+    env = dict(
+        os.environ,
+        PYTHONPATH=SRC,
+        JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY', 'benchmark-secret'),
+        AWS_DEFAULT_REGION=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+        PYTHONDONTWRITEBYTECODE='1'
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD.replace('PATH', json.dumps(path))],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    # Self import time summed per top-level package
+    modules = defaultdict(int)
+    for match in IMPORT_LINE.finditer(result.stderr):
+        self_us, _, _, name = match.groups()
+        modules[name.split('.')[0]] += int(self_us)
+
+    run = json.loads(result.stdout.strip().splitlines()[-1])
+    run['modules_ms'] = {name: us / 1000 for name, us in modules.items()}
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/downloads/abc', help='route of the first request')
+    parser.add_argument('--top', type=int, default=10, help='number of modules to list')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    runs = [run_once(args.path) for _ in range(args.runs)]
+    modules = defaultdict(list)
+    for run in runs:
+        for name, ms in run['modules_ms'].items():
+            modules[name].append(ms)
+
+    results = {
+        'runs': args.runs,
+        'path': args.path,
+        'status_code': runs[-1]['status_code'],
+        'import_ms_median': round(statistics.median(r['import_ms'] for r in runs), 1),
+        'first_response_ms_median': round(statistics.median(r['first_response_ms'] for r in runs), 1),
+        'yt_dlp_loaded': any(r['yt_dlp_loaded'] for r in runs),
+        'modules_ms_median': {
+            name: round(statistics.median(values), 1)
+            for name, values in sorted(modules.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+        }
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    for key, value in results.items():
+        if key != 'modules_ms_median':
+            print(f"{key:26} {value}")
+    print("slowest imports (ms):")
+    for name, ms in results['modules_ms_median'].items():
+        print(f"  {name:24} {ms}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""In-memory stand-ins for S3 and DynamoDB plus a local video server, for offline benchmarks.
+
+They implement only the calls the service makes, with the same request and
+response shapes as boto3, so the real code paths run unchanged.
+"""
+import io
+import re
+import copy
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from botocore.exceptions import ClientError
+
+MB = 1024 * 1024
+
+
+def _check_types(value):
+    # boto3 refuses floats; catching that here keeps the fakes honest
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, dict):
+        for item in value.values():
+            _check_types(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            _check_types(item)
+
+
+class MemoryS3:
+    """Objects and multipart uploads held in memory"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self._lock = threading.Lock()
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        with self._lock:
+            self.objects[Key] = bytes(Body)
+        return {'ETag': hashlib.md5(Body).hexdigest()}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        return {'Body': io.BytesIO(self.objects[Key]), 'ContentLength': len(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        with self._lock:
+            self.objects[Key] = self.objects[CopySource['Key']]
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        with open(Filename, 'rb') as f:
+            self.put_object(Bucket, Key, f.read())
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = hashlib.sha1(f"{Key}{time.monotonic()}".encode()).hexdigest()
+        with self._lock:
+            self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = len(Body)
+        return {'ETag': f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        with self._lock:
+            parts = self.uploads.pop(UploadId)
+            # Sizes only: benchmarks care about bytes moved, not content
+            self.objects[Key] = b'\0' * sum(parts[p['PartNumber']] for p in MultipartUpload['Parts'])
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def get_paginator(self, operation):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Key, UploadId):
+                parts = fake.uploads.get(UploadId, {})
+                yield {'Parts': [
+                    {'PartNumber': n, 'ETag': f"etag-{n}", 'Size': size}
+                    for n, size in sorted(parts.items())
+                ]}
+
+        return Paginator()
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?expires={ExpiresIn}"
+
+
+class MemoryTable:
+    """One DynamoDB table with the expression subset the service uses"""
+
+    UPDATE_CLAUSE = re.compile(r'\b(SET|ADD|REMOVE)\b')
+    COMPARISONS = {
+        '=': lambda a, b: a == b,
+        '<': lambda a, b: a < b,
+        '>=': lambda a, b: a >= b
+    }
+
+    def __init__(self, name: str, hash_key: str, indexes=None, latency: float = 0.0):
+        self.name = name
+        self.hash_key = hash_key
+        # index name -> (hash key, range key)
+        self.indexes = indexes or {}
+        self.latency = latency
+        self.items = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _io(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _check_condition(self, item, expression, values):
+        """Evaluate ORs of ANDs of attribute_(not_)exists and comparisons; call with the lock held"""
+        if expression is None:
+            return
+
+        def term(text):
+            text = text.strip()
+            function = re.match(r'(attribute_exists|attribute_not_exists)\((\w+)\)$', text)
+            if function:
+                present = item is not None and function.group(2) in item
+                return present if function.group(1) == 'attribute_exists' else not present
+            attribute, operator, value = text.split()
+            if item is None or attribute not in item:
+                return False
+            return self.COMPARISONS[operator](item[attribute], values[value])
+
+        if not any(
+            all(term(part) for part in alternative.split(' AND '))
+            for alternative in expression.split(' OR ')
+        ):
+            raise ClientError(
+                {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+                'ConditionalCheck'
+            )
+
+    def get_item(self, Key, **kwargs):
+        self._io()
+        with self._lock:
+            item = self.items.get(Key[self.hash_key])
+            return {'Item': copy.deepcopy(item)} if item is not None else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None, **kwargs):
+        self._io()
+        _check_types(Item)
+        with self._lock:
+            self._check_condition(self.items.get(Item[self.hash_key]), ConditionExpression, ExpressionAttributeValues)
+            self.items[Item[self.hash_key]] = copy.deepcopy(Item)
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeValues=None,
+                    ReturnValues='NONE', **kwargs):
+        self._io()
+        with self._lock:
+            self._check_condition(self.items.get(Key[self.hash_key]), ConditionExpression, ExpressionAttributeValues)
+            item = self.items.pop(Key[self.hash_key], None)
+        return {'Attributes': item} if item is not None and ReturnValues == 'ALL_OLD' else {}
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, ReturnValues='NONE', ConditionExpression=None, **kwargs):
+        self._io()
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        _check_types(values)
+
+        def name(token):
+            return names.get(token.strip(), token.strip())
+
+        with self._lock:
+            self._check_condition(self.items.get(Key[self.hash_key]), ConditionExpression, values)
+            item = self.items.setdefault(Key[self.hash_key], dict(Key))
+            parts = self.UPDATE_CLAUSE.split(UpdateExpression)
+            for action, body in zip(parts[1::2], parts[2::2]):
+                for clause in filter(None, (c.strip() for c in body.split(','))):
+                    if action == 'SET':
+                        attribute, value = clause.split('=')
+                        item[name(attribute)] = copy.deepcopy(values[value.strip()])
+                    elif action == 'ADD':
+                        attribute, value = clause.split()
+                        if isinstance(values[value], set):
+                            item[name(attribute)] = item.get(name(attribute), set()) | values[value]
+                        else:
+                            item[name(attribute)] = item.get(name(attribute), 0) + values[value]
+                    else:
+                        item.pop(name(clause), None)
+            return {'Attributes': copy.deepcopy(item)} if ReturnValues != 'NONE' else {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, IndexName=None,
+              ScanIndexForward=True, Limit=None, ExclusiveStartKey=None, **kwargs):
+        self._io()
+        hash_key, range_key = self.indexes[IndexName]
+        wanted = next(iter(ExpressionAttributeValues.values()))
+        with self._lock:
+            # Items without the range key are not in the index
+            matches = [
+                item for item in self.items.values()
+                if item.get(hash_key) == wanted and range_key in item
+            ]
+        matches.sort(key=lambda item: (item[range_key], item[self.hash_key]), reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            position = (ExclusiveStartKey[range_key], ExclusiveStartKey[self.hash_key])
+            matches = [
+                item for item in matches
+                if ((item[range_key], item[self.hash_key]) < position) != ScanIndexForward
+                and (item[range_key], item[self.hash_key]) != position
+            ]
+
+        page = matches[:Limit] if Limit else matches
+        response = {'Items': copy.deepcopy(page), 'Count': len(page)}
+        if Limit and len(matches) > Limit:
+            last = page[-1]
+            response['LastEvaluatedKey'] = {
+                self.hash_key: last[self.hash_key],
+                hash_key: last[hash_key],
+                range_key: last[range_key]
+            }
+        return response
+
+    def batch_writer(self):
+        table = self
+
+        class Writer:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def put_item(self, Item):
+                table.put_item(Item=Item)
+
+        return Writer()
+
+
+class MemoryDynamoDB:
+    """Just enough of the boto3 DynamoDB resource for the service tables"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables = {}
+
+    def Table(self, name):
+        if name not in self.tables:
+            indexes = {'user-downloads-index': ('user_id', 'created_at')}
+            self.tables[name] = MemoryTable(name, self._hash_key(name), indexes, self.latency)
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            # One round trip for the whole batch, as with the real call
+            table._io()
+            with table._lock:
+                found = [
+                    copy.deepcopy(table.items[key[table.hash_key]])
+                    for key in request['Keys'] if key[table.hash_key] in table.items
+                ]
+            if 'ProjectionExpression' in request:
+                names = request.get('ExpressionAttributeNames', {})
+                fields = [names.get(f.strip(), f.strip()) for f in request['ProjectionExpression'].split(',')]
+                found = [{f: item[f] for f in fields if f in item} for item in found]
+            responses[name] = found
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def _hash_key(self, name):
+        if 'cache' in name:
+            return 'cache_key'
+        if 'rate' in name:
+            return 'user_id'
+        return 'download_id'
+
+
+def video_bytes(size: int) -> bytes:
+    """Deterministic payload standing in for a video file"""
+    block = hashlib.sha256(str(size).encode()).digest() * (64 * 1024 // 32)
+    return (block * (size // len(block) + 1))[:size]
+
+
+class VideoServer:
+    """Local HTTP server for synthetic videos.
+
+    ``/video-<name>-<size in KB>.mp4`` serves that many bytes with Range
+    support. ``per_connection_bytes`` paces each connection the way
+    YouTube throttles individual streams.
+    """
+
+    PATH = re.compile(r'/video-[\w]+-(\d+)\.mp4$')
+
+    def __init__(self, per_connection_bytes: float = 0):
+        self.per_connection_bytes = per_connection_bytes
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        return False
+
+    def url(self, name: str, size_kb: int) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/video-{name}-{size_kb}.mp4"
+
+    def payload(self, size: int) -> bytes:
+        with self._lock:
+            if size not in self._payloads:
+                self._payloads[size] = video_bytes(size)
+            return self._payloads[size]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                # Clients dropping connections mid-body is expected here
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass
+
+            def do_HEAD(self):
+                self._respond(head=True)
+
+            def do_GET(self):
+                self._respond(head=False)
+
+            def _respond(self, head):
+                match = server.PATH.search(self.path.split('?')[0])
+                if not match:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                payload = server.payload(int(match.group(1)) * 1024)
+
+                start, end = 0, len(payload) - 1
+                header = self.headers.get('Range')
+                if header:
+                    first, _, last = header.replace('bytes=', '').partition('-')
+                    start = int(first)
+                    end = min(int(last) if last else end, len(payload) - 1)
+                    if start >= len(payload):
+                        self.send_response(416)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{len(payload)}")
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                if head:
+                    return
+
+                started = time.monotonic()
+                sent = 0
+                for offset in range(start, end + 1, 256 * 1024):
+                    chunk = payload[offset:min(offset + 256 * 1024, end + 1)]
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    if server.per_connection_bytes:
+                        delay = sent / server.per_connection_bytes - (time.monotonic() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+
+        return Handler
+
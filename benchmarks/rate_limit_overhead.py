@@ -0,0 +1,103 @@
+"""Load-test the rate limiter and report its per-request overhead.
+
+Runs the same FastAPI route with and without the rate limit and quota
+dependencies through an in-process ASGI client. The rate limits table is an
+in-memory stand-in with a simulated round trip, so the numbers include the
+periodic quota syncs.
+
+    python benchmarks/rate_limit_overhead.py --requests 5000 --users 50
+"""
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, Request  # noqa: E402
+
+from utils.rate_limit import QuotaCounter, RateLimiter  # noqa: E402
+
+from fakes import MemoryDynamoDB  # noqa: E402
+
+
+def build_app(limiter: RateLimiter) -> FastAPI:
+    app = FastAPI()
+
+    def current_user(request: Request):
+        return request.headers['x-user'], ['download']
+
+    async def limited_user(user=Depends(current_user)):
+        limiter.check_rate(*user)
+        await limiter.check_quota(*user)
+        return user
+
+    @app.post("/plain")
+    async def plain(user=Depends(current_user)):
+        return {"ok": True}
+
+    @app.post("/limited")
+    async def limited(user=Depends(limited_user)):
+        # Accepted downloads are counted after the check
+        limiter.quota.add(user[0], jobs=1)
+        return {"ok": True}
+
+    return app
+
+
+async def load(app: FastAPI, path: str, requests: int, users: int, concurrency: int) -> float:
+    """Seconds to push ``requests`` through ``path``"""
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                response = await client.post(path, headers={'x-user': f"user-{i % users}"})
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--table-latency-ms', type=float, default=5.0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    # Limits high enough that nothing is refused; this measures cost, not policy
+    os.environ['RATE_LIMIT_TIERS'] = json.dumps({'standard': {
+        'requests_per_second': 1e9, 'burst': 1e9, 'daily_jobs': 10 ** 9, 'daily_bytes': 10 ** 15
+    }})
+    os.environ.setdefault('QUOTA_SYNC_SECONDS', '1')
+    dynamodb = MemoryDynamoDB(args.table_latency_ms / 1000)
+    limiter = RateLimiter(QuotaCounter(dynamodb))
+    app = build_app(limiter)
+
+    plain = asyncio.run(load(app, "/plain", args.requests, args.users, args.concurrency))
+    limited = asyncio.run(load(app, "/limited", args.requests, args.users, args.concurrency))
+
+    results = {
+        'requests': args.requests,
+        'users': args.users,
+        'plain_rps': round(args.requests / plain),
+        'limited_rps': round(args.requests / limited),
+        'overhead_us_per_request': round((limited - plain) / args.requests * 1e6, 1),
+        'quota_syncs': sum(table.calls for table in dynamodb.tables.values())
+    }
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for key, value in results.items():
+            print(f"{key:24} {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Compare response serialization of a page of download records before and after the response layer.
+
+"Before" is what FastAPI does with a returned dict: jsonable_encoder over
+the raw DynamoDB items (Decimals and all), then the stdlib encoder. "After"
+converts the items once, wraps them in DownloadStatus models and renders
+with FastJSONResponse.
+
+    python benchmarks/serialization.py --items 100 --rounds 500
+"""
+import os
+import sys
+import time
+import json
+import argparse
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from utils import responses  # noqa: E402
+from utils.responses import DownloadStatus, from_dynamodb, success  # noqa: E402
+
+
+def record(i: int) -> dict:
+    """A completed download record as boto3 returns it"""
+    return {
+        'download_id': f"00000000-0000-0000-0000-{i:012d}",
+        'user_id': 'bench-user',
+        'video_url': f"https://www.youtube.com/watch?v=video{i:06d}",
+        'status': 'completed',
+        'created_at': '2024-01-01T00:00:00.000000',
+        'completed_at': '2024-01-01T00:01:00.000000',
+        'ttl': Decimal(1704672000 + i),
+        'version': Decimal(7),
+        'format_id': '22',
+        'estimated_time': Decimal(42),
+        's3_key': f"downloads/content/{i:064x}.mp4",
+        'video_info': {
+            'title': f"Benchmark video {i}",
+            'duration': Decimal(212),
+            'uploader': 'Bench Channel',
+            'view_count': Decimal(1234567),
+            'upload_date': '20240101',
+            'thumbnail': f"https://i.ytimg.com/vi/video{i:06d}/maxresdefault.jpg",
+            'formats_available': Decimal(24),
+            'video_id': f"video{i:06d}",
+            'extractor': 'Youtube'
+        },
+        'progress': {
+            'downloaded_bytes': Decimal(52428800),
+            'total_bytes': Decimal(52428800),
+            'percent': Decimal(100),
+            'speed': Decimal(9123456),
+            'eta': Decimal(0),
+            'updated_at': '2024-01-01T00:00:59.000000'
+        },
+        'timings': {'extract_ms': Decimal(850), 'stream_ms': Decimal(5400), 'job_ms': Decimal(6400)},
+        'download_url': f"https://bucket.s3.amazonaws.com/downloads/content/{i:064x}.mp4?X-Amz-Signature=abc"
+    }
+
+
+def before(items: list) -> bytes:
+    content = {
+        "status": "success",
+        "data": {'downloads': items, 'count': len(items), 'has_more': True, 'next_cursor': 'abc'},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def after(items: list) -> bytes:
+    downloads = [DownloadStatus.from_item(item) for item in from_dynamodb(items)]
+    return success({'downloads': downloads, 'count': len(items), 'has_more': True, 'next_cursor': 'abc'}).body
+
+
+def measure(render, items: list, rounds: int) -> float:
+    """Average microseconds per rendered page"""
+    render(items)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(items)
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100, help='records per page')
+    parser.add_argument('--rounds', type=int, default=500)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    items = [record(i) for i in range(args.items)]
+    before_us = measure(before, items, args.rounds)
+    after_us = measure(after, items, args.rounds)
+
+    results = {
+        'items': args.items,
+        'encoder': 'orjson' if responses.orjson is not None else 'json',
+        'before_us_per_page': round(before_us, 1),
+        'after_us_per_page': round(after_us, 1),
+        'speedup': round(before_us / after_us, 1),
+        'before_bytes': len(before(items)),
+        'after_bytes': len(after(items))
+    }
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for key, value in results.items():
+            print(f"{key:24} {value}")
+
+
+if __name__ == '__main__':
+    main()
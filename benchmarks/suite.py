@@ -0,0 +1,282 @@
+"""Offline benchmark suite for the API and the download pipeline.
+
+Runs the real FastAPI app and downloader in-process. S3 and DynamoDB are
+in-memory stand-ins with a configurable round trip, and "YouTube" is a
+local server that yt-dlp's generic extractor downloads from, so nothing
+leaves the machine. Reports p50/p99 latency and throughput per endpoint,
+end-to-end job throughput, and peak RSS; ``--output`` keeps the results
+as JSON and ``--compare`` fails on regressions against a saved run.
+
+    python benchmarks/suite.py --requests 500 --output bench.json
+    python benchmarks/suite.py --compare bench.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import logging
+import uuid
+import asyncio
+import argparse
+import platform
+import resource
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import boto3  # noqa: E402
+import httpx  # noqa: E402
+
+from fakes import MB, MemoryDynamoDB, MemoryS3, VideoServer  # noqa: E402
+
+# Higher is better for these; every other compared metric is a latency
+THROUGHPUT_SUFFIXES = ('_rps', '_mbps', '_jobs_per_second')
+
+
+def configure_environment():
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ['S3_BUCKET_NAME'] = 'benchmark-bucket'
+    # Jobs run on the in-process scheduler
+    os.environ.pop('JOB_QUEUE_URL', None)
+    # Limits high enough that nothing is refused; this measures cost, not policy
+    os.environ['RATE_LIMIT_TIERS'] = json.dumps({'standard': {
+        'requests_per_second': 1e9, 'burst': 1e9, 'daily_jobs': 10 ** 9, 'daily_bytes': 10 ** 15
+    }})
+
+
+def build_services(table_latency: float):
+    """Wire the API to the in-memory stores, the way init_services would"""
+    import lambda_function
+    from utils.downloader import YouTubeDownloader
+    from utils.rate_limit import RateLimiter
+
+    s3 = MemoryS3()
+    dynamodb = MemoryDynamoDB(latency=table_latency)
+    with mock.patch.object(boto3, 'resource', return_value=dynamodb):
+        downloader = YouTubeDownloader(s3, os.environ['S3_BUCKET_NAME'])
+    lambda_function.s3_client = s3
+    lambda_function.downloader = downloader
+    lambda_function.rate_limiter = RateLimiter(downloader.quota, run_io=downloader.run_io)
+    # Per-request logging would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    return lambda_function.app, downloader, dynamodb
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def load(client, requests, concurrency: int):
+    """Send (method, path, body) requests; returns (latencies, seconds, responses)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(method, path, body):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, f"{method} {path}: {response.status_code} {response.text}"
+            return response.json()
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[one(*request) for request in requests])
+    return latencies, time.perf_counter() - started, responses
+
+
+def summarize(name: str, latencies, seconds: float) -> dict:
+    return {
+        f"{name}_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        f"{name}_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        f"{name}_rps": round(len(latencies) / seconds, 1)
+    }
+
+
+async def wait_for_jobs(downloader, download_ids, timeout: float) -> int:
+    """Wait until every job is terminal; returns how many completed"""
+    deadline = time.monotonic() + timeout
+    pending = set(download_ids)
+    completed = 0
+    while pending and time.monotonic() < deadline:
+        for record in await downloader.run_io(downloader._batch_get_records, list(pending)):
+            if record.get('status') in ('completed', 'failed'):
+                pending.discard(record['download_id'])
+                completed += record['status'] == 'completed'
+        if pending:
+            await asyncio.sleep(0.05)
+    if pending:
+        raise RuntimeError(f"{len(pending)} jobs still running after {timeout}s")
+    return completed
+
+
+async def run_api(app, downloader, server, args) -> dict:
+    from utils.auth import generate_token
+
+    results = {}
+    token = generate_token('bench-user', 'bench-user@example.com', ['download'])
+    transport = httpx.ASGITransport(app=app)
+    headers = {'Authorization': f"Bearer {token}"}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=60) as client:
+        videos = [
+            ('POST', '/download', {
+                'url': server.url(uuid.uuid4().hex[:12], args.job_size_kb),
+                'quality': '720p',
+                'format': 'mp4'
+            })
+            for _ in range(args.requests)
+        ]
+        started = time.perf_counter()
+        latencies, seconds, responses = await load(client, videos, args.concurrency)
+        results.update(summarize('post_download', latencies, seconds))
+
+        download_ids = [response['data']['download_id'] for response in responses]
+        completed = await wait_for_jobs(downloader, download_ids, args.job_timeout)
+        elapsed = time.perf_counter() - started
+        results['jobs_completed'] = completed
+        results['jobs_per_second'] = round(completed / elapsed, 2)
+        results['jobs_mbps'] = round(completed * args.job_size_kb / 1024 / elapsed, 2)
+
+        reads = [('GET', f"/downloads/{download_ids[i % len(download_ids)]}", None) for i in range(args.requests)]
+        latencies, seconds, _ = await load(client, reads, args.concurrency)
+        results.update(summarize('get_download', latencies, seconds))
+
+        # One bulk poll stands in for up to 100 single ones
+        bulk = [
+            ('POST', '/downloads/status', {'download_ids': download_ids[:100]})
+            for _ in range(max(1, args.requests // 10))
+        ]
+        latencies, seconds, _ = await load(client, bulk, args.concurrency)
+        results.update(summarize('bulk_status', latencies, seconds))
+
+        lists = [('GET', f"/downloads?limit={args.page_size}", None) for _ in range(args.requests)]
+        latencies, seconds, _ = await load(client, lists, args.concurrency)
+        results.update(summarize('list_downloads', latencies, seconds))
+
+        results.update(await run_burst(client, downloader, server, args))
+
+    return results
+
+
+async def run_burst(client, downloader, server, args) -> dict:
+    """Many requests for one video at once; coalescing should leave a single transfer"""
+    url = server.url(f"burst{uuid.uuid4().hex[:8]}", args.job_size_kb)
+    requests = [('POST', '/download', {'url': url, 'quality': '720p', 'format': 'mp4'})] * args.burst
+    latencies, seconds, responses = await load(client, requests, args.concurrency)
+    download_ids = [response['data']['download_id'] for response in responses]
+    completed = await wait_for_jobs(downloader, download_ids, args.job_timeout)
+
+    records = await downloader.run_io(downloader._batch_get_records, download_ids)
+    return {
+        **summarize('burst_download', latencies, seconds),
+        'burst_completed': completed,
+        # Downloads that neither followed another one nor hit the content cache
+        'burst_transfers': sum(1 for r in records if not r.get('leader_id') and not r.get('cache_hit'))
+    }
+
+
+def run_transfers(downloader, server, sizes_mb) -> dict:
+    """End-to-end job throughput: extraction, transfer and S3 upload for one large video each"""
+    results = {}
+    for size_mb in sizes_mb:
+        download_id = str(uuid.uuid4())
+        url = server.url(f"large{size_mb}", size_mb * 1024)
+        started = time.perf_counter()
+        downloader._download_to_s3(url, '720p', 'mp4', download_id, user_id='bench-transfer')
+        results[f"transfer_{size_mb}mb_mbps"] = round(size_mb / (time.perf_counter() - started), 2)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Metrics that got worse than the baseline by more than ``threshold``"""
+    regressions = []
+    for key, old in baseline.items():
+        new = results.get(key)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        if key.endswith('_p50_ms') or key.endswith('_p99_ms') or key == 'peak_rss_mb':
+            change = (new - old) / old
+        elif key.endswith(THROUGHPUT_SUFFIXES):
+            change = (old - new) / old
+        else:
+            continue
+        if change > threshold:
+            regressions.append(f"{key}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--job-size-kb', type=int, default=256, help='size of each video POSTed to /download')
+    parser.add_argument('--burst', type=int, default=50, help='concurrent requests for one video')
+    parser.add_argument('--job-timeout', type=float, default=300)
+    parser.add_argument('--video-sizes-mb', type=int, nargs='*', default=[16, 64],
+                        help='sizes for the end-to-end transfer runs')
+    parser.add_argument('--per-connection-mbps', type=float, default=0,
+                        help='throttle each video connection (0 = unthrottled)')
+    parser.add_argument('--table-latency-ms', type=float, default=2.0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    configure_environment()
+    app, downloader, _ = build_services(args.table_latency_ms / 1000)
+
+    # yt-dlp reports progress on stdout, which would corrupt --json output
+    with VideoServer(per_connection_bytes=args.per_connection_mbps * MB) as server, redirect_stdout(sys.stderr):
+        results = asyncio.run(run_api(app, downloader, server, args))
+        results.update(run_transfers(downloader, server, args.video_sizes_mb))
+
+    # ru_maxrss is in KB on Linux
+    results['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for key, value in results.items():
+            print(f"{key:28} {value}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
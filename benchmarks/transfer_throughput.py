@@ -0,0 +1,80 @@
+"""Measure download throughput of the sequential and parallel S3 transfer paths.
+
+A local HTTP server serves a generated file with Range support and caps every
+connection at a fixed rate, the way YouTube throttles each stream. Uploads go
+to an in-memory S3 stand-in, so the numbers only reflect the fetch side.
+
+    python benchmarks/transfer_throughput.py --size-mb 64 --per-connection-mbps 8
+"""
+import os
+import sys
+import time
+import json
+import argparse
+from typing import Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.streaming import (  # noqa: E402
+    AdaptiveConcurrency,
+    ParallelRangeTransfer,
+    S3MultipartWriter,
+    iter_http_chunks
+)
+
+from fakes import MB, MemoryS3, VideoServer  # noqa: E402
+
+def run_sequential(url: str, size: int, part_size: int) -> float:
+    s3 = MemoryS3()
+    started = time.monotonic()
+    with S3MultipartWriter(s3, 'bench', 'sequential', part_size=part_size) as writer:
+        for block in iter_http_chunks(url, chunk_size=10 * MB):
+            writer.write(block)
+    elapsed = time.monotonic() - started
+    assert len(s3.objects['sequential']) == size
+    return elapsed
+
+
+def run_parallel(url: str, size: int, part_size: int, connections: int) -> Tuple[float, int]:
+    s3 = MemoryS3()
+    concurrency = AdaptiveConcurrency(initial=2, maximum=connections)
+    transfer = ParallelRangeTransfer(s3, 'bench', 'parallel', url, size, part_size=part_size, concurrency=concurrency)
+    started = time.monotonic()
+    transfer.run()
+    elapsed = time.monotonic() - started
+    assert len(s3.objects['parallel']) == size
+    return elapsed, concurrency.limit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--per-connection-mbps', type=float, default=8.0)
+    parser.add_argument('--part-size-mb', type=int, default=8)
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    size = args.size_mb * MB
+    with VideoServer(per_connection_bytes=args.per_connection_mbps * MB) as server:
+        url = server.url('bench', size // 1024)
+        sequential = run_sequential(url, size, args.part_size_mb * MB)
+        parallel, final_limit = run_parallel(url, size, args.part_size_mb * MB, args.connections)
+
+    results = {
+        'size_mb': args.size_mb,
+        'per_connection_mbps': args.per_connection_mbps,
+        'sequential_mbps': round(args.size_mb / sequential, 2),
+        'parallel_mbps': round(args.size_mb / parallel, 2),
+        'parallel_final_connections': final_limit,
+        'speedup': round(sequential / parallel, 2)
+    }
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for key, value in results.items():
+            print(f"{key:28} {value}")
+
+
+if __name__ == '__main__':
+    main()
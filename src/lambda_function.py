@@ -1,21 +1,28 @@
 import json
 import os
+import time
 import logging
+import threading
 import traceback
+from functools import partial
 from typing import Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from mangum import Mangum
 import boto3
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
-import jwt
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from utils.auth import verify_token, TokenData
-from utils.downloader import YouTubeDownloader
+from utils.auth import get_auth_manager, verify_token, TokenData
+from utils.downloader import YouTubeDownloader, TERMINAL_STATUSES
 from utils.errors import CustomException, ErrorCode
+from utils.metrics import get_metrics
+from utils.responses import DownloadStatus, FastJSONResponse, dumps, success
+from utils.rate_limit import RateLimiter
+from utils.scheduler import priority_for
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,7 +32,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="YouTube Downloader API",
     description="Secure API for downloading YouTube videos",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -40,23 +48,55 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
-# Global variables
+# Server-sent event streams end within the long-poll limit (API Gateway buffers
+# the response and cuts it at 29 s); clients reconnect with Last-Event-ID
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+
+# One BatchGetItem request
+BULK_STATUS_MAX_IDS = 100
+
+# Services are built on first use so a cold start only pays for what the
+# request needs; yt-dlp in particular is imported by the download paths only
 s3_client = None
 downloader = None
+rate_limiter = None
+_services_lock = threading.Lock()
 
 def init_services():
     """Initialize AWS services and utilities"""
-    global s3_client, downloader
+    global s3_client, downloader, rate_limiter
     try:
-        s3_client = boto3.client('s3')
+        s3_client = boto3.client(
+            's3',
+            config=Config(max_pool_connections=int(os.getenv('STORAGE_IO_WORKERS', '16')))
+        )
         downloader = YouTubeDownloader(s3_client, os.getenv('S3_BUCKET_NAME'))
+        rate_limiter = RateLimiter(downloader.quota, run_io=downloader.run_io)
         logger.info("Services initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize services: {str(e)}")
         raise
 
-# Initialize services on startup
-init_services()
+def _ensure_services():
+    if downloader is None:
+        with _services_lock:
+            if downloader is None:
+                init_services()
+
+def get_downloader() -> YouTubeDownloader:
+    """Get the downloader, initializing services on first use"""
+    _ensure_services()
+    return downloader
+
+def get_s3_client():
+    """Get the S3 client, initializing services on first use"""
+    _ensure_services()
+    return s3_client
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the rate limiter, initializing services on first use"""
+    _ensure_services()
+    return rate_limiter
 
 @app.exception_handler(CustomException)
 async def custom_exception_handler(request: Request, exc: CustomException):
@@ -93,12 +133,22 @@ async def get_current_user(token: str = Depends(security)) -> TokenData:
             detail="Invalid authentication credentials"
         )
 
+async def rate_limited_user(current_user: TokenData = Depends(get_current_user)) -> TokenData:
+    """Authenticated user within their request rate"""
+    get_rate_limiter().check_rate(current_user.user_id, current_user.permissions)
+    return current_user
+
+async def quota_checked_user(current_user: TokenData = Depends(rate_limited_user)) -> TokenData:
+    """Rate-limited user with a download left in today's quota (counted once accepted)"""
+    await get_rate_limiter().check_quota(current_user.user_id, current_user.permissions)
+    return current_user
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         # Test S3 connection
-        s3_client.head_bucket(Bucket=os.getenv('S3_BUCKET_NAME'))
+        await get_downloader().run_io(get_s3_client().head_bucket, Bucket=os.getenv('S3_BUCKET_NAME'))
         
         return {
             "status": "healthy",
@@ -106,7 +156,9 @@ async def health_check():
             "services": {
                 "s3": "connected",
                 "lambda": "running"
-            }
+            },
+            "scheduler": get_downloader().scheduler.stats() if get_downloader().scheduler_started else None,
+            "token_cache": get_auth_manager().cache_stats()
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -119,10 +171,99 @@ async def health_check():
             }
         )
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Pipeline metrics in the Prometheus text format (local runs only)"""
+    metrics = get_metrics()
+    if not metrics.endpoint_enabled:
+        raise CustomException(ErrorCode.NOT_FOUND, "Not found")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/info")
+async def get_video_info(
+    url: Optional[str] = None,
+    current_user: TokenData = Depends(rate_limited_user)
+):
+    """Get a video's title, duration and thumbnail without starting a download"""
+    if not url:
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            "Video URL is required",
+            {"field": "url"}
+        )
+    
+    video_info = await get_downloader().get_video_info(
+        url,
+        user_id=current_user.user_id,
+        priority=priority_for(current_user.permissions)
+    )
+    return {
+        "status": "success",
+        "data": video_info,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.post("/info")
+async def get_video_infos(
+    request: Dict[str, Any],
+    current_user: TokenData = Depends(rate_limited_user)
+):
+    """Look up many videos at once; failures are reported per URL"""
+    video_urls = request.get('urls')
+    if not video_urls or not isinstance(video_urls, list) or not all(
+        isinstance(url, str) and url for url in video_urls
+    ):
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            "urls must be a list of video URLs",
+            {"field": "urls"}
+        )
+    if len(video_urls) > get_downloader().info_batch_max_items:
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            f"At most {get_downloader().info_batch_max_items} URLs can be looked up at once",
+            {"field": "urls"}
+        )
+    
+    result = await get_downloader().get_video_infos(
+        video_urls,
+        user_id=current_user.user_id,
+        priority=priority_for(current_user.permissions)
+    )
+    return {
+        "status": "success",
+        "data": result,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def parse_clip_time(value: Any, field: str) -> Optional[int]:
+    """Parse a clip bound given as seconds or [[HH:]MM:]SS into whole seconds"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            seconds = 0.0
+            for part in value.strip().split(':'):
+                seconds = seconds * 60 + float(part)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            seconds = float(value)
+        else:
+            raise ValueError(value)
+        if not 0 <= seconds < float('inf'):
+            raise ValueError(value)
+    except ValueError:
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            f"Invalid {field} time",
+            {"field": field}
+        )
+    # Cuts land on keyframes anyway; round outwards so the clip covers the request
+    return int(seconds) if field == 'start' else int(-(-seconds // 1))
+
 @app.post("/download")
 async def download_video(
     request: Dict[str, Any],
-    current_user: TokenData = Depends(get_current_user)
+    current_user: TokenData = Depends(quota_checked_user)
 ):
     """Download YouTube video endpoint"""
     try:
@@ -137,16 +278,30 @@ async def download_video(
         video_url = request['url']
         quality = request.get('quality', '720p')
         format_type = request.get('format', 'mp4')
+        start = parse_clip_time(request.get('start'), 'start')
+        end = parse_clip_time(request.get('end'), 'end')
+        if end is not None and end <= (start or 0):
+            raise CustomException(
+                ErrorCode.INVALID_REQUEST,
+                "Clip end must be after its start",
+                {"field": "end"}
+            )
         
         logger.info(f"Download request for URL: {video_url} by user: {current_user.user_id}")
         
         # Download video
-        result = await downloader.download_video(
+        result = await get_downloader().download_video(
             video_url=video_url,
             quality=quality,
             format_type=format_type,
-            user_id=current_user.user_id
+            user_id=current_user.user_id,
+            priority=priority_for(current_user.permissions),
+            start=start,
+            end=end
         )
+        # Only accepted jobs count; cache hits are served without a transfer
+        if result['status'] != 'completed':
+            get_downloader().quota.add(current_user.user_id, jobs=1)
         
         return {
             "status": "success",
@@ -165,19 +320,130 @@ async def download_video(
             {"error": str(e)}
         )
 
-@app.get("/downloads/{download_id}")
-async def get_download_status(
-    download_id: str,
-    current_user: TokenData = Depends(get_current_user)
+@app.post("/downloads/batch")
+async def create_batch_download(
+    request: Dict[str, Any],
+    current_user: TokenData = Depends(rate_limited_user)
 ):
-    """Get download status"""
+    """Download a list of URLs or a whole playlist"""
     try:
-        status = await downloader.get_download_status(download_id, current_user.user_id)
+        # Validate request
+        video_urls = request.get('urls')
+        playlist_url = request.get('playlist_url')
+        if bool(video_urls) == bool(playlist_url):
+            raise CustomException(
+                ErrorCode.INVALID_REQUEST,
+                "Provide either a list of URLs or a playlist URL",
+                {"fields": ["urls", "playlist_url"]}
+            )
+        if video_urls is not None and (
+            not isinstance(video_urls, list)
+            or not all(isinstance(url, str) and url for url in video_urls)
+        ):
+            raise CustomException(
+                ErrorCode.INVALID_REQUEST,
+                "urls must be a list of video URLs",
+                {"field": "urls"}
+            )
+        if video_urls and len(video_urls) > get_downloader().batch_max_items:
+            raise CustomException(
+                ErrorCode.INVALID_REQUEST,
+                f"A batch can contain at most {get_downloader().batch_max_items} URLs",
+                {"field": "urls"}
+            )
+        
+        logger.info(f"Batch download request by user: {current_user.user_id}")
+        
+        result = await get_downloader().create_batch(
+            current_user.user_id,
+            video_urls=video_urls,
+            playlist_url=playlist_url,
+            quality=request.get('quality', '720p'),
+            format_type=request.get('format', 'mp4'),
+            priority=priority_for(current_user.permissions),
+            check_quota=partial(get_rate_limiter().check_quota, current_user.user_id, current_user.permissions)
+        )
+        get_downloader().quota.add(current_user.user_id, jobs=result['count'])
+        
         return {
             "status": "success",
-            "data": status,
+            "message": "Batch queued successfully",
+            "data": result,
             "timestamp": datetime.utcnow().isoformat()
         }
+        
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch download failed: {str(e)}\n{traceback.format_exc()}")
+        raise CustomException(
+            ErrorCode.DOWNLOAD_FAILED,
+            "Failed to create batch download",
+            {"error": str(e)}
+        )
+
+@app.get("/downloads/batch/{batch_id}")
+async def get_batch_status(
+    batch_id: str,
+    current_user: TokenData = Depends(rate_limited_user)
+):
+    """Get aggregate status of a batch download"""
+    try:
+        status = await get_downloader().get_batch_status(batch_id, current_user.user_id)
+        status['downloads'] = [DownloadStatus.from_item(item) for item in status['downloads']]
+        return success(status)
+    except CustomException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get batch status: {str(e)}")
+        raise CustomException(
+            ErrorCode.INTERNAL_ERROR,
+            "Failed to retrieve batch status",
+            {"batch_id": batch_id}
+        )
+
+@app.post("/downloads/status")
+async def get_download_statuses(
+    request: Dict[str, Any],
+    current_user: TokenData = Depends(rate_limited_user)
+):
+    """Get the status of up to 100 downloads in one request"""
+    download_ids = request.get('download_ids')
+    if not download_ids or not isinstance(download_ids, list) or not all(
+        isinstance(download_id, str) and download_id for download_id in download_ids
+    ):
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            "download_ids must be a list of download ids",
+            {"field": "download_ids"}
+        )
+    if len(download_ids) > BULK_STATUS_MAX_IDS:
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            f"At most {BULK_STATUS_MAX_IDS} downloads can be checked at once",
+            {"field": "download_ids"}
+        )
+    
+    result = await get_downloader().get_download_statuses(download_ids, current_user.user_id)
+    result['downloads'] = [DownloadStatus.from_item(item) for item in result['downloads']]
+    return success(result)
+
+@app.get("/downloads/{download_id}")
+async def get_download_status(
+    download_id: str,
+    current_user: TokenData = Depends(rate_limited_user),
+    wait: float = 0,
+    since: Optional[int] = None
+):
+    """Get download status; with wait and since, hold the request until the version changes"""
+    try:
+        status = await get_downloader().get_download_status(
+            download_id,
+            current_user.user_id,
+            wait=max(wait, 0),
+            since=since
+        )
+        return success(DownloadStatus.from_item(status))
     except Exception as e:
         logger.error(f"Failed to get download status: {str(e)}")
         raise CustomException(
@@ -186,24 +452,85 @@ async def get_download_status(
             {"download_id": download_id}
         )
 
+@app.get("/downloads/{download_id}/events")
+async def stream_download_status(
+    download_id: str,
+    request: Request,
+    current_user: TokenData = Depends(rate_limited_user),
+    since: Optional[int] = None
+):
+    """Stream status changes as server-sent events until the download finishes.
+
+    Streams end within the status long-poll limit, inside the API Gateway
+    timeout; clients reconnect with Last-Event-ID (or ``since``) to continue.
+    """
+    # Read once up front so a missing or foreign download fails as a normal response
+    try:
+        status = await get_downloader().get_download_status(download_id, current_user.user_id)
+    except Exception as e:
+        logger.error(f"Failed to get download status: {str(e)}")
+        raise CustomException(
+            ErrorCode.NOT_FOUND,
+            "Download not found",
+            {"download_id": download_id}
+        )
+    
+    last_event_id = request.headers.get('last-event-id')
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    async def events():
+        nonlocal status
+        version = since
+        deadline = time.monotonic() + get_downloader().status_max_wait
+        try:
+            while True:
+                current = int(status.get('version', 0))
+                if current != version:
+                    version = current
+                    yield f"id: {version}\nevent: status\ndata: {dumps(DownloadStatus.from_item(status)).decode()}\n\n"
+                else:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                
+                remaining = deadline - time.monotonic()
+                if status.get('status') in TERMINAL_STATUSES or remaining <= 0 or await request.is_disconnected():
+                    return
+                status = await get_downloader().get_download_status(
+                    download_id,
+                    current_user.user_id,
+                    wait=min(remaining, SSE_HEARTBEAT_SECONDS),
+                    since=version
+                )
+        except Exception as e:
+            # Headers are already sent, so the failure goes out as an event
+            logger.error(f"Status stream for {download_id} failed: {str(e)}")
+            error = {"error": ErrorCode.INTERNAL_ERROR.value, "message": "Failed to read download status"}
+            yield f"event: error\ndata: {dumps(error).decode()}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/downloads")
 async def list_downloads(
-    current_user: TokenData = Depends(get_current_user),
+    current_user: TokenData = Depends(rate_limited_user),
     limit: int = 10,
-    offset: int = 0
+    cursor: Optional[str] = None
 ):
-    """List user downloads"""
+    """List user downloads, newest first; pass next_cursor to get the next page"""
     try:
-        downloads = await downloader.list_user_downloads(
+        downloads = await get_downloader().list_user_downloads(
             current_user.user_id,
             limit=limit,
-            offset=offset
+            cursor=cursor
         )
-        return {
-            "status": "success",
-            "data": downloads,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        downloads['downloads'] = [DownloadStatus.from_item(item) for item in downloads['downloads']]
+        return success(downloads)
+    except CustomException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list downloads: {str(e)}")
         raise CustomException(
@@ -212,5 +539,12 @@ async def list_downloads(
             {"error": str(e)}
         )
 
+asgi_handler = Mangum(app, lifespan="off")
+
 # Lambda handler
-handler = Mangum(app, lifespan="off")
\ No newline at end of file
+def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """Serve an API Gateway event, then write the metrics it recorded as EMF log lines"""
+    try:
+        return asgi_handler(event, context)
+    finally:
+        get_metrics().flush()
\ No newline at end of file
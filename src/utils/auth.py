@@ -1,10 +1,14 @@
 import os
 import jwt
+import time
+import hashlib
+import threading
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict, Any
 import logging
 
+from .cache import TTLCache
 from .errors import CustomException, ErrorCode
 
 logger = logging.getLogger(__name__)
@@ -24,6 +28,13 @@ class AuthManager:
         
         if not self.secret_key:
             raise ValueError("JWT_SECRET_KEY environment variable is required")
+        
+        # Verified tokens, keyed by hash and kept until the token's exp;
+        # polling clients send the same token many times a minute
+        cache_size = int(os.getenv('TOKEN_CACHE_SIZE', '4096'))
+        self.token_cache = TTLCache(max_size=cache_size) if cache_size > 0 else None
+        # Revocations are per process; entries drop out once the token expires anyway
+        self.revoked = TTLCache(max_size=int(os.getenv('TOKEN_REVOCATION_SIZE', '10000')))
 
     def generate_token(self, user_id: str, email: str, permissions: list = None) -> str:
         """Generate JWT token"""
@@ -53,7 +64,54 @@ class AuthManager:
             )
 
     def verify_token(self, token: str) -> TokenData:
-        """Verify JWT token"""
+        """Verify JWT token, answering repeat tokens from the cache"""
+        key = self._token_key(token)
+        if self.revoked.get(key) is not None:
+            raise CustomException(
+                ErrorCode.INVALID_TOKEN,
+                "Authentication token has been revoked"
+            )
+        
+        if self.token_cache is not None:
+            token_data = self.token_cache.get(key)
+            if token_data is not None:
+                return token_data
+        
+        token_data = self._decode_token(token)
+        if self.token_cache is not None:
+            remaining = token_data.expires_at.timestamp() - time.time()
+            if remaining > 0:
+                self.token_cache.set(key, token_data, ttl=remaining)
+        return token_data
+
+    def evict_token(self, token: str):
+        """Drop a token from the verified-token cache"""
+        if self.token_cache is not None:
+            self.token_cache.pop(self._token_key(token))
+
+    def revoke_token(self, token: str):
+        """Reject a token from now on, even though its signature is valid"""
+        try:
+            exp = jwt.decode(token, options={"verify_signature": False}).get('exp')
+        except jwt.InvalidTokenError:
+            # Not a token we would ever accept
+            return
+        
+        ttl = exp - time.time() if exp else self.token_expiry_hours * 3600
+        if ttl > 0:
+            self.revoked.set(self._token_key(token), True, ttl=ttl)
+        self.evict_token(token)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get verified-token cache counters"""
+        stats = self.token_cache.stats() if self.token_cache is not None else {'enabled': False}
+        stats['revoked'] = len(self.revoked)
+        return stats
+
+    def _token_key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _decode_token(self, token: str) -> TokenData:
         try:
             payload = jwt.decode(
                 token,
@@ -88,13 +146,27 @@ class AuthManager:
                 {"error": str(e)}
             )
 
-# Global auth manager instance
-auth_manager = AuthManager()
+# Global auth manager instance, created on first use
+_auth_manager = None
+_auth_manager_lock = threading.Lock()
+
+def get_auth_manager() -> AuthManager:
+    """Get the shared auth manager"""
+    global _auth_manager
+    if _auth_manager is None:
+        with _auth_manager_lock:
+            if _auth_manager is None:
+                _auth_manager = AuthManager()
+    return _auth_manager
 
 def verify_token(token: str) -> TokenData:
     """Convenience function to verify token"""
-    return auth_manager.verify_token(token)
+    return get_auth_manager().verify_token(token)
 
 def generate_token(user_id: str, email: str, permissions: list = None) -> str:
     """Convenience function to generate token"""
-    return auth_manager.generate_token(user_id, email, permissions)
\ No newline at end of file
+    return get_auth_manager().generate_token(user_id, email, permissions)
+
+def revoke_token(token: str):
+    """Convenience function to revoke token"""
+    get_auth_manager().revoke_token(token)
@@ -0,0 +1,338 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Hashable, List
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# Largest object CopyObject can copy in one request
+MAX_COPY_BYTES = 5 * 1024 ** 3
+
+
+class TTLCache:
+    """Thread-safe bounded LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, evicting the least recently used one when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Explicitly evict an entry"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class MetadataCache:
+    """Two-tier cache of video summaries.
+
+    The in-process LRU survives warm invocations of the same container;
+    the shared tier in the cache table lets other containers skip the
+    extraction too. Failed extractions are cached for a shorter time so
+    bad URLs do not hit YouTube on every retry.
+    """
+
+    KEY_PREFIX = 'meta#'
+
+    def __init__(self, dynamodb):
+        self.ttl = int(os.getenv('METADATA_CACHE_TTL', '3600'))
+        self.negative_ttl = int(os.getenv('METADATA_CACHE_NEGATIVE_TTL', '300'))
+        self.local = TTLCache(
+            max_size=int(os.getenv('METADATA_CACHE_SIZE', '512')),
+            ttl=self.ttl
+        )
+        self.shared_enabled = os.getenv('METADATA_CACHE_SHARED', 'true').lower() == 'true'
+        self.dynamodb = dynamodb
+        self.table = dynamodb.Table(os.getenv('CACHE_TABLE_NAME', 'download-cache'))
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached summary, or a ``{'error': ...}`` entry for a failed URL"""
+        value = self.local.get(key)
+        if value is not None or not self.shared_enabled:
+            return value
+
+        try:
+            response = self.table.get_item(Key={'cache_key': self.KEY_PREFIX + key})
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Metadata cache lookup failed: {str(e)}")
+            return None
+
+        item = response.get('Item')
+        now = int(time.time())
+        # DynamoDB TTL deletes lazily, so check expiry ourselves
+        if not item or int(item.get('expires_at', 0)) <= now:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        return self._remember(key, item, now)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many cached entries, fetching the shared tier's with batch reads"""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        if not missing or not self.shared_enabled:
+            return found
+
+        table_name = self.table.name
+        now = int(time.time())
+        for start in range(0, len(missing), 100):
+            request = {table_name: {'Keys': [
+                {'cache_key': self.KEY_PREFIX + key} for key in missing[start:start + 100]
+            ]}}
+            try:
+                # Unprocessed keys are left to the per-key path
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+            except (BotoCoreError, ClientError) as e:
+                logger.error(f"Metadata cache batch lookup failed: {str(e)}")
+                return found
+            for item in response.get('Responses', {}).get(table_name, []):
+                if int(item.get('expires_at', 0)) > now:
+                    key = item['cache_key'][len(self.KEY_PREFIX):]
+                    found[key] = self._remember(key, item, now)
+        self.shared_hits += sum(1 for key in missing if key in found)
+        self.shared_misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put(self, key: str, video_info: Dict[str, Any]):
+        """Cache a successfully extracted summary"""
+        self._put(key, {'video_info': video_info}, video_info, self.ttl)
+
+    def put_failure(self, key: str, error: str):
+        """Cache a failed extraction for the negative TTL"""
+        self._put(key, {'error': error}, {'error': error}, self.negative_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for both tiers"""
+        return {
+            'local': self.local.stats(),
+            'shared': {'hits': self.shared_hits, 'misses': self.shared_misses}
+        }
+
+    def _remember(self, key: str, item: Dict[str, Any], now: int) -> Dict[str, Any]:
+        """Keep a shared-tier entry in the local tier for the rest of its life"""
+        value = item.get('video_info') or {'error': item.get('error', 'unknown error')}
+        self.local.set(key, value, ttl=int(item['expires_at']) - now)
+        return value
+
+    def _put(self, key: str, attributes: Dict[str, Any], value: Dict[str, Any], ttl: int):
+        self.local.set(key, value, ttl=ttl)
+        if not self.shared_enabled:
+            return
+        try:
+            self.table.put_item(
+                Item={
+                    'cache_key': self.KEY_PREFIX + key,
+                    'expires_at': int(time.time()) + ttl,
+                    **attributes
+                }
+            )
+        except Exception as e:
+            # A failed cache write must never fail the request
+            logger.error(f"Failed to store metadata cache entry: {str(e)}")
+
+
+class ContentCache:
+    """Content-addressed index of objects already downloaded to S3.
+
+    Entries live in the cache table keyed on a digest of
+    (extractor, video id, format selector, format type) and point at an
+    object under ``downloads/content/``, the prefix covered by the bucket
+    lifecycle rule. An entry expires when its object is due to be removed
+    by that rule. Every hit adds to the entry's ``refs``, which starts over
+    whenever the object is refreshed, so it counts the hits since the last
+    store or refresh. An entry with enough of those hits close to expiry
+    has its object re-written in place, which restarts the lifecycle clock,
+    instead of being fetched again. Objects over 5 GB, the most CopyObject
+    can copy, are not refreshed and expire with the lifecycle rule.
+    """
+
+    KEY_PREFIX = 'content#'
+
+    def __init__(self, dynamodb, s3_client, bucket_name: str):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.table = dynamodb.Table(os.getenv('CACHE_TABLE_NAME', 'download-cache'))
+        self.enabled = os.getenv('CONTENT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.lifecycle_seconds = int(os.getenv('S3_LIFECYCLE_DAYS', '7')) * 24 * 3600
+        # Objects must outlive the links handed out for them
+        self.min_remaining_seconds = int(os.getenv('CONTENT_CACHE_MIN_REMAINING_HOURS', '24')) * 3600
+        # Margin so an entry never outlives its object by clock skew
+        self.expiry_margin_seconds = 3600
+        self.refresh_window_seconds = int(os.getenv('CONTENT_CACHE_REFRESH_HOURS', '48')) * 3600
+        self.refresh_min_refs = int(os.getenv('CONTENT_CACHE_REFRESH_MIN_REFS', '3'))
+
+    def cache_key(
+        self,
+        video_info: Dict[str, Any],
+        format_selector: str,
+        format_type: str,
+        clip: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Build the cache key for a video or a clip of it, or None when it cannot be identified"""
+        if not self.enabled or not video_info.get('video_id'):
+            return None
+
+        parts = [
+            video_info.get('extractor') or 'unknown',
+            str(video_info['video_id']),
+            format_selector,
+            format_type
+        ]
+        if clip:
+            parts.append(f"{clip['start']}-{clip.get('end') or ''}")
+        identity = '|'.join(parts)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def s3_key(self, cache_key: str, format_type: str) -> str:
+        """Get the content-addressed S3 key for a cache key"""
+        return f"downloads/content/{cache_key}.{format_type}"
+
+    def lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a live cache entry and take a reference on it"""
+        try:
+            response = self.table.get_item(Key={'cache_key': self.KEY_PREFIX + cache_key})
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Content cache lookup failed: {str(e)}")
+            return None
+
+        item = response.get('Item')
+        if not item:
+            return None
+
+        remaining = int(item.get('expires_at', 0)) - int(time.time())
+        if remaining < self.min_remaining_seconds:
+            logger.info(f"Content cache entry {cache_key} too close to expiry")
+            return None
+
+        refs = self._add_reference(cache_key)
+        if remaining < self.refresh_window_seconds and refs >= self.refresh_min_refs:
+            self._refresh(cache_key, item)
+
+        return item
+
+    def store(self, cache_key: str, s3_key: str, size_bytes: int):
+        """Record a freshly uploaded object"""
+        now = int(time.time())
+        try:
+            self.table.put_item(
+                Item={
+                    'cache_key': self.KEY_PREFIX + cache_key,
+                    's3_key': s3_key,
+                    'size_bytes': size_bytes,
+                    'refs': 1,
+                    'stored_at': datetime.utcnow().isoformat(),
+                    'expires_at': now + self.lifecycle_seconds - self.expiry_margin_seconds
+                }
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Failed to store content cache entry: {str(e)}")
+
+    def _add_reference(self, cache_key: str) -> int:
+        try:
+            response = self.table.update_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                UpdateExpression="ADD refs :one SET last_hit_at = :now",
+                ExpressionAttributeValues={
+                    ':one': 1,
+                    ':now': datetime.utcnow().isoformat()
+                },
+                ReturnValues='UPDATED_NEW'
+            )
+            return int(response['Attributes']['refs'])
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Failed to reference content cache entry: {str(e)}")
+            return 0
+
+    def _refresh(self, cache_key: str, item: Dict[str, Any]):
+        """Rewrite a popular object in place to restart its lifecycle clock"""
+        s3_key = item['s3_key']
+        if int(item.get('size_bytes', 0)) > MAX_COPY_BYTES:
+            logger.info(f"Content cache entry {cache_key} is too large to refresh, letting it expire")
+            return
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                CopySource={'Bucket': self.bucket_name, 'Key': s3_key},
+                ContentType=head.get('ContentType', 'application/octet-stream'),
+                Metadata=head.get('Metadata', {}),
+                MetadataDirective='REPLACE'
+            )
+            self.table.update_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                UpdateExpression="SET refs = :zero, expires_at = :expires_at",
+                ExpressionAttributeValues={
+                    ':zero': 0,
+                    ':expires_at': int(time.time()) + self.lifecycle_seconds - self.expiry_margin_seconds
+                }
+            )
+            logger.info(f"Refreshed content cache entry {cache_key}")
+        except (BotoCoreError, ClientError) as e:
+            logger.error(f"Failed to refresh content cache entry: {str(e)}")
@@ -1,83 +1,772 @@
 import os
+import copy
+import time
 import uuid
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 import json
+import gzip
+import base64
+from functools import cached_property, lru_cache, partial
 from concurrent.futures import ThreadPoolExecutor
-import yt_dlp
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from .cache import ContentCache, MetadataCache, TTLCache
 from .errors import CustomException, ErrorCode
+from .formats import ThroughputEstimator, compact_formats, estimate_size, select_format
+from .inflight import InflightDownloads
+from .job_queue import create_job_queue
+from .metrics import get_metrics
+from .progress import ProgressReporter
+from .rate_limit import QuotaCounter
+from .responses import from_dynamodb
+from .scheduler import DownloadScheduler
+from .status_writer import StatusWriter
+from .streaming import (
+    AdaptiveConcurrency,
+    ParallelRangeTransfer,
+    S3MultipartWriter,
+    TransferInterrupted,
+    iter_http_chunks,
+    list_uploaded_parts,
+    probe_content_length
+)
 
 logger = logging.getLogger(__name__)
 
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# What a status poll needs from a record; bulk reads fetch only these
+STATUS_FIELDS = (
+    'download_id', 'user_id', 'status', 'progress', 'error', 's3_key', 'leader_id',
+    'clip', 'format_id', 'estimated_time', 'version', 'created_at', 'completed_at', 'failed_at'
+)
+
+def _load_yt_dlp():
+    """Import yt-dlp on first use; it is only needed on the download and info paths"""
+    import yt_dlp
+    return yt_dlp
+
+@lru_cache(maxsize=4096)
+def _identify_video(video_url: str) -> Tuple[Optional[str], Optional[str]]:
+    """Get (extractor key, video id) from the URL alone, without network access"""
+    for ie in _load_yt_dlp().extractor.gen_extractor_classes():
+        if ie.ie_key() == 'Generic' or not ie.suitable(video_url):
+            continue
+        return ie.ie_key(), ie.get_temp_id(video_url)
+    return None, None
+
+def _video_cache_key(video_url: str) -> str:
+    """Identify a video by extractor and id without any network access"""
+    extractor, video_id = _identify_video(video_url)
+    if extractor and video_id:
+        return f"{extractor}:{video_id}"
+    return f"url:{video_url.strip()}"
+
+def _find_interruption(error: BaseException) -> Optional[TransferInterrupted]:
+    """Find a deadline interruption, which yt-dlp may have wrapped in a DownloadError"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, TransferInterrupted):
+            return error
+        seen.add(id(error))
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if exc_info else None
+        error = wrapped or error.__cause__ or error.__context__
+    return None
+
+def _encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Turn a DynamoDB LastEvaluatedKey into an opaque continuation token"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Turn a continuation token back into an ExclusiveStartKey"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(key, dict):
+            raise ValueError("cursor is not a key")
+        return key
+    except Exception:
+        raise CustomException(
+            ErrorCode.INVALID_REQUEST,
+            "Invalid pagination cursor",
+            {"field": "cursor"}
+        )
+
 class YouTubeDownloader:
     def __init__(self, s3_client, bucket_name: str):
         self.s3_client = s3_client
         self.bucket_name = bucket_name
-        self.dynamodb = boto3.resource('dynamodb')
-        self.downloads_table = self.dynamodb.Table(os.getenv('DOWNLOADS_TABLE_NAME', 'downloads'))
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        # Storage calls run on a bounded pool sized to the connection pool,
+        # so the event loop never waits on DynamoDB or S3
+        self.io_workers = int(os.getenv('STORAGE_IO_WORKERS', '16'))
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=self.io_workers,
+            thread_name_prefix='storage-io'
+        )
+        self.dynamodb = boto3.resource(
+            'dynamodb',
+            config=Config(max_pool_connections=self.io_workers)
+        )
+        self.metrics = get_metrics()
+        # Every call on the downloads table is timed as a 'dynamodb' stage
+        self.downloads_table = self.metrics.instrument(
+            self.dynamodb.Table(os.getenv('DOWNLOADS_TABLE_NAME', 'downloads')),
+            'dynamodb',
+            ('get_item', 'put_item', 'update_item', 'query', 'delete_item')
+        )
+        self.user_index_name = os.getenv('DOWNLOADS_USER_INDEX_NAME', 'user-downloads-index')
+        # Record updates from transfer threads all go through one writer
+        self.status_writer = StatusWriter(
+            self._put_download_update,
+            workers=int(os.getenv('STATUS_WRITE_WORKERS', '4'))
+        )
+        self.stream_uploads = os.getenv('STREAM_UPLOADS', 'true').lower() == 'true'
+        self.stream_part_size = int(os.getenv('STREAM_PART_SIZE_MB', '8')) * 1024 * 1024
+        self.stream_buffered_parts = int(os.getenv('STREAM_BUFFERED_PARTS', '2'))
+        # Parallel transfers: range GETs for progressive files, fragments for DASH/HLS
+        self.transfer_connections = int(os.getenv('TRANSFER_CONNECTIONS', '8'))
+        self.transfer_initial_connections = int(os.getenv('TRANSFER_INITIAL_CONNECTIONS', '2'))
+        self.fragment_concurrency = int(os.getenv('TRANSFER_FRAGMENT_CONCURRENCY', '4'))
+        # Jobs larger than the size budget or slower than the time limit are refused up front
+        self.max_download_bytes = int(os.getenv('MAX_DOWNLOAD_MB', '0')) * 1024 * 1024 or None
+        self.job_time_limit = int(os.getenv('JOB_TIME_LIMIT_SECONDS', '900'))
+        # Matches the queue's maxReceiveCount: the last attempt's failure is final
+        self.job_max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+        self.estimate_overhead = float(os.getenv('ESTIMATE_OVERHEAD_SECONDS', '10'))
+        # Clips are cut at keyframes without re-encoding unless exact cuts are asked for
+        self.clip_exact_cuts = os.getenv('CLIP_EXACT_CUTS', 'false').lower() == 'true'
+        self.content_cache = ContentCache(self.dynamodb, s3_client, bucket_name)
+        self.metadata_cache = MetadataCache(self.dynamodb)
+        # Concurrent downloads of the same content share one transfer
+        self.inflight = InflightDownloads(self.dynamodb)
+        # Extractions running in this process, by video, for requests that arrive meanwhile
+        self._extractions: Dict[str, asyncio.Future] = {}
+        # Daily per-user usage; transferred bytes are counted here on completion
+        self.quota = QuotaCounter(self.dynamodb)
+        self.throughput = ThroughputEstimator(self.dynamodb)
+        self.batch_max_items = int(os.getenv('BATCH_MAX_ITEMS', '200'))
+        # Batch info lookups: URLs per request, and extractions in flight per request
+        self.info_batch_max_items = int(os.getenv('INFO_BATCH_MAX_ITEMS', '50'))
+        self.info_concurrency = int(os.getenv('INFO_CONCURRENCY', '8'))
+        # Long-poll bounds for status requests (API Gateway gives up after 29s)
+        self.status_max_wait = float(os.getenv('STATUS_MAX_WAIT_SECONDS', '25'))
+        self.status_poll_interval = float(os.getenv('STATUS_POLL_INTERVAL_SECONDS', '1'))
+        # Download URLs are minted on read; signing with the role's session
+        # credentials caps their life anyway, so keep them short
+        self.presign_expiry = int(os.getenv('PRESIGN_EXPIRY_SECONDS', '3600'))
+        self.presign_bucket = int(os.getenv('PRESIGN_BUCKET_SECONDS', '300'))
+        self.presigned_urls = TTLCache(
+            max_size=int(os.getenv('PRESIGN_CACHE_SIZE', '4096')),
+            ttl=self.presign_bucket
+        )
+
+    @cached_property
+    def scheduler(self) -> DownloadScheduler:
+        """Fair, per-user limited pools for extraction and transfers, started on first use"""
+        return DownloadScheduler()
+
+    @cached_property
+    def job_queue(self):
+        """Durable queue for download jobs; None runs them on the local scheduler"""
+        return create_job_queue()
+
+    @property
+    def scheduler_started(self) -> bool:
+        return 'scheduler' in self.__dict__
+
+    @cached_property
+    def ffmpeg_available(self) -> bool:
+        """Clips are fetched and cut by ffmpeg; checked once per container"""
+        from yt_dlp.downloader.external import FFmpegFD
+        return bool(FFmpegFD.available())
 
     async def download_video(
         self,
         video_url: str,
         quality: str = '720p',
         format_type: str = 'mp4',
-        user_id: str = None
+        user_id: str = None,
+        priority: str = 'normal',
+        start: Optional[int] = None,
+        end: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Download video from YouTube"""
+        """Download video from YouTube.
+
+        With ``start`` and/or ``end`` (seconds) only that segment is fetched
+        and stored. A download of content that another download is already
+        fetching follows it instead of starting a transfer of its own.
+        """
         download_id = str(uuid.uuid4())
+        cache_key = None
         
         try:
             # Create download record
             await self._create_download_record(download_id, video_url, user_id)
             
-            # Get video info first
-            video_info = await self._get_video_info(video_url)
+            # Get video info first, keeping the raw info for the download step
+            with self.metrics.job() as timings:
+                video_info, info = await self._extract_video_info(video_url, user_id, priority)
+            clip = self._resolve_clip(video_info, start, end)
+            public_info = self._public_info(video_info)
             
-            # Update record with video info
-            await self._update_download_record(
-                download_id,
-                {'video_info': video_info, 'status': 'downloading'}
+            # Reuse an object already downloaded for the same video, format and clip
+            cache_key = self.content_cache.cache_key(
+                public_info,
+                self._get_format_selector(quality, format_type),
+                format_type,
+                clip
             )
+            cached = await self.run_io(self.content_cache.lookup, cache_key) if cache_key else None
+            if cached:
+                download_url = self._generate_download_url(cached['s3_key'])
+                await self._update_download_record(download_id, {
+                    'video_info': public_info,
+                    'status': 'completed',
+                    's3_key': cached['s3_key'],
+                    'cache_hit': True,
+                    'clip': clip,
+                    'timings': timings,
+                    'completed_at': datetime.utcnow().isoformat()
+                })
+                return {
+                    'download_id': download_id,
+                    'status': 'completed',
+                    'video_info': public_info,
+                    'download_url': download_url,
+                    'estimated_time': 0
+                }
             
-            # Start download in background
-            loop = asyncio.get_event_loop()
-            download_task = loop.run_in_executor(
-                self.executor,
-                self._download_to_s3,
-                video_url,
-                quality,
-                format_type,
-                download_id
+            # Only a miss needs a transfer, so only a miss is planned (and may be refused)
+            selected, estimated_time = await self.run_io(
+                self._plan_download, video_info, quality, format_type, clip
             )
+            format_id = selected['format_id'] if selected else None
+            video_info = public_info
+            
+            leader_id = await self.run_io(self.inflight.join, cache_key, download_id) if cache_key else None
+            if leader_id:
+                # The leader's outcome is copied over when it finishes
+                await self._update_download_record(download_id, {
+                    'video_info': video_info,
+                    'status': 'queued',
+                    'leader_id': leader_id,
+                    'clip': clip,
+                    'format_id': format_id,
+                    'estimated_time': estimated_time,
+                    'timings': timings
+                })
+                self.metrics.increment('coalesced_downloads')
+                return {
+                    'download_id': download_id,
+                    'status': 'queued',
+                    'video_info': video_info,
+                    'format_id': format_id,
+                    'estimated_time': estimated_time
+                }
+            
+            if self.job_queue:
+                # Hand the job to the workers; it outlives this container
+                await self._update_download_record(download_id, {
+                    'video_info': video_info,
+                    'status': 'queued',
+                    'clip': clip,
+                    'format_id': format_id,
+                    'estimated_time': estimated_time,
+                    'timings': timings
+                })
+                await self._enqueue_download({
+                    'download_id': download_id,
+                    'video_url': video_url,
+                    'quality': quality,
+                    'format_type': format_type,
+                    'format_id': format_id,
+                    'clip': clip,
+                    'user_id': user_id,
+                    'cache_key': cache_key
+                }, info)
+                status = 'queued'
+            else:
+                # Update record with video info
+                await self._update_download_record(download_id, {
+                    'video_info': video_info,
+                    'status': 'downloading',
+                    'clip': clip,
+                    'format_id': format_id,
+                    'estimated_time': estimated_time,
+                    'timings': timings
+                })
+                
+                # Start download in background
+                download_task = self.scheduler.transfer.submit(
+                    user_id,
+                    priority,
+                    self._download_to_s3,
+                    video_url,
+                    quality,
+                    format_type,
+                    download_id,
+                    cache_key,
+                    info,
+                    user_id=user_id,
+                    timings=timings,
+                    format_id=format_id,
+                    clip=clip
+                )
+                status = 'started'
             
             # Don't wait for completion, return immediately
             return {
                 'download_id': download_id,
-                'status': 'started',
+                'status': status,
                 'video_info': video_info,
-                'estimated_time': self._estimate_download_time(video_info)
+                'clip': clip,
+                'format_id': format_id,
+                'estimated_time': estimated_time
             }
             
-        except Exception as e:
-            logger.error(f"Download initiation failed: {str(e)}")
+        except CustomException as e:
+            # Refusals keep their own error code
             await self._update_download_record(
                 download_id,
-                {'status': 'failed', 'error': str(e)}
+                {'status': 'failed', 'error': e.message}
             )
+            raise
+        except Exception as e:
+            logger.error(f"Download initiation failed: {str(e)}")
+            failure = {'status': 'failed', 'error': str(e)}
+            await self._update_download_record(download_id, failure)
+            if cache_key:
+                await self.run_io(self._release_followers, cache_key, download_id, failure)
             raise CustomException(
                 ErrorCode.DOWNLOAD_FAILED,
                 "Failed to initiate download",
                 {"download_id": download_id, "error": str(e)}
             )
 
-    async def _get_video_info(self, video_url: str) -> Dict[str, Any]:
+    async def _enqueue_download(self, job: Dict[str, Any], info: Optional[Dict[str, Any]]):
+        """Put a download job on the queue, stashing the extracted info for the worker"""
+        if info and info.get('_type', 'video') == 'video':
+            job['info_key'] = await self.run_io(self._stash_info, job['download_id'], info)
+        await self.run_io(self.job_queue.enqueue, job)
+
+    def _stash_info(self, download_id: str, info: Dict[str, Any]) -> str:
+        """Store the raw info in S3 so the worker does not extract it again"""
+        info_key = f"downloads/jobs/{download_id}/info.json.gz"
+        body = json.dumps(_load_yt_dlp().YoutubeDL.sanitize_info(info, remove_private_keys=True))
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=info_key,
+            Body=gzip.compress(body.encode('utf-8')),
+            ContentType='application/json',
+            ContentEncoding='gzip'
+        )
+        return info_key
+
+    def _load_info(self, info_key: str) -> Optional[Dict[str, Any]]:
+        """Load stashed info, or None when it is gone and must be extracted again"""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=info_key)
+            return json.loads(gzip.decompress(response['Body'].read()))
+        except ClientError as e:
+            logger.warning(f"Stashed info {info_key} unavailable: {str(e)}")
+            return None
+
+    def run_job(
+        self,
+        job: Dict[str, Any],
+        deadline: Optional[float] = None,
+        attempt: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Run a queued download job (blocking, called by the worker).
+
+        A job that reaches ``deadline`` raises ``TransferInterrupted``; the
+        checkpoint on its record lets the next attempt carry on from there.
+        ``attempt`` is the queue's delivery count; without it the job is not
+        retried and a failure is final.
+        """
+        download_id = job['download_id']
+        
+        response = self.downloads_table.get_item(Key={'download_id': download_id})
+        record = response.get('Item')
+        if record is None:
+            logger.warning(f"Dropping job for missing download {download_id}")
+            return {'download_id': download_id, 'status': 'missing'}
+        if record.get('status') in TERMINAL_STATUSES:
+            # Redelivered after the job already finished or gave up
+            return {'download_id': download_id, 'status': record['status']}
+        
+        # Batch jobs skip the API-side cache check, so reuse content here
+        cached = self.content_cache.lookup(job['cache_key']) if job.get('cache_key') else None
+        if cached:
+            download_url = self._generate_download_url(cached['s3_key'])
+            self._write_download_record(download_id, {
+                'status': 'completed',
+                's3_key': cached['s3_key'],
+                'cache_hit': True,
+                'completed_at': datetime.utcnow().isoformat()
+            })
+            return {'download_id': download_id, 'status': 'completed', 'download_url': download_url}
+        
+        if job.get('cache_key'):
+            # Followers wait through retries and resumed runs; the worker
+            # heartbeat renews the lease again while a long run goes on
+            self.inflight.renew(job['cache_key'], download_id)
+        
+        checkpoint = record.get('checkpoint')
+        first_attempt = attempt is None or attempt <= 1
+        info = None
+        if job.get('info_key') and first_attempt and not checkpoint:
+            info = self._load_info(job['info_key'])
+        # Resumed and retried jobs extract again: the stashed format URLs may
+        # have expired, or be what made the last attempt fail
+        self._write_download_record(download_id, {'status': 'downloading'})
+        
+        result = self._download_to_s3(
+            job['video_url'],
+            job['quality'],
+            job['format_type'],
+            download_id,
+            job.get('cache_key'),
+            info,
+            checkpoint=checkpoint,
+            deadline=deadline,
+            user_id=record.get('user_id'),
+            timings=record.get('timings'),
+            format_id=job.get('format_id'),
+            clip=job.get('clip'),
+            attempt=attempt,
+            final=attempt is None or attempt >= self.job_max_attempts
+        )
+        
+        if job.get('info_key'):
+            try:
+                self.s3_client.delete_object(Bucket=self.bucket_name, Key=job['info_key'])
+            except ClientError as e:
+                logger.warning(f"Failed to delete stashed info: {str(e)}")
+        return result
+
+    async def create_batch(
+        self,
+        user_id: str,
+        video_urls: Optional[List[str]] = None,
+        playlist_url: Optional[str] = None,
+        quality: str = '720p',
+        format_type: str = 'mp4',
+        priority: str = 'normal',
+        check_quota: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Create one download per URL or playlist entry and fan the jobs out.
+
+        ``check_quota`` is awaited with the number of jobs once the entries
+        are known, before anything is written; it raises to refuse the batch.
+        """
+        batch_id = str(uuid.uuid4())
+        
+        if playlist_url:
+            entries = await self._expand_playlist(playlist_url, user_id, priority)
+        else:
+            entries = [{'url': url} for url in video_urls or []]
+        entries = entries[:self.batch_max_items]
+        if not entries:
+            raise CustomException(
+                ErrorCode.INVALID_REQUEST,
+                "Batch contains no videos",
+                {"batch_id": batch_id}
+            )
+        if check_quota:
+            # A playlist's size is only known here, after expansion
+            await check_quota(len(entries))
+        
+        format_selector = self._get_format_selector(quality, format_type)
+        jobs = []
+        records = []
+        for entry in entries:
+            download_id = str(uuid.uuid4())
+            video_info = self._summarize_entry(entry)
+            record = self._new_download_record(download_id, entry['url'], user_id)
+            record.update({
+                'status': 'queued',
+                'batch_id': batch_id,
+                'video_info': self._public_info(video_info)
+            })
+            records.append(record)
+            jobs.append({
+                'download_id': download_id,
+                'video_url': entry['url'],
+                'quality': quality,
+                'format_type': format_type,
+                'user_id': user_id,
+                'cache_key': self.content_cache.cache_key(video_info, format_selector, format_type)
+            })
+        
+        # The batch record has no created_at, so it stays out of the user index
+        records.append({
+            'download_id': batch_id,
+            'record_type': 'batch',
+            'user_id': user_id,
+            'download_ids': [job['download_id'] for job in jobs],
+            'playlist_url': playlist_url,
+            'submitted_at': datetime.utcnow().isoformat(),
+            'ttl': records[0]['ttl']
+        })
+        await self.run_io(self._write_records, records)
+        
+        if self.job_queue:
+            await self.run_io(self.job_queue.enqueue_many, jobs)
+        else:
+            # The transfer pool bounds how many of these run at once
+            for job in jobs:
+                self.scheduler.transfer.submit(user_id, priority, self.run_job, job)
+        
+        return {
+            'batch_id': batch_id,
+            'status': 'queued',
+            'count': len(jobs),
+            'download_ids': [job['download_id'] for job in jobs]
+        }
+
+    async def get_batch_status(self, batch_id: str, user_id: str) -> Dict[str, Any]:
+        """Get the aggregate status of a batch"""
+        try:
+            response = await self.run_io(
+                self.downloads_table.get_item,
+                Key={'download_id': batch_id}
+            )
+        except ClientError as e:
+            logger.error(f"Failed to get batch: {str(e)}")
+            raise CustomException(
+                ErrorCode.INTERNAL_ERROR,
+                "Failed to retrieve batch status"
+            )
+        
+        batch = response.get('Item')
+        if not batch or batch.get('record_type') != 'batch':
+            raise CustomException(ErrorCode.NOT_FOUND, "Batch not found")
+        if batch.get('user_id') != user_id:
+            raise CustomException(ErrorCode.FORBIDDEN, "Access denied")
+        
+        items = await self.run_io(self._batch_get_records, batch.get('download_ids', []))
+        counts = {}
+        for item in items:
+            counts[item.get('status', 'unknown')] = counts.get(item.get('status', 'unknown'), 0) + 1
+        pending = sum(n for status, n in counts.items() if status not in ('completed', 'failed'))
+        
+        return {
+            'batch_id': batch_id,
+            'status': 'in_progress' if pending else 'finished',
+            'total': len(batch.get('download_ids', [])),
+            'counts': counts,
+            'downloads': [self._with_download_url(item) for item in items]
+        }
+
+    async def _expand_playlist(
+        self,
+        playlist_url: str,
+        user_id: Optional[str],
+        priority: str
+    ) -> List[Dict[str, Any]]:
+        """List playlist entries with flat extraction (no per-video requests)"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'playlistend': self.batch_max_items,
+        }
+        
+        def extract_entries():
+            with _load_yt_dlp().YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(playlist_url, download=False)
+            if info.get('_type', 'video') == 'video':
+                return [{**info, 'url': playlist_url}]
+            return [
+                entry for entry in info.get('entries') or []
+                if entry and entry.get('url')
+            ]
+        
+        try:
+            return await self.scheduler.extract.run(user_id, priority, extract_entries)
+        except Exception as e:
+            logger.error(f"Failed to expand playlist: {str(e)}")
+            raise CustomException(
+                ErrorCode.INVALID_URL,
+                "Failed to extract playlist",
+                {"url": playlist_url, "error": str(e)}
+            )
+
+    def _summarize_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize a flat playlist entry or a bare URL without extracting it"""
+        extractor, video_id = _identify_video(entry['url'])
+        summary = self._summarize_info({
+            **entry,
+            'id': entry.get('id') or video_id,
+            'extractor_key': entry.get('ie_key') or entry.get('extractor_key') or extractor
+        })
+        return summary
+
+    def _batch_get_records(
+        self,
+        download_ids: List[str],
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch many download records with batch_get_item, optionally only ``fields`` (blocking)"""
+        table_name = self.downloads_table.name
+        projection = {}
+        if fields:
+            # Through placeholders, since status and others are reserved words
+            projection = {
+                'ProjectionExpression': ', '.join(f"#f{i}" for i in range(len(fields))),
+                'ExpressionAttributeNames': {f"#f{i}": field for i, field in enumerate(fields)}
+            }
+        items = []
+        for start in range(0, len(download_ids), 100):
+            request = {table_name: {'Keys': [
+                {'download_id': download_id}
+                for download_id in download_ids[start:start + 100]
+            ], **projection}}
+            attempt = 0
+            while request:
+                with self.metrics.timer('dynamodb.batch_get_item', timing='dynamodb'):
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                items.extend(from_dynamodb(response.get('Responses', {}).get(table_name, [])))
+                request = response.get('UnprocessedKeys') or None
+                if request:
+                    # Throttled keys come back unprocessed; back off and retry them
+                    attempt += 1
+                    if attempt > 5:
+                        raise RuntimeError("Too many unprocessed keys in batch_get_item")
+                    time.sleep(min(0.05 * 2 ** attempt, 1))
+        return items
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """Write many records with batch_write_item (blocking)"""
+        with self.metrics.timer('dynamodb.batch_write_item', timing='dynamodb'):
+            with self.downloads_table.batch_writer() as writer:
+                for record in records:
+                    writer.put_item(Item=record)
+
+    async def get_video_info(
+        self,
+        video_url: str,
+        user_id: Optional[str] = None,
+        priority: str = 'normal'
+    ) -> Dict[str, Any]:
+        """Get the summary of a video for a preview, without creating a download"""
+        return self._public_info(await self._get_video_info(video_url, user_id, priority))
+
+    async def get_video_infos(
+        self,
+        video_urls: List[str],
+        user_id: Optional[str] = None,
+        priority: str = 'normal'
+    ) -> Dict[str, Any]:
+        """Get the summaries of many videos, reporting failures per URL.
+
+        Cached summaries are fetched with batch reads; the rest are
+        extracted concurrently, at most ``info_concurrency`` at a time.
+        """
+        urls = list(dict.fromkeys(video_urls))
+        cache_keys = {url: _video_cache_key(url) for url in urls}
+        cached = await self.run_io(self.metadata_cache.get_many, list(cache_keys.values()))
+        semaphore = asyncio.Semaphore(self.info_concurrency)
+        
+        def failure(video_url: str, error_code: ErrorCode, message: str) -> Dict[str, Any]:
+            return {'url': video_url, 'status': 'failed', 'error': error_code.value, 'message': message}
+        
+        async def lookup(video_url: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    video_info = await self.get_video_info(video_url, user_id, priority)
+                    return {'url': video_url, 'status': 'ok', 'video_info': video_info}
+                except CustomException as e:
+                    return failure(video_url, e.error_code, e.message)
+        
+        # Cached summaries and cached failures are answered from the batch read
+        results = {}
+        for url in urls:
+            entry = cached.get(cache_keys[url])
+            if entry is None:
+                continue
+            if 'error' in entry:
+                results[url] = failure(url, ErrorCode.INVALID_URL, "Failed to extract video information")
+            else:
+                results[url] = {'url': url, 'status': 'ok', 'video_info': self._public_info(entry)}
+        misses = [url for url in urls if url not in results]
+        results.update(zip(misses, await asyncio.gather(*[lookup(url) for url in misses])))
+        return {
+            'results': [results[url] for url in video_urls],
+            'count': len(video_urls),
+            'failed': sum(1 for url in video_urls if results[url]['status'] == 'failed')
+        }
+
+    async def _get_video_info(
+        self,
+        video_url: str,
+        user_id: Optional[str] = None,
+        priority: str = 'normal'
+    ) -> Dict[str, Any]:
         """Get video information without downloading"""
+        video_info, _ = await self._extract_video_info(video_url, user_id, priority)
+        return video_info
+
+    async def _extract_video_info(
+        self,
+        video_url: str,
+        user_id: Optional[str] = None,
+        priority: str = 'normal'
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Extract video information once, returning the summary and the raw info.
+
+        The raw info is None when the summary was served from the metadata
+        cache or by an extraction of the same video already running in this
+        process; the download step then extracts it itself.
+        """
+        cache_key = _video_cache_key(video_url)
+        cached = await self.run_io(self.metadata_cache.get, cache_key)
+        if cached is not None:
+            if 'error' in cached:
+                raise CustomException(
+                    ErrorCode.INVALID_URL,
+                    "Failed to extract video information",
+                    {"url": video_url, "error": cached['error']}
+                )
+            return cached, None
+        
+        running = self._extractions.get(cache_key)
+        if running is not None:
+            return await asyncio.shield(running), None
+        running = self._extractions[cache_key] = asyncio.get_running_loop().create_future()
+        try:
+            video_info, info = await self._run_extraction(video_url, cache_key, user_id, priority)
+            running.set_result(video_info)
+            return video_info, info
+        except asyncio.CancelledError:
+            running.cancel()
+            raise
+        except Exception as e:
+            running.set_exception(e)
+            # Nobody may be waiting on it
+            running.exception()
+            raise
+        finally:
+            del self._extractions[cache_key]
+
+    async def _run_extraction(
+        self,
+        video_url: str,
+        cache_key: str,
+        user_id: Optional[str],
+        priority: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Extract with yt-dlp and cache the summary (or the failure)"""
         try:
             ydl_opts = {
                 'quiet': True,
@@ -85,47 +774,254 @@ class YouTubeDownloader:
                 'extract_flat': False,
             }
             
-            loop = asyncio.get_event_loop()
-            
             def extract_info():
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    return ydl.extract_info(video_url, download=False)
+                with _load_yt_dlp().YoutubeDL(ydl_opts) as ydl:
+                    # Format selection is left to the download step, which
+                    # processes this same result instead of extracting again
+                    return ydl.extract_info(video_url, download=False, process=False)
             
-            info = await loop.run_in_executor(self.executor, extract_info)
+            with self.metrics.timer('extract'):
+                info = await self.scheduler.extract.run(user_id, priority, extract_info)
+            video_info = self._summarize_info(info)
+            await self.run_io(self.metadata_cache.put, cache_key, video_info)
             
-            return {
-                'title': info.get('title', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'uploader': info.get('uploader', 'Unknown'),
-                'view_count': info.get('view_count', 0),
-                'upload_date': info.get('upload_date', ''),
-                'thumbnail': info.get('thumbnail', ''),
-                'formats_available': len(info.get('formats', []))
-            }
+            return video_info, info
             
         except Exception as e:
             logger.error(f"Failed to extract video info: {str(e)}")
+            await self.run_io(self.metadata_cache.put_failure, cache_key, str(e))
             raise CustomException(
                 ErrorCode.INVALID_URL,
                 "Failed to extract video information",
                 {"url": video_url, "error": str(e)}
             )
 
+    def _summarize_info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the video summary stored on the download record"""
+        thumbnail = info.get('thumbnail')
+        if not thumbnail and info.get('thumbnails'):
+            # Unprocessed results carry the candidate list only
+            best = max(
+                info['thumbnails'],
+                key=lambda t: (t.get('preference') or 0, t.get('width') or 0)
+            )
+            thumbnail = best.get('url')
+        
+        return {
+            'title': info.get('title', 'Unknown'),
+            # DynamoDB rejects floats, and some extractors report fractional durations
+            'duration': int(info.get('duration') or 0),
+            'uploader': info.get('uploader', 'Unknown'),
+            'view_count': info.get('view_count', 0),
+            'upload_date': info.get('upload_date', ''),
+            'thumbnail': thumbnail or '',
+            'formats_available': len(info.get('formats', [])),
+            'video_id': info.get('id'),
+            'extractor': info.get('extractor_key'),
+            # Cached with the summary so format selection works on cache hits
+            'formats': compact_formats(info.get('formats'))
+        }
+
+    def _public_info(self, video_info: Dict[str, Any]) -> Dict[str, Any]:
+        """The summary as stored on records and returned to clients, without the formats"""
+        return {key: value for key, value in video_info.items() if key != 'formats'}
+
+    def _resolve_clip(
+        self,
+        video_info: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        """Check the requested segment against the video; None means the whole video"""
+        if start is None and end is None:
+            return None
+        start = start or 0
+        duration = int(video_info.get('duration') or 0)
+        if duration:
+            if start >= duration:
+                raise CustomException(
+                    ErrorCode.INVALID_REQUEST,
+                    "Clip starts after the end of the video",
+                    {"field": "start", "duration": duration}
+                )
+            if end is not None and end >= duration:
+                end = None
+            if start == 0 and end is None:
+                # Shares the cached full download
+                return None
+        if not self.ffmpeg_available:
+            raise CustomException(
+                ErrorCode.UNSUPPORTED_FORMAT,
+                "Clips are not supported by this deployment",
+                {"field": "start" if start else "end"}
+            )
+        return {'start': start, 'end': end}
+
+    def _clip_fraction(self, video_info: Dict[str, Any], clip: Optional[Dict[str, Any]]) -> float:
+        """Share of the video a clip covers, for size and time estimates"""
+        duration = int(video_info.get('duration') or 0)
+        if not clip or not duration:
+            return 1.0
+        end = clip.get('end') or duration
+        return max(end - clip['start'], 1) / duration
+
+    def _plan_download(
+        self,
+        video_info: Dict[str, Any],
+        quality: str,
+        format_type: str,
+        clip: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Choose the format and estimate the job's duration (blocking).
+
+        Raises VIDEO_TOO_LARGE when the download would exceed the size
+        budget or cannot finish within the job time limit.
+        """
+        duration = int(video_info.get('duration') or 0)
+        fraction = self._clip_fraction(video_info, clip)
+        selected = select_format(
+            video_info.get('formats') or [],
+            quality,
+            format_type,
+            duration,
+            # The budget applies to what is fetched, i.e. the clip
+            int(self.max_download_bytes / fraction) if self.max_download_bytes else None
+        )
+        size = int(estimate_size(selected, duration, quality) * fraction)
+        if self.max_download_bytes and size > self.max_download_bytes:
+            raise CustomException(
+                ErrorCode.VIDEO_TOO_LARGE,
+                "Video exceeds the download size limit",
+                {"estimated_bytes": size, "limit_bytes": self.max_download_bytes}
+            )
+        
+        estimated_time = self._estimate_download_time(video_info, selected, quality, clip)
+        if self.job_time_limit and estimated_time > self.job_time_limit:
+            raise CustomException(
+                ErrorCode.VIDEO_TOO_LARGE,
+                "Video cannot be downloaded within the time limit",
+                {"estimated_time": estimated_time, "limit_seconds": self.job_time_limit}
+            )
+        return selected, estimated_time
+
     def _download_to_s3(
         self,
         video_url: str,
         quality: str,
         format_type: str,
-        download_id: str
+        download_id: str,
+        cache_key: Optional[str] = None,
+        info: Optional[Dict[str, Any]] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+        user_id: Optional[str] = None,
+        timings: Optional[Dict[str, int]] = None,
+        format_id: Optional[str] = None,
+        clip: Optional[Dict[str, Any]] = None,
+        attempt: Optional[int] = None,
+        final: bool = True
     ) -> Dict[str, Any]:
-        """Download video and upload to S3"""
+        """Download video and upload to S3.
+
+        ``checkpoint`` is the state a previous attempt left on the record;
+        the transfer resumes from it. With a ``deadline`` (monotonic time)
+        the transfer stops early and raises ``TransferInterrupted``. Stage
+        timings are added to ``timings`` and stored on the record.
+        ``format_id`` is the format chosen when the job was planned; without
+        it the format is chosen here. With a ``clip`` only that segment is
+        fetched, by ffmpeg, and cut at the nearest keyframes. A failure
+        that is not ``final`` leaves the record ``retrying`` for the queue's
+        next ``attempt``.
+        """
+        with self.metrics.job(timings) as timings:
+            return self._run_download(
+                video_url, quality, format_type, download_id, cache_key, info,
+                checkpoint, deadline, user_id, timings, format_id, clip,
+                attempt, final
+            )
+
+    def _run_download(
+        self,
+        video_url: str,
+        quality: str,
+        format_type: str,
+        download_id: str,
+        cache_key: Optional[str],
+        info: Optional[Dict[str, Any]],
+        checkpoint: Optional[Dict[str, Any]],
+        deadline: Optional[float],
+        user_id: Optional[str],
+        timings: Dict[str, int],
+        format_id: Optional[str],
+        clip: Optional[Dict[str, Any]] = None,
+        attempt: Optional[int] = None,
+        final: bool = True
+    ) -> Dict[str, Any]:
+        """Run a download while ``timings`` collects its stage timings"""
         temp_file = f"/tmp/{download_id}.{format_type}"
-        s3_key = f"downloads/{download_id}/{download_id}.{format_type}"
+        if cache_key:
+            s3_key = self.content_cache.s3_key(cache_key, format_type)
+        else:
+            s3_key = f"downloads/{download_id}/{download_id}.{format_type}"
+        
+        upload_args = {
+            'ContentType': self._get_content_type(format_type),
+            'Metadata': {
+                'download-id': download_id,
+                'original-url': video_url,
+                'format': format_type,
+                'quality': quality
+            }
+        }
+        if clip:
+            upload_args['Metadata']['clip'] = f"{clip['start']}-{clip.get('end') or ''}"
+        
+        # Progress is fire-and-forget so a slow table never stalls the transfer
+        progress = ProgressReporter(partial(self._write_download_record, download_id, wait=False))
+        started = time.perf_counter()
+        
+        def check_deadline(status):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TransferInterrupted(status.get('downloaded_bytes') or 0)
+        
+        postprocessing = {}
+        
+        def time_postprocessor(status):
+            name = status.get('postprocessor')
+            if status['status'] == 'started':
+                postprocessing[name] = time.perf_counter()
+            elif status['status'] == 'finished' and name in postprocessing:
+                elapsed_ms = (time.perf_counter() - postprocessing.pop(name)) * 1000
+                self.metrics.record('postprocess', elapsed_ms, postprocessor=name)
+        
+        def choose_format(ctx):
+            # yt-dlp format callback: the planned or a size-aware single-file
+            # format, else the quality selector (which may merge streams)
+            wanted = format_id
+            if wanted is None:
+                chosen = select_format(
+                    compact_formats(ctx['formats']),
+                    quality,
+                    format_type,
+                    int(info.get('duration') or 0),
+                    self.max_download_bytes
+                )
+                wanted = chosen['format_id'] if chosen else None
+            for f in ctx['formats']:
+                if wanted is not None and f.get('format_id') == wanted:
+                    return iter([f])
+            return ydl.build_format_selector(self._get_format_selector(quality, format_type))(ctx)
+        
+        def finish(outcome: str):
+            # Whole-job time is kept apart from the stages it contains
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            timings['job_ms'] = timings.get('job_ms', 0) + int(elapsed_ms)
+            self.metrics.observe('stage_duration_ms', elapsed_ms, stage='job', outcome=outcome)
         
         try:
             # Configure yt-dlp options
             ydl_opts = {
-                'format': self._get_format_selector(quality, format_type),
+                'format': choose_format,
                 'outtmpl': temp_file,
                 'writeinfojson': False,
                 'writesubtitles': False,
@@ -135,44 +1031,83 @@ class YouTubeDownloader:
                 'extractaudio': format_type in ['mp3', 'aac'],
                 'audioformat': format_type if format_type in ['mp3', 'aac'] else None,
                 'audioquality': '192' if format_type in ['mp3', 'aac'] else None,
+                'progress_hooks': [progress.hook, check_deadline],
+                'postprocessor_hooks': [time_postprocessor],
+                'concurrent_fragment_downloads': self.fragment_concurrency,
+                'retries': 10,
+                'fragment_retries': 10,
+                # Pick up the .part file an interrupted attempt left on this host
+                'continuedl': True,
             }
+            if clip:
+                # ffmpeg seeks into the source, so only the segment's bytes are fetched
+                ydl_opts['download_ranges'] = _load_yt_dlp().utils.download_range_func(
+                    None, [(clip['start'], clip.get('end') or float('inf'))]
+                )
+                ydl_opts['force_keyframes_at_cuts'] = self.clip_exact_cuts
             
-            # Download video
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-            
-            # Upload to S3
-            self.s3_client.upload_file(
-                temp_file,
-                self.bucket_name,
-                s3_key,
-                ExtraArgs={
-                    'ContentType': self._get_content_type(format_type),
-                    'Metadata': {
-                        'download-id': download_id,
-                        'original-url': video_url,
-                        'format': format_type,
-                        'quality': quality
-                    }
-                }
-            )
+            with _load_yt_dlp().YoutubeDL(ydl_opts) as ydl:
+                if info is None:
+                    with self.metrics.timer('extract'):
+                        info = ydl.extract_info(video_url, download=False, process=False)
+                # Resolve the format on a copy so the original can still be downloaded
+                with self.metrics.timer('select_format'):
+                    selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+                
+                transfer_started = time.perf_counter()
+                if not clip and self._can_stream(selected):
+                    # Stream straight into S3, no staging on local disk
+                    with self.metrics.timer('stream') as span:
+                        size_bytes = self._stream_to_s3(
+                            selected,
+                            s3_key,
+                            upload_args,
+                            progress,
+                            checkpoint=checkpoint,
+                            deadline=deadline
+                        )
+                        span['bytes'] = size_bytes
+                else:
+                    # Formats needing a merge or a non-HTTP protocol go through yt-dlp;
+                    # this includes the postprocessing, which is also timed on its own
+                    with self.metrics.timer('download') as span:
+                        ydl.process_ie_result(info, download=True)
+                        size_bytes = os.path.getsize(temp_file)
+                        span['bytes'] = size_bytes
+                    with self.metrics.timer('upload') as span:
+                        self.s3_client.upload_file(
+                            temp_file,
+                            self.bucket_name,
+                            s3_key,
+                            ExtraArgs=upload_args
+                        )
+                        span['bytes'] = size_bytes
+            # Feeds the download-time estimates of later jobs
+            self.throughput.observe(size_bytes, time.perf_counter() - transfer_started)
             
-            # Generate presigned URL (valid for 24 hours)
-            download_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': s3_key},
-                ExpiresIn=86400  # 24 hours
-            )
+            if cache_key:
+                self.content_cache.store(cache_key, s3_key, size_bytes)
+            if user_id:
+                self.quota.add(user_id, size_bytes=size_bytes, flush=True)
             
-            # Update download record
-            asyncio.create_task(
-                self._update_download_record(download_id, {
-                    'status': 'completed',
-                    's3_key': s3_key,
-                    'download_url': download_url,
-                    'completed_at': datetime.utcnow().isoformat()
-                })
-            )
+            # Update download record (this runs on a worker thread without a loop);
+            # the download URL is signed when the record is read
+            finish('completed')
+            self._write_download_record(download_id, {
+                'status': 'completed',
+                's3_key': s3_key,
+                'format_id': selected.get('format_id'),
+                'checkpoint': None,
+                'error': None,
+                'timings': timings,
+                'completed_at': datetime.utcnow().isoformat()
+            })
+            self._release_followers(cache_key, download_id, {
+                'status': 'completed',
+                's3_key': s3_key,
+                'format_id': selected.get('format_id'),
+                'completed_at': datetime.utcnow().isoformat()
+            })
             
             # Clean up temp file
             if os.path.exists(temp_file):
@@ -181,24 +1116,260 @@ class YouTubeDownloader:
             return {
                 'download_id': download_id,
                 'status': 'completed',
-                'download_url': download_url
+                'download_url': self._generate_download_url(s3_key)
             }
             
         except Exception as e:
+            interrupted = _find_interruption(e)
+            if interrupted:
+                # Checkpointed progress stays on the record for the next attempt
+                logger.info(f"Download {download_id} stopped at its deadline, will resume")
+                progress.flush()
+                finish('interrupted')
+                self._write_download_record(download_id, {'status': 'queued', 'timings': timings})
+                raise interrupted from e
+            
             logger.error(f"Download to S3 failed: {str(e)}")
-            # Update record with error
-            asyncio.create_task(
-                self._update_download_record(download_id, {
-                    'status': 'failed',
+            finish('failed')
+            if not final:
+                # The queue delivers the job again; clients keep polling
+                self._write_download_record(download_id, {
+                    'status': 'retrying',
                     'error': str(e),
-                    'failed_at': datetime.utcnow().isoformat()
+                    'attempt': attempt,
+                    'timings': timings
                 })
-            )
-            # Clean up temp file
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
+            # Update record with error
+            failure = {
+                'status': 'failed',
+                'error': str(e),
+                'failed_at': datetime.utcnow().isoformat()
+            }
+            self._write_download_record(download_id, {**failure, 'timings': timings})
+            self._release_followers(cache_key, download_id, failure)
+            # Only the finished output is removed: yt-dlp resumes from its .part file
             if os.path.exists(temp_file):
                 os.remove(temp_file)
             raise
 
+    def _release_followers(
+        self,
+        cache_key: Optional[str],
+        download_id: str,
+        outcome: Dict[str, Any]
+    ):
+        """Hand a leader's final outcome to the downloads following it (blocking)"""
+        if not cache_key:
+            return
+        followers = self.inflight.release(cache_key, download_id)
+        for follower_id in followers:
+            self.status_writer.submit(follower_id, outcome)
+        if followers:
+            logger.info(f"Download {download_id} finished for {len(followers)} followers")
+
+    async def _mirror_leader(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Show a follower's unfinished download with its leader's status and progress"""
+        try:
+            response = await self.run_io(
+                self.downloads_table.get_item,
+                Key={'download_id': item['leader_id']}
+            )
+        except ClientError as e:
+            logger.warning(f"Failed to read leader of {item['download_id']}: {str(e)}")
+            return item
+        return self._apply_leader(item, from_dynamodb(response.get('Item')))
+
+    def _apply_leader(self, item: Dict[str, Any], leader: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not leader:
+            return item
+        for key in ('status', 'progress', 's3_key', 'error'):
+            if key in leader:
+                item[key] = leader[key]
+        # Pollers see a change whenever either record changes
+        item['version'] = int(item.get('version', 0)) + int(leader.get('version', 0))
+        return item
+
+    def _generate_download_url(self, s3_key: str) -> str:
+        """Get a presigned URL for the object, signed at read time.
+
+        URLs are cached per (key, expiry bucket), so every URL handed out
+        stays valid for at least ``presign_expiry - presign_bucket`` seconds.
+        """
+        bucket = int(time.time() // self.presign_bucket)
+        url = self.presigned_urls.get((s3_key, bucket))
+        if url is None:
+            with self.metrics.timer('presign'):
+                url = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': s3_key},
+                    ExpiresIn=self.presign_expiry
+                )
+            self.presigned_urls.set((s3_key, bucket), url, ttl=self.presign_bucket)
+        return url
+
+    def _with_download_url(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach a fresh download URL to a completed record"""
+        if item.get('status') == 'completed' and item.get('s3_key'):
+            item['download_url'] = self._generate_download_url(item['s3_key'])
+        return item
+
+    def _can_stream(self, selected: Dict[str, Any]) -> bool:
+        """Check whether the selected format can be streamed directly to S3"""
+        return (
+            self.stream_uploads
+            and selected.get('_type', 'video') == 'video'
+            and not selected.get('requested_formats')
+            and selected.get('protocol') in ('http', 'https')
+            and bool(selected.get('url'))
+        )
+
+    def _stream_to_s3(
+        self,
+        selected: Dict[str, Any],
+        s3_key: str,
+        upload_args: Dict[str, Any],
+        progress: Optional[ProgressReporter] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None
+    ) -> int:
+        """Pipe the selected format into an S3 multipart upload.
+
+        When the size is known the copy runs as range transfers whose
+        completed parts are checkpointed on the record, so an interrupted
+        attempt can be resumed.
+        """
+        chunk_size = (selected.get('downloader_options') or {}).get('http_chunk_size')
+        total_bytes = selected.get('filesize') or selected.get('filesize_approx')
+        
+        size = probe_content_length(selected['url'], headers=selected.get('http_headers'))
+        # A single-part file is not worth checkpointing or splitting
+        if size and (size > self.stream_part_size or checkpoint):
+            upload_id, completed_parts = self._resume_point(checkpoint, s3_key, size)
+            transfer = ParallelRangeTransfer(
+                self.s3_client,
+                self.bucket_name,
+                s3_key,
+                selected['url'],
+                size,
+                part_size=self.stream_part_size,
+                concurrency=AdaptiveConcurrency(
+                    initial=self.transfer_initial_connections,
+                    maximum=self.transfer_connections
+                ),
+                headers=selected.get('http_headers'),
+                extra_args=upload_args,
+                upload_id=upload_id,
+                completed_parts=completed_parts,
+                deadline=deadline,
+                # Keep the parts for a retry; the lifecycle rule aborts abandoned uploads
+                abort_on_error=False
+            )
+            state = {
+                'upload_id': transfer.start(),
+                's3_key': s3_key,
+                'format_id': selected.get('format_id'),
+                'total_size': size,
+                'part_size': transfer.part_size
+            }
+            if progress:
+                progress.update(transfer.bytes_transferred, size, force=True, checkpoint=dict(state, parts=completed_parts))
+            
+            def on_part(parts):
+                if progress:
+                    progress.update(transfer.bytes_transferred, size, checkpoint=dict(state, parts=list(parts)))
+            
+            transfer.run(on_part=on_part)
+            logger.info(
+                f"Transferred {size} bytes to s3://{self.bucket_name}/{s3_key} "
+                f"({len(completed_parts)} parts resumed, final connection limit "
+                f"{transfer.concurrency.limit}, {transfer.concurrency.throttled} throttled responses)"
+            )
+            return size
+        
+        with S3MultipartWriter(
+            self.s3_client,
+            self.bucket_name,
+            s3_key,
+            part_size=self.stream_part_size,
+            max_buffered_parts=self.stream_buffered_parts,
+            extra_args=upload_args
+        ) as writer:
+            for block in iter_http_chunks(
+                selected['url'],
+                headers=selected.get('http_headers'),
+                chunk_size=chunk_size
+            ):
+                writer.write(block)
+                if progress:
+                    progress.update(writer.bytes_written, total_bytes)
+        
+        logger.info(f"Streamed {writer.bytes_written} bytes to s3://{self.bucket_name}/{s3_key}")
+        return writer.bytes_written
+
+    def _resume_point(
+        self,
+        checkpoint: Optional[Dict[str, Any]],
+        s3_key: str,
+        size: int
+    ) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Get the upload id and parts to resume from, verified against S3"""
+        if not checkpoint:
+            return None, []
+        if (
+            checkpoint.get('s3_key') != s3_key
+            or int(checkpoint.get('total_size', 0)) != size
+            or int(checkpoint.get('part_size', 0)) != self.stream_part_size
+        ):
+            # A different format or part layout; the old parts cannot be reused
+            logger.info(f"Discarding checkpoint for upload {checkpoint.get('upload_id')}")
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=checkpoint.get('s3_key'),
+                    UploadId=checkpoint.get('upload_id')
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort stale upload: {str(e)}")
+            return None, []
+        
+        uploaded = list_uploaded_parts(self.s3_client, self.bucket_name, s3_key, checkpoint['upload_id'])
+        if uploaded is None:
+            return None, []
+        
+        # S3 is the source of truth: it may hold parts the last checkpoint missed
+        part_size = self.stream_part_size
+        complete = [
+            {'PartNumber': p['PartNumber'], 'ETag': p['ETag']}
+            for p in uploaded
+            if p['Size'] == min(part_size, size - (p['PartNumber'] - 1) * part_size)
+        ]
+        logger.info(f"Resuming upload {checkpoint['upload_id']} with {len(complete)} parts done")
+        return checkpoint['upload_id'], complete
+
+    async def run_io(self, func, *args, **kwargs):
+        """Run a blocking storage call on the I/O executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, partial(func, *args, **kwargs))
+
+    def _new_download_record(
+        self,
+        download_id: str,
+        video_url: str,
+        user_id: str
+    ) -> Dict[str, Any]:
+        """Build a new download record"""
+        return {
+            'download_id': download_id,
+            'user_id': user_id,
+            'video_url': video_url,
+            'status': 'initiated',
+            'created_at': datetime.utcnow().isoformat(),
+            'ttl': int((datetime.utcnow().timestamp() + 7 * 24 * 3600))  # 7 days TTL
+        }
+
     async def _create_download_record(
         self,
         download_id: str,
@@ -207,15 +1378,9 @@ class YouTubeDownloader:
     ):
         """Create download record in DynamoDB"""
         try:
-            self.downloads_table.put_item(
-                Item={
-                    'download_id': download_id,
-                    'user_id': user_id,
-                    'video_url': video_url,
-                    'status': 'initiated',
-                    'created_at': datetime.utcnow().isoformat(),
-                    'ttl': int((datetime.utcnow().timestamp() + 7 * 24 * 3600))  # 7 days TTL
-                }
+            await self.run_io(
+                self.downloads_table.put_item,
+                Item=self._new_download_record(download_id, video_url, user_id)
             )
         except ClientError as e:
             logger.error(f"Failed to create download record: {str(e)}")
@@ -227,28 +1392,129 @@ class YouTubeDownloader:
         updates: Dict[str, Any]
     ):
         """Update download record in DynamoDB"""
+        await self.run_io(self._write_download_record, download_id, updates)
+
+    def _write_download_record(
+        self,
+        download_id: str,
+        updates: Dict[str, Any],
+        wait: bool = True
+    ):
+        """Update download record in DynamoDB (blocking unless ``wait`` is False).
+
+        Failures are logged by the status writer. Only a terminal state that
+        could not be stored raises, so the job fails and is retried instead
+        of looking like it is still running.
+        """
+        future = self.status_writer.submit(download_id, updates)
+        if not wait:
+            return
         try:
-            update_expression = "SET "
-            expression_values = {}
-            
-            for key, value in updates.items():
-                update_expression += f"{key} = :{key}, "
-                expression_values[f":{key}"] = value
-            
-            update_expression = update_expression.rstrip(", ")
+            future.result()
+        except Exception:
+            if updates.get('status') in TERMINAL_STATUSES:
+                raise
+
+    def _put_download_update(
+        self,
+        download_id: str,
+        updates: Dict[str, Any]
+    ):
+        """Apply updates to a download record with one UpdateItem (blocking)"""
+        update_expression = "SET "
+        expression_names = {}
+        expression_values = {}
+        
+        # Attribute names go through placeholders: status and ttl are reserved words
+        for key, value in updates.items():
+            update_expression += f"#{key} = :{key}, "
+            expression_names[f"#{key}"] = key
+            expression_values[f":{key}"] = value
+        
+        update_expression = update_expression.rstrip(", ")
+        
+        # Every write bumps the version so pollers can tell when something changed
+        update_expression += " ADD #version :one"
+        expression_names['#version'] = 'version'
+        expression_values[':one'] = 1
+        
+        self.downloads_table.update_item(
+            Key={'download_id': download_id},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames=expression_names,
+            ExpressionAttributeValues=expression_values
+        )
+
+    async def get_download_status(
+        self,
+        download_id: str,
+        user_id: str,
+        wait: float = 0,
+        since: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get download status.
+
+        With ``wait`` the call long-polls: it returns as soon as the record's
+        version differs from ``since`` or the download has finished, and at
+        the latest after ``wait`` seconds.
+        """
+        deadline = time.monotonic() + min(wait, self.status_max_wait)
+        while True:
+            item = await self._read_download_record(download_id, user_id)
+            if item.get('leader_id') and item.get('status') not in TERMINAL_STATUSES:
+                item = await self._mirror_leader(item)
+            if (
+                since is None
+                or int(item.get('version', 0)) != since
+                or item.get('status') in TERMINAL_STATUSES
+                or time.monotonic() >= deadline
+            ):
+                return self._with_download_url(item)
+            await asyncio.sleep(min(self.status_poll_interval, max(deadline - time.monotonic(), 0)))
+
+    async def get_download_statuses(self, download_ids: List[str], user_id: str) -> Dict[str, Any]:
+        """Get the status of many downloads with batch reads of the status fields only.
+
+        Ids that do not exist or belong to another user are listed under
+        ``not_found`` alike, so the response does not reveal other users' ids.
+        """
+        download_ids = list(dict.fromkeys(download_ids))
+        try:
+            items = await self.run_io(self._batch_get_records, download_ids, STATUS_FIELDS)
+            found = {
+                item['download_id']: item for item in items
+                if item.get('user_id') == user_id
+            }
             
-            self.downloads_table.update_item(
-                Key={'download_id': download_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_values
+            # Followers still waiting show their leaders' progress
+            leader_ids = {
+                item['leader_id'] for item in found.values()
+                if item.get('leader_id') and item.get('status') not in TERMINAL_STATUSES
+            }
+            if leader_ids:
+                leaders = await self.run_io(self._batch_get_records, sorted(leader_ids), STATUS_FIELDS)
+                leaders = {leader['download_id']: leader for leader in leaders}
+                for item in found.values():
+                    if item.get('leader_id') in leaders and item.get('status') not in TERMINAL_STATUSES:
+                        self._apply_leader(item, leaders[item['leader_id']])
+        except (ClientError, RuntimeError) as e:
+            logger.error(f"Failed to get download statuses: {str(e)}")
+            raise CustomException(
+                ErrorCode.INTERNAL_ERROR,
+                "Failed to retrieve download status"
             )
-        except ClientError as e:
-            logger.error(f"Failed to update download record: {str(e)}")
+        
+        return {
+            'downloads': [self._with_download_url(found[i]) for i in download_ids if i in found],
+            'count': len(found),
+            'not_found': [i for i in download_ids if i not in found]
+        }
 
-    async def get_download_status(self, download_id: str, user_id: str) -> Dict[str, Any]:
-        """Get download status"""
+    async def _read_download_record(self, download_id: str, user_id: str) -> Dict[str, Any]:
+        """Fetch a download record and check ownership"""
         try:
-            response = self.downloads_table.get_item(
+            response = await self.run_io(
+                self.downloads_table.get_item,
                 Key={'download_id': download_id}
             )
             
@@ -267,7 +1533,8 @@ class YouTubeDownloader:
                     "Access denied"
                 )
             
-            return item
+            # Plain types from here on, so responses need no Decimal handling
+            return from_dynamodb(item)
             
         except ClientError as e:
             logger.error(f"Failed to get download status: {str(e)}")
@@ -280,22 +1547,37 @@ class YouTubeDownloader:
         self,
         user_id: str,
         limit: int = 10,
-        offset: int = 0
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """List user downloads"""
+        """List user downloads, newest first"""
+        query_args = {
+            'IndexName': self.user_index_name,
+            'KeyConditionExpression': 'user_id = :user_id',
+            'ExpressionAttributeValues': {':user_id': user_id},
+            'ScanIndexForward': False,
+            'Limit': max(1, min(limit, 100))
+        }
+        if cursor:
+            start_key = _decode_cursor(cursor)
+            # Never let a token resume inside another user's partition
+            if start_key.get('user_id') != user_id:
+                raise CustomException(
+                    ErrorCode.INVALID_REQUEST,
+                    "Invalid pagination cursor",
+                    {"field": "cursor"}
+                )
+            query_args['ExclusiveStartKey'] = start_key
+        
         try:
-            # Note: This is a simplified implementation
-            # In production, you'd want to use GSI for efficient querying
-            response = self.downloads_table.scan(
-                FilterExpression='user_id = :user_id',
-                ExpressionAttributeValues={':user_id': user_id},
-                Limit=limit
-            )
+            response = await self.run_io(self.downloads_table.query, **query_args)
+            items = from_dynamodb(response.get('Items', []))
+            next_cursor = _encode_cursor(response.get('LastEvaluatedKey'))
             
             return {
-                'downloads': response.get('Items', []),
-                'count': len(response.get('Items', [])),
-                'has_more': 'LastEvaluatedKey' in response
+                'downloads': [self._with_download_url(item) for item in items],
+                'count': len(items),
+                'has_more': next_cursor is not None,
+                'next_cursor': next_cursor
             }
             
         except ClientError as e:
@@ -333,9 +1615,14 @@ class YouTubeDownloader:
         }
         return content_types.get(format_type, 'application/octet-stream')
 
-    def _estimate_download_time(self, video_info: Dict[str, Any]) -> int:
-        """Estimate download time in seconds"""
-        duration = video_info.get('duration', 0)
-        # Simple estimation: assume 1:1 ratio for download time
-        # In reality, this depends on video quality, network speed, etc.
-        return max(30, duration // 2)  # Minimum 30 seconds
\ No newline at end of file
+    def _estimate_download_time(
+        self,
+        video_info: Dict[str, Any],
+        selected: Optional[Dict[str, Any]] = None,
+        quality: str = 'best',
+        clip: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Estimate download time in seconds from the format's size and recent throughput (blocking)"""
+        size = estimate_size(selected, int(video_info.get('duration') or 0), quality)
+        size *= self._clip_fraction(video_info, clip)
+        return int(self.estimate_overhead + size / self.throughput.rate())
\ No newline at end of file
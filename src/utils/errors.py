@@ -17,6 +17,7 @@ class ErrorCode(Enum):
     DOWNLOAD_FAILED = "DOWNLOAD_FAILED"
     DOWNLOAD_TIMEOUT = "DOWNLOAD_TIMEOUT"
     VIDEO_UNAVAILABLE = "VIDEO_UNAVAILABLE"
+    VIDEO_TOO_LARGE = "VIDEO_TOO_LARGE"
     
     # System errors
     INTERNAL_ERROR = "INTERNAL_ERROR"
@@ -67,6 +68,7 @@ class CustomException(Exception):
             
             # 422 Unprocessable Entity
             ErrorCode.DOWNLOAD_FAILED: 422,
+            ErrorCode.VIDEO_TOO_LARGE: 422,
             
             # 429 Too Many Requests
             ErrorCode.RATE_LIMIT_EXCEEDED: 429,
@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# Height cap per requested quality; None takes the best available
+QUALITY_HEIGHTS = {
+    '144p': 144,
+    '240p': 240,
+    '360p': 360,
+    '480p': 480,
+    '720p': 720,
+    '1080p': 1080,
+    'best': None
+}
+
+AUDIO_FORMATS = ('mp3', 'aac')
+
+# Typical total bitrates (kbit/s) by height, for formats that report neither size nor bitrate
+TYPICAL_BITRATES_KBPS = ((144, 150), (240, 300), (360, 700), (480, 1200), (720, 2500), (1080, 5000))
+AUDIO_BITRATE_KBPS = 160
+
+
+def compact_formats(formats: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Keep the fields format selection needs, dropping storyboards and the like"""
+    compact = []
+    for f in formats or []:
+        vcodec, acodec = f.get('vcodec'), f.get('acodec')
+        if vcodec == 'none' and acodec == 'none':
+            continue
+        compact.append({
+            'format_id': f.get('format_id'),
+            'ext': f.get('ext'),
+            'height': int(f['height']) if f.get('height') else None,
+            'video': vcodec != 'none',
+            # Unknown codecs (generic extractor, direct links) are treated as muxed
+            'audio': acodec != 'none',
+            # Unprocessed results may not name the protocol yet
+            'protocol': f.get('protocol') or (f.get('url') or '').split(':', 1)[0] or None,
+            # DynamoDB rejects floats
+            'filesize': int(f.get('filesize') or f.get('filesize_approx') or 0) or None,
+            'tbr': int(f['tbr']) if f.get('tbr') else None
+        })
+    return compact
+
+
+def estimate_size(fmt: Optional[Dict[str, Any]], duration: int, quality: str = 'best') -> int:
+    """Expected size in bytes of a format, or of a typical one for the quality"""
+    if fmt:
+        if fmt.get('filesize'):
+            return int(fmt['filesize'])
+        if fmt.get('tbr') and duration:
+            return int(fmt['tbr'] * 1000 / 8 * duration)
+        height = fmt.get('height')
+    else:
+        height = QUALITY_HEIGHTS.get(quality)
+    if fmt and not fmt.get('video'):
+        kbps = AUDIO_BITRATE_KBPS
+    else:
+        kbps = next((rate for cap, rate in TYPICAL_BITRATES_KBPS if height and height <= cap), 8000)
+    return int(kbps * 1000 / 8 * (duration or 0))
+
+
+def select_format(
+    formats: List[Dict[str, Any]],
+    quality: str,
+    format_type: str,
+    duration: int,
+    max_bytes: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Pick a single-file format from compact ``formats``.
+
+    Video requests prefer progressive HTTP formats, which need no merge and
+    stream straight to S3, as long as one matches the tallest height
+    available under the quality's cap; a lower-resolution progressive file
+    is not worth the skipped merge. Within ``max_bytes``, the requested
+    container and then the higher bitrate win. Returns None when nothing
+    qualifies; the caller then falls back to a yt-dlp format selector,
+    which may merge separate streams.
+    """
+    fits = (lambda f: estimate_size(f, duration) <= max_bytes) if max_bytes else (lambda f: True)
+
+    if format_type in AUDIO_FORMATS:
+        candidates = [f for f in formats if f['audio'] and not f['video'] and fits(f)]
+        return max(candidates, key=lambda f: f.get('tbr') or 0, default=None)
+
+    cap = QUALITY_HEIGHTS.get(quality, 720)
+    under_cap = [
+        f for f in formats
+        if f['video'] and (cap is None or (f.get('height') or 0) <= cap)
+    ]
+    target = max((f.get('height') or 0 for f in under_cap), default=0)
+    candidates = [
+        f for f in under_cap
+        if f['audio']
+        and f.get('protocol') in ('http', 'https')
+        and (f.get('height') or 0) >= target
+        and fits(f)
+    ]
+    return max(
+        candidates,
+        key=lambda f: (f.get('ext') == format_type, f.get('tbr') or 0),
+        default=None
+    )
+
+
+class ThroughputEstimator:
+    """Recent transfer throughput, shared between containers through the cache table.
+
+    Each container keeps an exponentially weighted average of what its own
+    transfers achieved and publishes it at most every ``sync_interval``
+    seconds. Containers that transfer nothing themselves, like the API when
+    jobs go to the queue, read the published value instead.
+    """
+
+    KEY = 'stats#throughput'
+
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(os.getenv('CACHE_TABLE_NAME', 'download-cache'))
+        self.default_rate = float(os.getenv('TRANSFER_THROUGHPUT_MBPS', '8')) * 1024 * 1024
+        self.sync_interval = float(os.getenv('THROUGHPUT_SYNC_SECONDS', '60'))
+        self.smoothing = 0.3
+        self.local_rate = None
+        self.shared_rate = None
+        self._published_at = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def observe(self, size_bytes: int, seconds: float):
+        """Fold in a finished transfer (blocking when it is time to publish)"""
+        if size_bytes <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            rate = size_bytes / seconds
+            if self.local_rate is None:
+                self.local_rate = rate
+            else:
+                self.local_rate += self.smoothing * (rate - self.local_rate)
+            now = time.monotonic()
+            due = self._published_at is None or now - self._published_at >= self.sync_interval
+            if due:
+                self._published_at = now
+            local_rate = self.local_rate
+
+        if due:
+            try:
+                self.table.put_item(Item={
+                    'cache_key': self.KEY,
+                    'bytes_per_second': int(local_rate),
+                    'expires_at': int(time.time()) + 24 * 3600
+                })
+            except (BotoCoreError, ClientError) as e:
+                logger.warning(f"Failed to publish throughput: {str(e)}")
+
+    def rate(self) -> float:
+        """Expected bytes per second (blocking when the shared value is stale)"""
+        if self.local_rate is not None:
+            return self.local_rate
+
+        now = time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= self.sync_interval:
+            self._refreshed_at = now
+            try:
+                item = self.table.get_item(Key={'cache_key': self.KEY}).get('Item')
+                if item and int(item.get('expires_at', 0)) > time.time():
+                    self.shared_rate = float(item['bytes_per_second'])
+            except (BotoCoreError, ClientError) as e:
+                logger.warning(f"Failed to read throughput: {str(e)}")
+        return self.shared_rate or self.default_rate
@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+
+class InflightDownloads:
+    """Single-flight registry for downloads of the same content.
+
+    The first download of a content cache key takes a lease on it in the
+    cache table with a conditional write and becomes the leader. Downloads
+    of the same key that start while the lease is held, in this container
+    or any other, join it as followers instead of transferring the same
+    bytes again. The leader renews the lease while it works, and when it
+    finishes it releases the lease and gets back the followers, which then
+    take on its outcome. A leader that dies without releasing blocks nobody
+    for longer than the lease; the download that takes the lease over
+    inherits its followers.
+    """
+
+    KEY_PREFIX = 'inflight#'
+
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(os.getenv('CACHE_TABLE_NAME', 'download-cache'))
+        self.enabled = os.getenv('COALESCE_DOWNLOADS', 'true').lower() == 'true'
+        self.lease_seconds = int(os.getenv('INFLIGHT_LEASE_SECONDS', '1800'))
+        # Leaders running in this process, so joining them skips the failed conditional write
+        self._leaders: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def join(self, cache_key: str, download_id: str) -> Optional[str]:
+        """Lead or follow the download of ``cache_key`` (blocking).
+
+        Returns the leader's download id when another download already
+        holds the lease, and None when ``download_id`` should run itself:
+        it then leads, or the registry could not be reached and it runs
+        uncoordinated.
+        """
+        if not self.enabled:
+            return None
+
+        # A leader that released between our two calls is retried once
+        for _ in range(2):
+            with self._lock:
+                leader_id = self._leaders.get(cache_key)
+            if leader_id is None:
+                if self._acquire(cache_key, download_id):
+                    return None
+            leader_id = self._follow(cache_key, download_id)
+            if leader_id is not None:
+                return leader_id
+        return None
+
+    def release(self, cache_key: str, download_id: str) -> List[str]:
+        """Give up the lease held by ``download_id`` and return its followers (blocking)"""
+        if not self.enabled:
+            return []
+
+        with self._lock:
+            if self._leaders.get(cache_key) == download_id:
+                del self._leaders[cache_key]
+        try:
+            response = self.table.delete_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                ConditionExpression='leader_id = :leader_id',
+                ExpressionAttributeValues={':leader_id': download_id},
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                logger.error(f"Failed to release in-flight download {download_id}: {str(e)}")
+            # Not (or no longer) the leader, so nobody is waiting on it
+            return []
+        except BotoCoreError as e:
+            logger.error(f"Failed to release in-flight download {download_id}: {str(e)}")
+            return []
+        return sorted(response.get('Attributes', {}).get('followers') or [])
+
+    def renew(self, cache_key: str, download_id: str) -> bool:
+        """Extend the lease held by ``download_id``; False when it is not the leader (blocking)"""
+        if not self.enabled:
+            return False
+
+        try:
+            self.table.update_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                UpdateExpression='SET expires_at = :expires_at',
+                ConditionExpression='leader_id = :leader_id',
+                ExpressionAttributeValues={
+                    ':leader_id': download_id,
+                    ':expires_at': int(time.time()) + self.lease_seconds
+                }
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                logger.error(f"Failed to renew in-flight lease of {download_id}: {str(e)}")
+            return False
+        except BotoCoreError as e:
+            logger.error(f"Failed to renew in-flight lease of {download_id}: {str(e)}")
+            return False
+        return True
+
+    def _acquire(self, cache_key: str, download_id: str) -> bool:
+        """Take the lease; False when a live leader holds it"""
+        now = int(time.time())
+        try:
+            # An update rather than a put: followers of an expired leader stay on
+            self.table.update_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                UpdateExpression='SET leader_id = :leader_id, expires_at = :expires_at',
+                ConditionExpression='attribute_not_exists(cache_key) OR expires_at < :now',
+                ExpressionAttributeValues={
+                    ':leader_id': download_id,
+                    ':expires_at': now + self.lease_seconds,
+                    ':now': now
+                }
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            logger.error(f"Failed to take in-flight lease: {str(e)}")
+            return True
+        except BotoCoreError as e:
+            logger.error(f"Failed to take in-flight lease: {str(e)}")
+            return True
+
+        with self._lock:
+            self._leaders[cache_key] = download_id
+        return True
+
+    def _follow(self, cache_key: str, download_id: str) -> Optional[str]:
+        """Register as a follower of the live leader; None when there is none"""
+        try:
+            response = self.table.update_item(
+                Key={'cache_key': self.KEY_PREFIX + cache_key},
+                UpdateExpression='ADD followers :follower',
+                ConditionExpression='attribute_exists(cache_key) AND expires_at >= :now',
+                ExpressionAttributeValues={
+                    ':follower': {download_id},
+                    ':now': int(time.time())
+                },
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                logger.error(f"Failed to join in-flight download: {str(e)}")
+            with self._lock:
+                self._leaders.pop(cache_key, None)
+            return None
+        except BotoCoreError as e:
+            logger.error(f"Failed to join in-flight download: {str(e)}")
+            return None
+        return response['Attributes']['leader_id']
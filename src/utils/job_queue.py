@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    payload: Dict[str, Any]
+    receipt: str
+    attempts: int
+
+
+class SQSJobQueue:
+    """Job queue backed by SQS; a lease is the message visibility timeout"""
+
+    def __init__(self, queue_url: str, sqs_client=None):
+        self.queue_url = queue_url
+        self.sqs = sqs_client or boto3.client('sqs')
+
+    def enqueue(self, payload: Dict[str, Any]):
+        """Add a job to the queue"""
+        self.sqs.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(payload))
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]):
+        """Add several jobs, ten messages per request"""
+        for start in range(0, len(payloads), 10):
+            batch = payloads[start:start + 10]
+            response = self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {'Id': str(i), 'MessageBody': json.dumps(payload)}
+                    for i, payload in enumerate(batch)
+                ]
+            )
+            if response.get('Failed'):
+                raise RuntimeError(f"Failed to enqueue {len(response['Failed'])} jobs")
+
+    def claim(self, lease_seconds: int, wait_seconds: int = 0) -> Optional[Job]:
+        """Take the next job, hiding it from other workers for the lease"""
+        response = self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=1,
+            VisibilityTimeout=lease_seconds,
+            WaitTimeSeconds=wait_seconds,
+            AttributeNames=['ApproximateReceiveCount']
+        )
+        messages = response.get('Messages', [])
+        if not messages:
+            return None
+
+        message = messages[0]
+        return Job(
+            payload=json.loads(message['Body']),
+            receipt=message['ReceiptHandle'],
+            attempts=int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1))
+        )
+
+    def extend(self, job: Job, lease_seconds: int):
+        """Extend the lease of a job still being worked on"""
+        self.sqs.change_message_visibility(
+            QueueUrl=self.queue_url,
+            ReceiptHandle=job.receipt,
+            VisibilityTimeout=lease_seconds
+        )
+
+    def complete(self, job: Job):
+        """Remove a finished job"""
+        self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=job.receipt)
+
+    def release(self, job: Job, delay_seconds: int = 0):
+        """Give a job back so another worker can retry it"""
+        self.extend(job, delay_seconds)
+
+    def dead_letter(self, job: Job):
+        """Give up on a job that used all its attempts"""
+        # Visible again at once, so the redrive policy moves it to the DLQ
+        self.extend(job, 0)
+
+
+class SQLiteJobQueue:
+    """Local stand-in for SQS with the same lease semantics, for dev and tests"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " body TEXT NOT NULL,"
+                " receipt TEXT,"
+                " lease_until REAL NOT NULL DEFAULT 0,"
+                " attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_jobs ("
+                " id INTEGER PRIMARY KEY,"
+                " body TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL,"
+                " failed_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so two workers can never
+        # claim the same row
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, payload: Dict[str, Any]):
+        """Add a job to the queue"""
+        self.enqueue_many([payload])
+
+    def enqueue_many(self, payloads: List[Dict[str, Any]]):
+        """Add several jobs in one transaction"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO jobs (body) VALUES (?)",
+                [(json.dumps(payload),) for payload in payloads]
+            )
+
+    def claim(self, lease_seconds: int, wait_seconds: int = 0) -> Optional[Job]:
+        """Take the next job, hiding it from other workers for the lease"""
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            job = self._claim_once(lease_seconds)
+            if job or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.2)
+
+    def _claim_once(self, lease_seconds: int) -> Optional[Job]:
+        now = time.time()
+        receipt = str(uuid.uuid4())
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, body, attempts FROM jobs WHERE lease_until <= ? ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET receipt = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (receipt, now + lease_seconds, row[0])
+            )
+        return Job(payload=json.loads(row[1]), receipt=receipt, attempts=row[2] + 1)
+
+    def extend(self, job: Job, lease_seconds: int):
+        """Extend the lease of a job still being worked on"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE receipt = ?",
+                (time.time() + lease_seconds, job.receipt)
+            )
+
+    def complete(self, job: Job):
+        """Remove a finished job"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE receipt = ?", (job.receipt,))
+
+    def release(self, job: Job, delay_seconds: int = 0):
+        """Give a job back so another worker can retry it"""
+        self.extend(job, delay_seconds)
+
+    def dead_letter(self, job: Job):
+        """Move a job that used all its attempts to the dead_jobs table"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO dead_jobs (id, body, attempts, failed_at)"
+                " SELECT id, body, attempts, ? FROM jobs WHERE receipt = ?",
+                (time.time(), job.receipt)
+            )
+            conn.execute("DELETE FROM jobs WHERE receipt = ?", (job.receipt,))
+
+
+def create_job_queue(queue_url: Optional[str] = None):
+    """Build the job queue named by JOB_QUEUE_URL, or None when jobs run in-process.
+
+    ``sqlite:///path/to/jobs.db`` selects the local queue, anything else is
+    treated as an SQS queue URL.
+    """
+    queue_url = queue_url or os.getenv('JOB_QUEUE_URL')
+    if not queue_url:
+        return None
+    if queue_url.startswith('sqlite:///'):
+        return SQLiteJobQueue(queue_url[len('sqlite:///'):])
+    return SQSJobQueue(queue_url)
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the duration histogram buckets, in milliseconds
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+# CloudWatch accepts at most 100 values per metric in one EMF document
+EMF_MAX_VALUES = 100
+
+# Stage timings of the job running in this context, if any
+_job_timings: ContextVar[Optional[Dict[str, int]]] = ContextVar('job_timings', default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Iterable[float] = DURATION_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Durations, byte counts and outcomes of the pipeline stages.
+
+    Everything is aggregated in-process for the Prometheus endpoint. When
+    EMF is on (the default inside Lambda) the raw values are also buffered
+    and ``flush`` writes them to stdout in CloudWatch Embedded Metric
+    Format, which Lambda turns into metrics without any API calls.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+        self.namespace = os.getenv('METRICS_NAMESPACE', 'YouTubeDownloader')
+        in_lambda = bool(os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
+        self.emf = os.getenv('METRICS_EMF', str(in_lambda)).lower() == 'true'
+        # The Prometheus endpoint is for local runs; API Gateway would make it public
+        self.endpoint_enabled = os.getenv('METRICS_ENDPOINT', str(not in_lambda)).lower() == 'true'
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._pending: Dict[Labels, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, unit: str = 'Milliseconds', **labels):
+        """Record one value of a distribution"""
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            self._buffer(key, value, unit)
+
+    def increment(self, name: str, value: float = 1, unit: str = 'Count', **labels):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._buffer(key, value, unit)
+
+    @contextmanager
+    def timer(self, stage: str, timing: Optional[str] = None, **labels):
+        """Time a stage; the yielded dict takes an ``outcome`` and a ``bytes`` count.
+
+        The duration also adds to ``<timing>_ms`` (default: the stage name)
+        of the job being timed in this context, see ``job``.
+        """
+        span = {'outcome': 'ok', 'bytes': 0}
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            if span['outcome'] == 'ok':
+                span['outcome'] = 'error'
+            raise
+        finally:
+            self.record(
+                stage,
+                (time.perf_counter() - started) * 1000,
+                outcome=span['outcome'],
+                size_bytes=span['bytes'],
+                timing=timing,
+                **labels
+            )
+
+    def record(
+        self,
+        stage: str,
+        elapsed_ms: float,
+        outcome: str = 'ok',
+        size_bytes: int = 0,
+        timing: Optional[str] = None,
+        **labels
+    ):
+        """Record a stage that was timed by other means, e.g. from a callback"""
+        self.observe('stage_duration_ms', elapsed_ms, stage=stage, outcome=outcome, **labels)
+        if size_bytes:
+            self.increment('stage_bytes', size_bytes, unit='Bytes', stage=stage, **labels)
+        timings = _job_timings.get()
+        if timings is not None:
+            key = f"{timing or stage}_ms"
+            timings[key] = timings.get(key, 0) + int(elapsed_ms)
+
+    @contextmanager
+    def job(self, timings: Optional[Dict[str, int]] = None):
+        """Collect the stage timings of one job run in this context into a dict.
+
+        ``timings`` carries over what earlier steps of the same job recorded.
+        """
+        timings = {key: int(value) for key, value in (timings or {}).items()}
+        token = _job_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _job_timings.reset(token)
+
+    def instrument(self, target, component: str, methods: Iterable[str]):
+        """Wrap ``target`` so calls to ``methods`` are timed as ``<component>.<method>``"""
+        return _Instrumented(target, self, component, frozenset(methods))
+
+    def render_prometheus(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        declared = set()
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum:.3f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name}_total counter")
+                declared.add(name)
+            lines.append(f"{name}_total{self._format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Write buffered values as EMF documents on stdout"""
+        if not self.emf:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        timestamp = int(time.time() * 1000)
+        for labels, metrics in pending.items():
+            while any(metrics[name]['values'] for name in metrics):
+                document = {
+                    '_aws': {
+                        'Timestamp': timestamp,
+                        'CloudWatchMetrics': [{
+                            'Namespace': self.namespace,
+                            'Dimensions': [[key for key, _ in labels]],
+                            'Metrics': [
+                                {'Name': name, 'Unit': metric['unit']}
+                                for name, metric in metrics.items()
+                                if metric['values']
+                            ]
+                        }]
+                    },
+                    **dict(labels)
+                }
+                for name, metric in metrics.items():
+                    if metric['values']:
+                        document[name] = metric['values'][:EMF_MAX_VALUES]
+                        metric['values'] = metric['values'][EMF_MAX_VALUES:]
+                try:
+                    sys.stdout.write(json.dumps(document) + "\n")
+                except Exception as e:
+                    logger.warning(f"Failed to write metrics: {str(e)}")
+                    return
+        sys.stdout.flush()
+
+    def _buffer(self, key: Tuple[str, Labels], value: float, unit: str):
+        if not self.emf:
+            return
+        name, labels = key
+        metrics = self._pending.setdefault(labels, {})
+        metrics.setdefault(name, {'unit': unit, 'values': []})['values'].append(round(value, 3))
+
+    def _labels(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def _format_labels(self, labels: Labels) -> str:
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class _Instrumented:
+    """Proxy that times selected method calls and passes everything else through"""
+
+    def __init__(self, target, metrics: Metrics, component: str, methods: frozenset):
+        self._target = target
+        self._metrics = metrics
+        self._component = component
+        self._methods = methods
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if name not in self._methods:
+            return attribute
+
+        def timed(*args, **kwargs):
+            with self._metrics.timer(f"{self._component}.{name}", timing=self._component):
+                return attribute(*args, **kwargs)
+        return timed
+
+
+# Shared by everything in the process; built on first use
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
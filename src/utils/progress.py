@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+    """Collects transfer progress and writes it at most once per interval.
+
+    Updates arriving between writes are merged: only the latest state is
+    kept, so a job costs one ``update_item`` per interval however often
+    yt-dlp or the streaming loop reports.
+    """
+
+    def __init__(self, write: Callable[[Dict[str, Any]], None], interval: Optional[float] = None):
+        self.write = write
+        self.interval = interval if interval is not None else float(os.getenv('PROGRESS_INTERVAL_SECONDS', '5'))
+        self.writes = 0
+        self._pending = None
+        self._last_write = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(
+        self,
+        downloaded_bytes: int,
+        total_bytes: Optional[int] = None,
+        speed: Optional[float] = None,
+        eta: Optional[float] = None,
+        force: bool = False,
+        **fields
+    ):
+        """Record the latest progress, writing it if the interval has elapsed.
+
+        Extra ``fields`` are written alongside the progress and coalesced the
+        same way.
+        """
+        now = time.monotonic()
+        if speed is None:
+            elapsed = now - self._started
+            speed = downloaded_bytes / elapsed if elapsed > 0 else None
+        if eta is None and speed and total_bytes:
+            eta = max(total_bytes - downloaded_bytes, 0) / speed
+
+        # DynamoDB rejects floats, so everything is stored as integers
+        progress = {
+            'downloaded_bytes': int(downloaded_bytes),
+            'total_bytes': int(total_bytes) if total_bytes else None,
+            'percent': int(downloaded_bytes * 100 / total_bytes) if total_bytes else None,
+            'speed': int(speed) if speed else None,
+            'eta': int(eta) if eta is not None else None,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+
+        with self._lock:
+            self._pending = {'progress': progress, **fields}
+            if not force and now - self._last_write < self.interval:
+                return
+            self._last_write = now
+            updates, self._pending = self._pending, None
+
+        self._write(updates)
+
+    def hook(self, status: Dict[str, Any]):
+        """yt-dlp progress hook"""
+        if status.get('status') not in ('downloading', 'finished'):
+            return
+        total = status.get('total_bytes') or status.get('total_bytes_estimate')
+        self.update(
+            status.get('downloaded_bytes') or 0,
+            total_bytes=total,
+            speed=status.get('speed'),
+            eta=status.get('eta'),
+            force=status.get('status') == 'finished'
+        )
+
+    def flush(self):
+        """Write any progress held back by the interval"""
+        with self._lock:
+            updates, self._pending = self._pending, None
+            self._last_write = time.monotonic()
+        if updates:
+            self._write(updates)
+
+    def _write(self, updates: Dict[str, Any]):
+        try:
+            self.write(updates)
+            self.writes += 1
+        except Exception as e:
+            # Progress is best effort and must never fail the transfer
+            logger.warning(f"Failed to write progress: {str(e)}")
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+
+from .cache import TTLCache
+from .errors import CustomException, ErrorCode
+
+logger = logging.getLogger(__name__)
+
+GIB = 1024 ** 3
+
+# Limits per permission tier; None means unlimited
+DEFAULT_TIERS = {
+    'standard': {
+        'requests_per_second': 2.0,
+        'burst': 20,
+        'daily_jobs': 100,
+        'daily_bytes': 10 * GIB
+    },
+    'premium': {
+        'requests_per_second': 10.0,
+        'burst': 100,
+        'daily_jobs': 1000,
+        'daily_bytes': 100 * GIB
+    },
+    'admin': {
+        'requests_per_second': None,
+        'burst': None,
+        'daily_jobs': None,
+        'daily_bytes': None
+    }
+}
+
+
+def load_tiers() -> Dict[str, Dict[str, Any]]:
+    """Get tier limits, with per-deployment overrides from RATE_LIMIT_TIERS (JSON)"""
+    tiers = {name: dict(limits) for name, limits in DEFAULT_TIERS.items()}
+    overrides = os.getenv('RATE_LIMIT_TIERS')
+    if overrides:
+        for name, limits in json.loads(overrides).items():
+            tiers.setdefault(name, dict(DEFAULT_TIERS['standard'])).update(limits)
+    return tiers
+
+
+def tier_for(permissions: Optional[list]) -> str:
+    """Derive a rate-limit tier from token permissions"""
+    permissions = set(permissions or [])
+    if 'admin' in permissions:
+        return 'admin'
+    if 'premium' in permissions:
+        return 'premium'
+    return 'standard'
+
+
+class TokenBucket:
+    """Classic token bucket; refills continuously at ``rate`` tokens per second"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at', '_lock')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost: float = 1) -> Tuple[bool, float]:
+        """Take ``cost`` tokens; returns (allowed, seconds until enough tokens)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return True, 0.0
+            return False, (cost - self.tokens) / self.rate
+
+
+class _Usage:
+    __slots__ = ('jobs', 'bytes', 'pending_jobs', 'pending_bytes', 'synced_at', 'syncing')
+
+    def __init__(self):
+        self.jobs = 0
+        self.bytes = 0
+        self.pending_jobs = 0
+        self.pending_bytes = 0
+        self.synced_at = None
+        self.syncing = False
+
+
+class QuotaCounter:
+    """Daily job and byte usage per user, shared through the rate limits table.
+
+    Usage is counted locally and pushed with an atomic ``ADD`` at most every
+    ``sync_interval`` seconds, which also pulls in what other containers
+    have counted. Between syncs a user can overshoot by what other
+    containers admitted in that window.
+    """
+
+    def __init__(self, dynamodb):
+        self.table = dynamodb.Table(os.getenv('RATE_LIMITS_TABLE_NAME', 'rate-limits'))
+        self.sync_interval = float(os.getenv('QUOTA_SYNC_SECONDS', '10'))
+        self._usage = TTLCache(max_size=int(os.getenv('QUOTA_TRACKED_USERS', '10000')), ttl=2 * 24 * 3600)
+        self._lock = threading.Lock()
+
+    def usage(self, user_id: str) -> Tuple[int, int]:
+        """Get (jobs, bytes) used today as far as this container knows"""
+        usage = self._get(user_id)
+        return usage.jobs + usage.pending_jobs, usage.bytes + usage.pending_bytes
+
+    def needs_sync(self, user_id: str) -> bool:
+        usage = self._get(user_id)
+        if usage.syncing:
+            return False
+        return usage.synced_at is None or time.monotonic() - usage.synced_at >= self.sync_interval
+
+    def add(self, user_id: str, jobs: int = 0, size_bytes: int = 0, flush: bool = False):
+        """Count usage locally; ``flush`` pushes it to the table right away"""
+        usage = self._get(user_id)
+        with self._lock:
+            usage.pending_jobs += jobs
+            usage.pending_bytes += size_bytes
+        if flush:
+            self.sync(user_id)
+
+    def sync(self, user_id: str):
+        """Push pending usage and refresh the shared totals (blocking)"""
+        usage = self._get(user_id)
+        with self._lock:
+            if usage.syncing:
+                return
+            usage.syncing = True
+            jobs, size_bytes = usage.pending_jobs, usage.pending_bytes
+
+        try:
+            response = self.table.update_item(
+                Key={'user_id': self._key(user_id)},
+                UpdateExpression="ADD #jobs :jobs, #bytes :bytes SET #expires_at = :expires_at",
+                ExpressionAttributeNames={
+                    '#jobs': 'jobs',
+                    '#bytes': 'bytes',
+                    '#expires_at': 'expires_at'
+                },
+                ExpressionAttributeValues={
+                    ':jobs': jobs,
+                    ':bytes': size_bytes,
+                    ':expires_at': int(time.time()) + 2 * 24 * 3600
+                },
+                ReturnValues='ALL_NEW'
+            )
+            attributes = response.get('Attributes', {})
+            with self._lock:
+                usage.pending_jobs -= jobs
+                usage.pending_bytes -= size_bytes
+                usage.jobs = int(attributes.get('jobs', 0))
+                usage.bytes = int(attributes.get('bytes', 0))
+                usage.synced_at = time.monotonic()
+        except Exception as e:
+            # Keep counting locally; the pending usage goes out with the next sync
+            logger.warning(f"Failed to sync quota for {user_id}: {str(e)}")
+        finally:
+            usage.syncing = False
+
+    def _get(self, user_id: str) -> _Usage:
+        key = self._key(user_id)
+        usage = self._usage.get(key)
+        if usage is None:
+            with self._lock:
+                usage = self._usage.get(key)
+                if usage is None:
+                    usage = _Usage()
+                    self._usage.set(key, usage)
+        return usage
+
+    def _key(self, user_id: str) -> str:
+        # One counter item per user and UTC day
+        return f"{user_id}#{datetime.utcnow().strftime('%Y-%m-%d')}"
+
+
+class RateLimiter:
+    """Request rate limits and daily quotas per permission tier.
+
+    The token bucket check is in-memory only. Quota checks go to DynamoDB
+    only when this container's view of the user's usage is older than the
+    sync interval.
+    """
+
+    def __init__(self, quota: QuotaCounter, run_io=None):
+        self.quota = quota
+        self.run_io = run_io
+        self.enabled = os.getenv('RATE_LIMITING_ENABLED', 'true').lower() == 'true'
+        self.tiers = load_tiers()
+        self._buckets = TTLCache(max_size=int(os.getenv('RATE_LIMIT_TRACKED_USERS', '10000')), ttl=3600)
+        self._lock = threading.Lock()
+
+    def check_rate(self, user_id: str, permissions: Optional[list], cost: float = 1):
+        """Raise RATE_LIMIT_EXCEEDED when the user's bucket is empty"""
+        if not self.enabled:
+            return
+        limits = self.tiers[tier_for(permissions)]
+        if not limits.get('requests_per_second'):
+            return
+
+        allowed, retry_after = self._bucket(user_id, limits).acquire(cost)
+        if not allowed:
+            raise CustomException(
+                ErrorCode.RATE_LIMIT_EXCEEDED,
+                "Too many requests",
+                {"retry_after": round(retry_after, 2)}
+            )
+
+    async def check_quota(self, user_id: str, permissions: Optional[list], jobs: int = 1):
+        """Raise QUOTA_EXCEEDED if ``jobs`` more would pass today's limits.
+
+        Nothing is counted here; callers add the jobs once they are accepted.
+        """
+        if not self.enabled:
+            return
+        limits = self.tiers[tier_for(permissions)]
+        if limits.get('daily_jobs') is None and limits.get('daily_bytes') is None:
+            return
+
+        if self.quota.needs_sync(user_id):
+            if self.run_io:
+                await self.run_io(self.quota.sync, user_id)
+            else:
+                await asyncio.to_thread(self.quota.sync, user_id)
+
+        used_jobs, used_bytes = self.quota.usage(user_id)
+        resets_at = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m-%dT00:00:00')
+        if limits.get('daily_jobs') is not None and used_jobs + jobs > limits['daily_jobs']:
+            raise CustomException(
+                ErrorCode.QUOTA_EXCEEDED,
+                "Daily download quota exceeded",
+                {"limit": limits['daily_jobs'], "used": used_jobs, "resets_at": resets_at}
+            )
+        if limits.get('daily_bytes') is not None and used_bytes >= limits['daily_bytes']:
+            raise CustomException(
+                ErrorCode.QUOTA_EXCEEDED,
+                "Daily transfer quota exceeded",
+                {"limit_bytes": limits['daily_bytes'], "used_bytes": used_bytes, "resets_at": resets_at}
+            )
+
+    def _bucket(self, user_id: str, limits: Dict[str, Any]) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(user_id)
+                if bucket is None:
+                    bucket = TokenBucket(limits['requests_per_second'], limits['burst'])
+                    self._buckets.set(user_id, bucket)
+        return bucket
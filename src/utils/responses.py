@@ -0,0 +1,110 @@
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is the fallback
+    orjson = None
+
+
+def from_dynamodb(value: Any) -> Any:
+    """Convert a DynamoDB item to plain JSON types: Decimals to int/float, sets to lists"""
+    if isinstance(value, dict):
+        return {key: from_dynamodb(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_dynamodb(item) for item in value]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(from_dynamodb(item) for item in value)
+    return value
+
+
+class DownloadStatus:
+    """The part of a download record clients see.
+
+    Bookkeeping such as the TTL, the owner, the S3 key, resume checkpoints
+    and stage timings stays out of responses.
+    """
+
+    __slots__ = (
+        'download_id', 'status', 'video_url', 'video_info', 'progress', 'error',
+        'download_url', 'format_id', 'clip', 'estimated_time', 'cache_hit',
+        'leader_id', 'batch_id', 'version', 'created_at', 'completed_at', 'failed_at'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> 'DownloadStatus':
+        """Build from a record already converted with ``from_dynamodb``"""
+        return cls(**item)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = value
+        return result
+
+
+def _default(value: Any) -> Any:
+    """Encode what plain JSON has no type for"""
+    if isinstance(value, DownloadStatus):
+        return value.to_dict()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by orjson when available, skipping FastAPI's jsonable_encoder.
+
+    Routes return it directly; content must already be plain types,
+    ``DownloadStatus`` models or the few types ``_default`` handles.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Envelope timestamps have one-second resolution, so the string is built once a second
+_timestamp_cache = (None, None)
+
+def utc_timestamp() -> str:
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, cached = _timestamp_cache
+    if cached_second != second:
+        cached = datetime.utcfromtimestamp(second).isoformat()
+        _timestamp_cache = (second, cached)
+    return cached
+
+
+def success(data: Any, message: Optional[str] = None) -> FastJSONResponse:
+    """The standard success envelope"""
+    content = {"status": "success"}
+    if message is not None:
+        content["message"] = message
+    content["data"] = data
+    content["timestamp"] = utc_timestamp()
+    return FastJSONResponse(content)
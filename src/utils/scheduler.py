@@ -0,0 +1,208 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Share of capacity each priority class gets relative to 'normal'
+PRIORITY_WEIGHTS = {
+    'high': 4.0,
+    'elevated': 2.0,
+    'normal': 1.0,
+    'low': 0.5
+}
+
+
+def priority_for(permissions: Optional[list]) -> str:
+    """Derive a priority class from token permissions"""
+    permissions = set(permissions or [])
+    if 'admin' in permissions:
+        return 'high'
+    if 'premium' in permissions:
+        return 'elevated'
+    if 'batch' in permissions and 'download' not in permissions:
+        return 'low'
+    return 'normal'
+
+
+class _Task:
+    __slots__ = ('future', 'fn', 'args', 'kwargs', 'user_id', 'start_tag', 'finish_tag', 'enqueued_at')
+
+    def __init__(self, fn, args, kwargs, user_id, start_tag, finish_tag):
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.user_id = user_id
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.enqueued_at = time.monotonic()
+
+
+class WorkPool:
+    """Bounded thread pool that shares its slots fairly between users.
+
+    Tasks are dispatched by start-time fair queuing: each user's tasks get
+    virtual finish tags spaced by 1/weight, and the eligible task with the
+    smallest tag runs next. A user at the per-user limit is skipped until
+    one of their tasks finishes, so one heavy user cannot hold every slot.
+    """
+
+    def __init__(self, name: str, max_workers: int, per_user_limit: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.per_user_limit = per_user_limit
+        self._queues: Dict[str, deque] = {}
+        self._running: Dict[str, int] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._waits = deque(maxlen=1000)
+        self.submitted = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        user_id: Optional[str],
+        priority: str,
+        fn: Callable,
+        /,
+        *args,
+        **kwargs
+    ) -> Future:
+        """Queue a call on behalf of a user; ``fn`` may take its own ``user_id`` keyword"""
+        user_id = user_id or 'anonymous'
+        weight = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS['normal'])
+
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError(f"Pool {self.name} is shut down")
+            start_tag = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+            finish_tag = start_tag + 1.0 / weight
+            self._last_finish[user_id] = finish_tag
+
+            task = _Task(fn, args, kwargs, user_id, start_tag, finish_tag)
+            self._queues.setdefault(user_id, deque()).append(task)
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            self._condition.notify()
+        return task.future
+
+    async def run(self, user_id: Optional[str], priority: str, fn: Callable, /, *args, **kwargs):
+        """Submit a call and await its result"""
+        return await asyncio.wrap_future(self.submit(user_id, priority, fn, *args, **kwargs))
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait-time metrics"""
+        with self._condition:
+            waits = sorted(self._waits)
+            running = sum(self._running.values())
+            return {
+                'workers': self.max_workers,
+                'per_user_limit': self.per_user_limit,
+                'running': running,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'active_users': len(self._queues),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'wait_p50': waits[len(waits) // 2] if waits else 0.0,
+                'wait_p95': waits[int(len(waits) * 0.95)] if waits else 0.0,
+                'wait_max': waits[-1] if waits else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next_task(self) -> Optional[_Task]:
+        best = None
+        for user_id, queue in self._queues.items():
+            if self._running.get(user_id, 0) >= self.per_user_limit:
+                continue
+            if best is None or queue[0].finish_tag < best.finish_tag:
+                best = queue[0]
+        if best is None:
+            return None
+
+        queue = self._queues[best.user_id]
+        queue.popleft()
+        if not queue:
+            del self._queues[best.user_id]
+        self._running[best.user_id] = self._running.get(best.user_id, 0) + 1
+        self._virtual_time = max(self._virtual_time, best.start_tag)
+        return best
+
+    def _work(self):
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    if self._stopping:
+                        return
+                    self._condition.wait()
+                    task = self._next_task()
+                self._waits.append(time.monotonic() - task.enqueued_at)
+
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args, **task.kwargs))
+                except BaseException as e:
+                    task.future.set_exception(e)
+
+            with self._condition:
+                self.completed += 1
+                self._running[task.user_id] -= 1
+                if not self._running[task.user_id]:
+                    del self._running[task.user_id]
+                    if task.user_id not in self._queues:
+                        # Idle users start again from the current virtual time
+                        self._last_finish.pop(task.user_id, None)
+                self._condition.notify_all()
+
+
+class DownloadScheduler:
+    """Separate fair pools for metadata extraction and transfers"""
+
+    def __init__(self):
+        self.extract = WorkPool(
+            'extract',
+            max_workers=int(os.getenv('EXTRACT_WORKERS', '4')),
+            per_user_limit=int(os.getenv('EXTRACT_PER_USER_LIMIT', '2'))
+        )
+        self.transfer = WorkPool(
+            'transfer',
+            max_workers=int(os.getenv('TRANSFER_WORKERS', '2')),
+            per_user_limit=int(os.getenv('TRANSFER_PER_USER_LIMIT', '1'))
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'extract': self.extract.stats(),
+            'transfer': self.transfer.stats()
+        }
+
+    def shutdown(self, wait: bool = True):
+        self.extract.shutdown(wait)
+        self.transfer.shutdown(wait)
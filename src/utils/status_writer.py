@@ -0,0 +1,163 @@
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, List, Optional
+
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB errors worth retrying; anything else will fail the same way again
+RETRYABLE_ERRORS = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable',
+    'TransactionConflictException'
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in RETRYABLE_ERRORS
+    # Network trouble is transient; missing credentials or bad parameters are not
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+
+class StatusWriter:
+    """Writer threads for download record updates, callable from any thread.
+
+    Callers hand over updates and may wait for them to be stored. Updates
+    to the same record that pile up while an earlier one is being written
+    are merged into one UpdateItem, so a fast transfer's progress reports
+    cost one write per round instead of one each. A record is only ever
+    written by one thread at a time, so its updates land in the order they
+    were submitted. Throttling and transient errors are retried with
+    jittered exponential backoff. Writes run in the context of the latest
+    submitter, so the job timings it collects include them.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str, Dict[str, Any]], None],
+        workers: int = 4,
+        max_retries: int = 6,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0
+    ):
+        self.write = write
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.writes = 0
+        self.merged = 0
+        self.retries = 0
+        self.failures = 0
+        self._pending: 'OrderedDict[str, _Pending]' = OrderedDict()
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def submit(self, download_id: str, updates: Dict[str, Any]) -> Future:
+        """Queue an update; the future resolves once it (or a later merge) is stored"""
+        with self._condition:
+            if not self._threads:
+                # Started on first use, like the other background pools
+                self._threads = [
+                    threading.Thread(target=self._run, name=f"status-writer-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+            pending = self._pending.get(download_id)
+            if pending is None:
+                pending = self._pending[download_id] = _Pending()
+            else:
+                self.merged += 1
+            pending.updates.update(updates)
+            pending.context = contextvars.copy_context()
+            future = Future()
+            pending.futures.append(future)
+            self._condition.notify_all()
+        return future
+
+    def write_and_wait(self, download_id: str, updates: Dict[str, Any], timeout: Optional[float] = None):
+        """Store an update before returning; raises the last error if it could not be stored"""
+        self.submit(download_id, updates).result(timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is written; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'writes': self.writes,
+            'merged': self.merged,
+            'retries': self.retries,
+            'failures': self.failures,
+            'pending': len(self._pending),
+            'in_flight': len(self._in_flight)
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                download_id = self._next_ready()
+                while download_id is None:
+                    self._condition.wait()
+                    download_id = self._next_ready()
+                # Whatever arrives for this record from now on waits for the next round
+                pending = self._pending.pop(download_id)
+                self._in_flight.add(download_id)
+            try:
+                self._write(download_id, pending)
+            finally:
+                with self._condition:
+                    self._in_flight.discard(download_id)
+                    self._condition.notify_all()
+
+    def _next_ready(self) -> Optional[str]:
+        return next((key for key in self._pending if key not in self._in_flight), None)
+
+    def _write(self, download_id: str, pending: '_Pending'):
+        attempt = 0
+        while True:
+            try:
+                pending.context.run(self.write, download_id, pending.updates)
+                self.writes += 1
+                for future in pending.futures:
+                    future.set_result(None)
+                return
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    logger.error(f"Failed to update download record {download_id}: {str(e)}")
+                    for future in pending.futures:
+                        future.set_exception(e)
+                    return
+                self.retries += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class _Pending:
+    __slots__ = ('updates', 'futures', 'context')
+
+    def __init__(self):
+        self.updates: Dict[str, Any] = {}
+        self.futures: List[Future] = []
+        self.context: Optional[contextvars.Context] = None
@@ -0,0 +1,475 @@
+import re
+import time
+import queue
+import threading
+import logging
+import http.client
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Iterator, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+# Responses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = (429, 503)
+# Dropped or stalled connections, worth another try on a fresh one
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, http.client.IncompleteRead)
+
+
+class TransferInterrupted(Exception):
+    """Raised when a transfer stops at its deadline with work still left"""
+
+    def __init__(self, bytes_transferred: int):
+        super().__init__(f"Transfer interrupted after {bytes_transferred} bytes")
+        self.bytes_transferred = bytes_transferred
+
+
+class S3MultipartWriter:
+    """File-like object that uploads S3 multipart parts while data arrives.
+
+    Parts are handed to a background uploader thread through a bounded
+    queue, so at most ``max_buffered_parts`` full parts (plus the one being
+    filled) are held in memory and the producer blocks when S3 falls behind.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        s3_key: str,
+        part_size: int = 8 * 1024 * 1024,
+        max_buffered_parts: int = 2,
+        extra_args: Optional[Dict[str, Any]] = None
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.extra_args = extra_args or {}
+        self.bytes_written = 0
+        self.upload_id = None
+        self._buffer = bytearray()
+        self._next_part = 1
+        self._parts = []
+        self._error = None
+        self._queue = queue.Queue(maxsize=max(1, max_buffered_parts))
+        self._uploader = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return False
+        try:
+            self.close()
+        except Exception:
+            self.abort()
+            raise
+        return False
+
+    def open(self):
+        """Start the multipart upload and the uploader thread"""
+        response = self.s3_client.create_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.s3_key,
+            **self.extra_args
+        )
+        self.upload_id = response['UploadId']
+        self._uploader = threading.Thread(
+            target=self._upload_loop,
+            name=f"s3-upload-{self.upload_id[:8]}",
+            daemon=True
+        )
+        self._uploader.start()
+
+    def write(self, data: bytes) -> int:
+        """Buffer data and queue a part whenever a full part is available"""
+        self._raise_upload_error()
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._queue_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def close(self):
+        """Flush the remaining buffer and complete the multipart upload"""
+        if self._buffer or self._next_part == 1:
+            # S3 needs at least one part, even for an empty object
+            self._queue_part(bytes(self._buffer))
+            self._buffer = bytearray()
+        self._stop_uploader()
+        self._raise_upload_error()
+
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.s3_key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': sorted(self._parts, key=lambda p: p['PartNumber'])}
+        )
+
+    def abort(self):
+        """Abort the multipart upload and discard uploaded parts"""
+        self._stop_uploader()
+        if not self.upload_id:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.s3_key,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload {self.upload_id}: {str(e)}")
+
+    def _queue_part(self, body: bytes):
+        part_number = self._next_part
+        self._next_part += 1
+        # Poll so a failed uploader cannot leave the producer blocked forever
+        while True:
+            self._raise_upload_error()
+            try:
+                self._queue.put((part_number, body), timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def _stop_uploader(self):
+        if self._uploader is None:
+            return
+        while self._uploader.is_alive():
+            try:
+                self._queue.put(None, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self._uploader.join()
+        self._uploader = None
+
+    def _upload_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Drain remaining parts so the producer is never blocked
+                continue
+            part_number, body = item
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket_name,
+                    Key=self.s3_key,
+                    UploadId=self.upload_id,
+                    PartNumber=part_number,
+                    Body=body
+                )
+                self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+            except Exception as e:
+                logger.error(f"Upload of part {part_number} failed: {str(e)}")
+                self._error = e
+
+    def _raise_upload_error(self):
+        if self._error is not None:
+            raise self._error
+
+
+def iter_http_chunks(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    chunk_size: Optional[int] = None,
+    timeout: int = 30
+) -> Iterator[bytes]:
+    """Yield the body of ``url`` in blocks.
+
+    When ``chunk_size`` is set the body is fetched with consecutive range
+    requests, which is how yt-dlp avoids per-connection throttling on
+    YouTube progressive formats.
+    """
+    headers = dict(headers or {})
+    position = 0
+
+    while True:
+        request_headers = dict(headers)
+        if chunk_size:
+            request_headers['Range'] = f"bytes={position}-{position + chunk_size - 1}"
+        request = urllib.request.Request(url, headers=request_headers)
+
+        try:
+            response = urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and position > 0:
+                # Range starts past the end: the previous chunk was the last
+                return
+            raise
+
+        received = 0
+        with response:
+            while True:
+                block = response.read(READ_SIZE)
+                if not block:
+                    break
+                received += len(block)
+                yield block
+
+        position += received
+        if not chunk_size or response.status != 206 or received < chunk_size:
+            return
+
+
+class AdaptiveConcurrency:
+    """AIMD connection limit driven by per-connection throughput.
+
+    Each finished range grows the limit by one connection per round trip of
+    the current window while connections stay fast; a throttling response
+    halves it, and a connection running at less than half the best speed
+    seen (the link, not the server, is the bottleneck) shrinks it by one.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 8):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self.best_speed = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def record(self, size: int, seconds: float):
+        """Account for a range fetched in ``seconds``"""
+        speed = size / seconds if seconds > 0 else 0.0
+        with self._lock:
+            if speed and speed < self.best_speed / 2:
+                self._limit = max(self.minimum, self._limit - 1)
+            else:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            self.best_speed = max(self.best_speed, speed)
+
+    def throttle(self):
+        """Back off after a throttling response"""
+        with self._lock:
+            self.throttled += 1
+            self._limit = max(self.minimum, self._limit / 2)
+
+
+def probe_content_length(url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 30) -> Optional[int]:
+    """Get the size of ``url`` if the server honours range requests"""
+    request_headers = dict(headers or {})
+    request_headers['Range'] = 'bytes=0-0'
+    request = urllib.request.Request(url, headers=request_headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            content_range = response.headers.get('Content-Range') or ''
+    except urllib.error.URLError as e:
+        logger.warning(f"Range probe failed: {str(e)}")
+        return None
+
+    match = re.match(r'bytes 0-0/(\d+)$', content_range.strip())
+    if response.status != 206 or not match:
+        return None
+    return int(match.group(1))
+
+
+def list_uploaded_parts(s3_client, bucket_name: str, s3_key: str, upload_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Get the parts S3 holds for a multipart upload, or None if the upload is gone"""
+    parts = []
+    try:
+        paginator = s3_client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=bucket_name, Key=s3_key, UploadId=upload_id):
+            parts.extend(
+                {'PartNumber': p['PartNumber'], 'ETag': p['ETag'], 'Size': p['Size']}
+                for p in page.get('Parts', [])
+            )
+    except Exception as e:
+        # NoSuchUpload once the upload was completed, aborted or expired
+        logger.warning(f"Cannot list parts of upload {upload_id}: {str(e)}")
+        return None
+    return parts
+
+
+class ParallelRangeTransfer:
+    """Copy a URL into S3 with concurrent range GETs, one S3 part per range.
+
+    Range ``i`` of the source becomes part ``i + 1`` of the multipart upload,
+    so ranges can finish in any order. The number of ranges in flight
+    follows an ``AdaptiveConcurrency`` limiter, and memory is bounded by
+    ``limit * part_size``.
+
+    Passing the ``upload_id`` and ``completed_parts`` of an earlier attempt
+    resumes it: only the missing ranges are fetched. With a ``deadline`` no
+    new range starts after that time and ``TransferInterrupted`` is raised
+    once the ranges in flight have landed.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        bucket_name: str,
+        s3_key: str,
+        url: str,
+        total_size: int,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        headers: Optional[Dict[str, str]] = None,
+        extra_args: Optional[Dict[str, Any]] = None,
+        max_retries: int = 5,
+        timeout: int = 30,
+        upload_id: Optional[str] = None,
+        completed_parts: Optional[List[Dict[str, Any]]] = None,
+        deadline: Optional[float] = None,
+        abort_on_error: bool = True
+    ):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.url = url
+        self.total_size = total_size
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.concurrency = concurrency or AdaptiveConcurrency(initial=2)
+        self.headers = dict(headers or {})
+        self.extra_args = extra_args or {}
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.upload_id = upload_id
+        self.deadline = deadline
+        self.abort_on_error = abort_on_error
+        self.parts = list(completed_parts or [])
+        self.bytes_transferred = sum(self._part_size(p['PartNumber'] - 1) for p in self.parts)
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.total_size // self.part_size))
+
+    def start(self) -> str:
+        """Create the multipart upload unless resuming one"""
+        if self.upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.s3_key,
+                **self.extra_args
+            )
+            self.upload_id = response['UploadId']
+        return self.upload_id
+
+    def run(
+        self,
+        on_progress: Optional[Callable[[int], None]] = None,
+        on_part: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ) -> int:
+        """Transfer the object; returns the number of bytes copied.
+
+        ``on_part`` gets the list of completed parts after each part lands,
+        which is what a caller needs to checkpoint the upload.
+        """
+        self.start()
+        done_parts = {p['PartNumber'] for p in self.parts}
+        remaining = [i for i in range(self.part_count) if i + 1 not in done_parts]
+        pending = set()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency.maximum,
+                thread_name_prefix='range-fetch'
+            ) as pool:
+                while remaining or pending:
+                    while (
+                        remaining
+                        and len(pending) < self.concurrency.limit
+                        and not self._past_deadline()
+                    ):
+                        pending.add(pool.submit(self._transfer_part, remaining.pop(0)))
+                    if not pending:
+                        raise TransferInterrupted(self.bytes_transferred)
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        part, size = future.result()
+                        self.parts.append(part)
+                        self.bytes_transferred += size
+                        if on_part:
+                            on_part(self.parts)
+                        if on_progress:
+                            on_progress(self.bytes_transferred)
+        except TransferInterrupted:
+            raise
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            if self.abort_on_error:
+                self._abort()
+            raise
+
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.s3_key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': sorted(self.parts, key=lambda p: p['PartNumber'])}
+        )
+        return self.bytes_transferred
+
+    def _transfer_part(self, index: int):
+        start = index * self.part_size
+        end = min(start + self.part_size, self.total_size) - 1
+        body = self._fetch_range(start, end)
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.s3_key,
+            UploadId=self.upload_id,
+            PartNumber=index + 1,
+            Body=body
+        )
+        return {'PartNumber': index + 1, 'ETag': response['ETag']}, len(body)
+
+    def _part_size(self, index: int) -> int:
+        start = index * self.part_size
+        return max(0, min(start + self.part_size, self.total_size) - start)
+
+    def _past_deadline(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        headers = dict(self.headers)
+        headers['Range'] = f"bytes={start}-{end}"
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                request = urllib.request.Request(self.url, headers=headers)
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    body = response.read()
+            except urllib.error.HTTPError as e:
+                if e.code not in THROTTLE_STATUSES or attempt == self.max_retries:
+                    raise
+                self.concurrency.throttle()
+                time.sleep(min(2 ** attempt * 0.5, 10))
+                continue
+            except (urllib.error.URLError, *TRANSIENT_ERRORS) as e:
+                # urlopen wraps connect-time failures in URLError
+                reason = e.reason if isinstance(e, urllib.error.URLError) else e
+                if not isinstance(reason, TRANSIENT_ERRORS) or attempt == self.max_retries:
+                    raise
+                logger.warning(f"Retrying bytes {start}-{end} after {type(reason).__name__}: {str(reason)}")
+                time.sleep(min(2 ** attempt * 0.5, 10))
+                continue
+
+            if len(body) != end - start + 1:
+                raise IOError(f"Short read for bytes {start}-{end}: got {len(body)} bytes")
+            self.concurrency.record(len(body), time.monotonic() - started)
+            return body
+
+    def _abort(self):
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.s3_key,
+                UploadId=self.upload_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to abort multipart upload {self.upload_id}: {str(e)}")
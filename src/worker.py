@@ -0,0 +1,139 @@
+import json
+import os
+import time
+import signal
+import logging
+import threading
+import traceback
+from typing import Dict, Any
+
+import boto3
+
+from utils.downloader import YouTubeDownloader
+from utils.job_queue import Job, create_job_queue
+from utils.metrics import get_metrics
+from utils.streaming import TransferInterrupted
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+POLL_WAIT_SECONDS = int(os.getenv('JOB_POLL_WAIT_SECONDS', '20'))
+# Time kept back from the Lambda timeout to checkpoint and requeue the job
+DEADLINE_MARGIN_SECONDS = int(os.getenv('JOB_DEADLINE_MARGIN_SECONDS', '60'))
+
+
+class Worker:
+    """Pulls download jobs from the queue and runs them under a lease.
+
+    While a job runs, a heartbeat keeps extending its lease; if the worker
+    dies the lease lapses and another worker picks the job up.
+    """
+
+    def __init__(self, downloader: YouTubeDownloader, job_queue, lease_seconds: int = LEASE_SECONDS):
+        self.downloader = downloader
+        self.job_queue = job_queue
+        self.lease_seconds = lease_seconds
+        self.stopping = threading.Event()
+
+    def run_forever(self):
+        """Process jobs until stopped"""
+        logger.info("Worker started")
+        while not self.stopping.is_set():
+            try:
+                self.run_once(wait_seconds=POLL_WAIT_SECONDS)
+            except Exception as e:
+                logger.error(f"Worker loop error: {str(e)}\n{traceback.format_exc()}")
+                self.stopping.wait(5)
+        logger.info("Worker stopped")
+
+    def run_once(self, wait_seconds: int = 0) -> bool:
+        """Claim and process a single job; returns False when the queue was empty"""
+        job = self.job_queue.claim(self.lease_seconds, wait_seconds=wait_seconds)
+        if job is None:
+            return False
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done), daemon=True)
+        heartbeat.start()
+        try:
+            self.downloader.run_job(job.payload, attempt=job.attempts)
+            self.job_queue.complete(job)
+        except Exception as e:
+            logger.error(f"Job {job.payload.get('download_id')} failed on attempt {job.attempts}: {str(e)}")
+            if job.attempts >= self.downloader.job_max_attempts:
+                # The last attempt already marked the download failed
+                self.job_queue.dead_letter(job)
+            else:
+                # Back off before the retry
+                self.job_queue.release(job, delay_seconds=min(30 * job.attempts, 900))
+        finally:
+            done.set()
+            heartbeat.join()
+            self.downloader.status_writer.flush(timeout=30)
+            get_metrics().flush()
+        return True
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def _heartbeat(self, job: Job, done: threading.Event):
+        cache_key = job.payload.get('cache_key')
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                self.job_queue.extend(job, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Failed to extend lease: {str(e)}")
+            if cache_key:
+                # Downloads following this one keep waiting on it
+                self.downloader.inflight.renew(cache_key, job.payload['download_id'])
+
+
+def build_downloader() -> YouTubeDownloader:
+    """Create the downloader used by the worker"""
+    return YouTubeDownloader(boto3.client('s3'), os.getenv('S3_BUCKET_NAME'))
+
+
+def handler(event: Dict[str, Any], context) -> Dict[str, Any]:
+    """Lambda entry point for the SQS event source mapping"""
+    global downloader
+    if downloader is None:
+        downloader = build_downloader()
+
+    deadline = None
+    if context is not None:
+        remaining = context.get_remaining_time_in_millis() / 1000
+        deadline = time.monotonic() + remaining - DEADLINE_MARGIN_SECONDS
+    
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            attempt = int(record.get('attributes', {}).get('ApproximateReceiveCount', 1))
+            downloader.run_job(json.loads(record['body']), deadline=deadline, attempt=attempt)
+        except TransferInterrupted:
+            if downloader.job_queue is None:
+                failures.append({'itemIdentifier': record['messageId']})
+                continue
+            # Hand the rest to a fresh invocation without spending a receive
+            downloader.job_queue.enqueue(json.loads(record['body']))
+        except Exception as e:
+            logger.error(f"Job failed: {str(e)}\n{traceback.format_exc()}")
+            # Only failed messages become visible again
+            failures.append({'itemIdentifier': record['messageId']})
+    # The container may be frozen as soon as we return
+    downloader.status_writer.flush(timeout=30)
+    get_metrics().flush()
+    return {'batchItemFailures': failures}
+
+
+downloader = None
+
+if __name__ == '__main__':
+    job_queue = create_job_queue()
+    if job_queue is None:
+        raise SystemExit("JOB_QUEUE_URL is required to run a worker")
+    worker = Worker(build_downloader(), job_queue)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run_forever()
@@ -52,6 +52,8 @@ module "storage" {
   environment          = var.environment
   s3_lifecycle_days    = var.s3_lifecycle_days
   dynamodb_billing_mode = var.dynamodb_billing_mode
+  job_visibility_timeout = var.lambda_timeout
+  job_max_attempts     = var.job_max_attempts
   tags                 = local.common_tags
 }
 
@@ -63,6 +65,8 @@ module "security" {
   environment          = var.environment
   s3_bucket_arn        = module.storage.s3_bucket_arn
   downloads_table_arn  = module.storage.downloads_table_arn
+  cache_table_arn      = module.storage.cache_table_arn
+  jobs_queue_arn       = module.storage.jobs_queue_arn
   rate_limits_table_arn = module.storage.rate_limits_table_arn
   tags                 = local.common_tags
 }
@@ -76,6 +80,18 @@ module "compute" {
   lambda_role_arn      = module.security.lambda_role_arn
   s3_bucket_name       = module.storage.s3_bucket_name
   downloads_table_name = module.storage.downloads_table_name
+  downloads_user_index_name = module.storage.downloads_user_index_name
+  cache_table_name     = module.storage.cache_table_name
+  s3_lifecycle_days    = var.s3_lifecycle_days
+  rate_limits_table_name = module.storage.rate_limits_table_name
+  rate_limit_tiers     = var.rate_limit_tiers
+  jobs_queue_url       = module.storage.jobs_queue_url
+  jobs_queue_arn       = module.storage.jobs_queue_arn
+  transfer_connections = var.transfer_connections
+  transfer_initial_connections = var.transfer_initial_connections
+  transfer_fragment_concurrency = var.transfer_fragment_concurrency
+  job_max_attempts     = var.job_max_attempts
+  ffmpeg_layer_arn     = var.ffmpeg_layer_arn
   jwt_secret_key       = random_password.jwt_secret.result
   lambda_timeout       = var.lambda_timeout
   lambda_memory_size   = var.lambda_memory_size
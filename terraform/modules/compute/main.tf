@@ -1,6 +1,33 @@
 data "aws_caller_identity" "current" {}
 data "aws_region" "current" {}
 
+# Environment shared by the API and worker functions
+locals {
+  function_environment = {
+    S3_BUCKET_NAME       = var.s3_bucket_name
+    DOWNLOADS_TABLE_NAME = var.downloads_table_name
+    DOWNLOADS_USER_INDEX_NAME = var.downloads_user_index_name
+    CACHE_TABLE_NAME     = var.cache_table_name
+    RATE_LIMITS_TABLE_NAME = var.rate_limits_table_name
+    RATE_LIMIT_TIERS     = var.rate_limit_tiers
+    S3_LIFECYCLE_DAYS    = tostring(var.s3_lifecycle_days)
+    JOB_QUEUE_URL        = var.jobs_queue_url
+    TRANSFER_CONNECTIONS = tostring(var.transfer_connections)
+    TRANSFER_INITIAL_CONNECTIONS = tostring(var.transfer_initial_connections)
+    TRANSFER_FRAGMENT_CONCURRENCY = tostring(var.transfer_fragment_concurrency)
+    JOB_TIME_LIMIT_SECONDS = tostring(var.lambda_timeout)
+    JOB_MAX_ATTEMPTS     = tostring(var.job_max_attempts)
+    JWT_SECRET_KEY       = var.jwt_secret_key
+    TOKEN_EXPIRY_HOURS   = "24"
+    METRICS_NAMESPACE    = "${var.project_name}-${var.environment}"
+    LOG_LEVEL            = var.environment == "prod" ? "INFO" : "DEBUG"
+    ENVIRONMENT          = var.environment
+  }
+
+  # ffmpeg is only needed for clips and merged formats
+  function_layers = var.ffmpeg_layer_arn != "" ? [var.ffmpeg_layer_arn] : []
+}
+
 # CloudWatch Log Group
 resource "aws_cloudwatch_log_group" "lambda" {
   name              = "/aws/lambda/${var.project_name}-${var.environment}-api"
@@ -19,21 +46,50 @@ resource "aws_lambda_function" "api" {
   
   filename         = data.archive_file.lambda_zip.output_path
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  layers           = local.function_layers
   
   environment {
-    variables = {
-      S3_BUCKET_NAME       = var.s3_bucket_name
-      DOWNLOADS_TABLE_NAME = var.downloads_table_name
-      JWT_SECRET_KEY       = var.jwt_secret_key
-      TOKEN_EXPIRY_HOURS   = "24"
-      LOG_LEVEL            = var.environment == "prod" ? "INFO" : "DEBUG"
-      ENVIRONMENT          = var.environment
-    }
+    variables = local.function_environment
   }
   
   tags = var.tags
 }
 
+# CloudWatch Log Group for the worker
+resource "aws_cloudwatch_log_group" "worker" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-worker"
+  retention_in_days = var.log_retention_days
+  tags              = var.tags
+}
+
+# Worker function running queued download jobs
+resource "aws_lambda_function" "worker" {
+  function_name = "${var.project_name}-${var.environment}-worker"
+  role          = var.lambda_role_arn
+  handler       = "worker.handler"
+  runtime       = "python3.11"
+  timeout       = var.lambda_timeout
+  memory_size   = var.lambda_memory_size
+  
+  filename         = data.archive_file.lambda_zip.output_path
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  layers           = local.function_layers
+  
+  environment {
+    variables = local.function_environment
+  }
+  
+  tags = var.tags
+}
+
+# Feed download jobs to the worker one at a time
+resource "aws_lambda_event_source_mapping" "worker_jobs" {
+  event_source_arn        = var.jobs_queue_arn
+  function_name           = aws_lambda_function.worker.arn
+  batch_size              = 1
+  function_response_types = ["ReportBatchItemFailures"]
+}
+
 # Create a placeholder Lambda deployment package
 data "archive_file" "lambda_zip" {
   type        = "zip"
@@ -46,6 +102,14 @@ data "archive_file" "lambda_zip" {
     })
     filename = "lambda_function.py"
   }
+
+  source {
+    content = templatefile("${path.module}/placeholder_lambda.py", {
+      project_name = var.project_name
+      environment  = var.environment
+    })
+    filename = "worker.py"
+  }
 }
 
 # Lambda function alias
@@ -18,6 +18,11 @@ output "lambda_function_invoke_arn" {
   value       = aws_lambda_function.api.invoke_arn
 }
 
+output "worker_function_name" {
+  description = "Worker Lambda function name"
+  value       = aws_lambda_function.worker.function_name
+}
+
 output "cloudwatch_log_group" {
   description = "CloudWatch log group name"
   value       = aws_cloudwatch_log_group.lambda.name
@@ -23,6 +23,33 @@ variable "downloads_table_name" {
   type        = string
 }
 
+variable "downloads_user_index_name" {
+  description = "DynamoDB downloads table index on user_id and created_at"
+  type        = string
+  default     = "user-downloads-index"
+}
+
+variable "cache_table_name" {
+  description = "DynamoDB download cache table name"
+  type        = string
+}
+
+variable "s3_lifecycle_days" {
+  description = "Days after which S3 objects are deleted"
+  type        = number
+  default     = 7
+}
+
+variable "jobs_queue_url" {
+  description = "URL of the download jobs queue"
+  type        = string
+}
+
+variable "jobs_queue_arn" {
+  description = "ARN of the download jobs queue"
+  type        = string
+}
+
 variable "jwt_secret_key" {
   description = "JWT secret key"
   type        = string
@@ -47,6 +74,47 @@ variable "log_retention_days" {
   default     = 14
 }
 
+variable "rate_limits_table_name" {
+  description = "DynamoDB table holding daily usage counters"
+  type        = string
+}
+
+variable "rate_limit_tiers" {
+  description = "JSON overrides of the per-tier rate limits and quotas"
+  type        = string
+  default     = ""
+}
+
+variable "transfer_connections" {
+  description = "Maximum parallel range connections per download"
+  type        = number
+  default     = 8
+}
+
+variable "transfer_initial_connections" {
+  description = "Parallel range connections a download starts with before adapting"
+  type        = number
+  default     = 2
+}
+
+variable "transfer_fragment_concurrency" {
+  description = "Concurrent fragment downloads for DASH/HLS formats"
+  type        = number
+  default     = 4
+}
+
+variable "job_max_attempts" {
+  description = "Attempts before a download job is moved to the dead letter queue"
+  type        = number
+  default     = 5
+}
+
+variable "ffmpeg_layer_arn" {
+  description = "Lambda layer providing ffmpeg in /opt/bin, needed for clips (empty: none)"
+  type        = string
+  default     = ""
+}
+
 variable "tags" {
   description = "Resource tags"
   type        = map(string)
@@ -44,7 +44,9 @@ data "aws_iam_policy_document" "lambda_policy" {
       "s3:GetObject",
       "s3:PutObject",
       "s3:DeleteObject",
-      "s3:ListBucket"
+      "s3:ListBucket",
+      "s3:AbortMultipartUpload",
+      "s3:ListMultipartUploadParts"
     ]
     resources = [
       var.s3_bucket_arn,
@@ -61,15 +63,31 @@ data "aws_iam_policy_document" "lambda_policy" {
       "dynamodb:UpdateItem",
       "dynamodb:DeleteItem",
       "dynamodb:Query",
-      "dynamodb:Scan"
+      "dynamodb:Scan",
+      "dynamodb:BatchGetItem",
+      "dynamodb:BatchWriteItem"
     ]
     resources = [
       var.downloads_table_arn,
       "${var.downloads_table_arn}/index/*",
+      var.cache_table_arn,
       var.rate_limits_table_arn
     ]
   }
 
+  # SQS Permissions for the download jobs queue
+  statement {
+    effect = "Allow"
+    actions = [
+      "sqs:SendMessage",
+      "sqs:ReceiveMessage",
+      "sqs:DeleteMessage",
+      "sqs:ChangeMessageVisibility",
+      "sqs:GetQueueAttributes"
+    ]
+    resources = [var.jobs_queue_arn]
+  }
+
   # SSM Parameter Store Permissions
   statement {
     effect = "Allow"
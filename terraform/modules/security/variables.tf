@@ -18,6 +18,16 @@ variable "downloads_table_arn" {
   type        = string
 }
 
+variable "cache_table_arn" {
+  description = "ARN of the DynamoDB download cache table"
+  type        = string
+}
+
+variable "jobs_queue_arn" {
+  description = "ARN of the download jobs queue"
+  type        = string
+}
+
 variable "rate_limits_table_arn" {
   description = "ARN of the DynamoDB rate limits table"
   type        = string
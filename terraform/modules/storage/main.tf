@@ -111,6 +111,46 @@ resource "aws_dynamodb_table" "downloads" {
   tags = var.tags
 }
 
+# DynamoDB Table for the content-addressed download cache
+resource "aws_dynamodb_table" "download_cache" {
+  name           = "${var.project_name}-${var.environment}-download-cache"
+  billing_mode   = "PAY_PER_REQUEST"
+  hash_key       = "cache_key"
+  
+  attribute {
+    name = "cache_key"
+    type = "S"
+  }
+
+  # Entries expire together with the objects removed by the lifecycle rule
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+# SQS Queue for download jobs, consumed by the worker function
+resource "aws_sqs_queue" "jobs_dlq" {
+  name                      = "${var.project_name}-${var.environment}-jobs-dlq"
+  message_retention_seconds = 1209600 # 14 days
+  tags                      = var.tags
+}
+
+resource "aws_sqs_queue" "jobs" {
+  name                       = "${var.project_name}-${var.environment}-jobs"
+  visibility_timeout_seconds = var.job_visibility_timeout
+  message_retention_seconds  = 86400
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.jobs_dlq.arn
+    maxReceiveCount     = var.job_max_attempts
+  })
+
+  tags = var.tags
+}
+
 # DynamoDB Table for Rate Limiting
 resource "aws_dynamodb_table" "rate_limits" {
   name           = "${var.project_name}-${var.environment}-rate-limits"
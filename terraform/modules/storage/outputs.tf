@@ -31,4 +31,29 @@ output "rate_limits_table_name" {
 output "rate_limits_table_arn" {
   description = "ARN of the DynamoDB rate limits table"
   value       = aws_dynamodb_table.rate_limits.arn
+}
+
+output "downloads_user_index_name" {
+  description = "Name of the downloads table index on user_id and created_at"
+  value       = "user-downloads-index"
+}
+
+output "cache_table_name" {
+  description = "Name of the DynamoDB download cache table"
+  value       = aws_dynamodb_table.download_cache.name
+}
+
+output "cache_table_arn" {
+  description = "ARN of the DynamoDB download cache table"
+  value       = aws_dynamodb_table.download_cache.arn
+}
+
+output "jobs_queue_url" {
+  description = "URL of the download jobs queue"
+  value       = aws_sqs_queue.jobs.url
+}
+
+output "jobs_queue_arn" {
+  description = "ARN of the download jobs queue"
+  value       = aws_sqs_queue.jobs.arn
 }
\ No newline at end of file
@@ -20,6 +20,18 @@ variable "dynamodb_billing_mode" {
   default     = "PAY_PER_REQUEST"
 }
 
+variable "job_visibility_timeout" {
+  description = "Seconds a claimed download job stays hidden from other workers"
+  type        = number
+  default     = 900
+}
+
+variable "job_max_attempts" {
+  description = "Attempts before a download job is moved to the dead letter queue"
+  type        = number
+  default     = 5
+}
+
 variable "tags" {
   description = "Resource tags"
   type        = map(string)
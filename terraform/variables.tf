@@ -80,4 +80,45 @@ variable "enable_api_logging" {
   description = "Enable API Gateway logging"
   type        = bool
   default     = true
-}
\ No newline at end of file
+}
+
+variable "transfer_connections" {
+  description = "Maximum parallel range connections per download"
+  type        = number
+  default     = 8
+
+  validation {
+    condition     = var.transfer_connections >= 1 && var.transfer_connections <= 32
+    error_message = "Transfer connections must be between 1 and 32."
+  }
+}
+
+variable "transfer_initial_connections" {
+  description = "Parallel range connections a download starts with before adapting"
+  type        = number
+  default     = 2
+}
+
+variable "transfer_fragment_concurrency" {
+  description = "Concurrent fragment downloads for DASH/HLS formats"
+  type        = number
+  default     = 4
+}
+
+variable "job_max_attempts" {
+  description = "Attempts before a download job is moved to the dead letter queue"
+  type        = number
+  default     = 5
+}
+
+variable "ffmpeg_layer_arn" {
+  description = "Lambda layer providing ffmpeg in /opt/bin, needed for clips (empty: none)"
+  type        = string
+  default     = ""
+}
+
+variable "rate_limit_tiers" {
+  description = "JSON overrides of the per-tier rate limits and quotas, e.g. {\"standard\": {\"daily_jobs\": 50}}"
+  type        = string
+  default     = ""
+}
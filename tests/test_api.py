@@ -1,6 +1,10 @@
+import time
+import asyncio
 import pytest
-from src.utils.downloader import YouTubeDownloader
+from functools import partial
+from src.utils.downloader import YouTubeDownloader, _video_cache_key
 from src.utils.errors import CustomException, ErrorCode
+from src.utils.rate_limit import QuotaCounter, RateLimiter
 from unittest.mock import MagicMock, patch
 
 @pytest.fixture
@@ -37,4 +41,407 @@ async def test_get_video_info_failure(mock_downloader):
 
 def test_format_selector(mock_downloader):
     assert mock_downloader._get_format_selector("720p", "mp4") == "best[height<=720]"
-    assert mock_downloader._get_format_selector("best", "mp3") == "bestaudio"
\ No newline at end of file
+    assert mock_downloader._get_format_selector("best", "mp3") == "bestaudio"
+
+@pytest.mark.asyncio
+async def test_download_reuses_extracted_info(mock_downloader):
+    info = {'id': 'test', 'title': 'Test Video', 'formats': []}
+    mock_downloader.downloads_table = MagicMock()
+
+    with patch('yt_dlp.YoutubeDL') as mock_ydl, patch('os.path.getsize', return_value=1024):
+        ydl = mock_ydl.return_value.__enter__.return_value
+        ydl.process_ie_result.return_value = {'requested_formats': [{}, {}]}
+
+        mock_downloader._download_to_s3(
+            "https://youtube.com/watch?v=test", "720p", "mp4", "test-download", info=info
+        )
+
+    ydl.extract_info.assert_not_called()
+    ydl.process_ie_result.assert_called_with(info, download=True)
+    # Stage timings go on the completed record
+    completed = mock_downloader.downloads_table.update_item.call_args.kwargs['ExpressionAttributeValues']
+    assert completed[':status'] == 'completed'
+    assert {'select_format_ms', 'download_ms', 'upload_ms', 'job_ms'} <= set(completed[':timings'])
+
+@pytest.mark.asyncio
+async def test_list_user_downloads_paginates_with_cursor(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    last_key = {'download_id': 'd2', 'user_id': 'test-user', 'created_at': '2024-01-01T00:00:00'}
+    mock_downloader.downloads_table.query.return_value = {
+        'Items': [{'download_id': 'd1'}, {'download_id': 'd2'}],
+        'LastEvaluatedKey': last_key
+    }
+
+    page = await mock_downloader.list_user_downloads("test-user", limit=2)
+
+    assert page['count'] == 2
+    assert page['has_more'] is True
+    query_args = mock_downloader.downloads_table.query.call_args.kwargs
+    assert query_args['IndexName'] == 'user-downloads-index'
+    assert query_args['ScanIndexForward'] is False
+
+    await mock_downloader.list_user_downloads("test-user", limit=2, cursor=page['next_cursor'])
+    assert mock_downloader.downloads_table.query.call_args.kwargs['ExclusiveStartKey'] == last_key
+
+    with pytest.raises(CustomException) as exc:
+        await mock_downloader.list_user_downloads("other-user", cursor=page['next_cursor'])
+    assert exc.value.error_code == ErrorCode.INVALID_REQUEST
+
+@pytest.mark.asyncio
+async def test_concurrent_status_requests_run_in_parallel(mock_downloader):
+    def slow_get_item(**kwargs):
+        time.sleep(0.2)
+        return {'Item': {'download_id': kwargs['Key']['download_id'], 'user_id': 'test-user'}}
+
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.get_item.side_effect = slow_get_item
+
+    started = time.monotonic()
+    results = await asyncio.gather(*[
+        mock_downloader.get_download_status(f"download-{i}", "test-user")
+        for i in range(8)
+    ])
+    elapsed = time.monotonic() - started
+
+    assert [r['download_id'] for r in results] == [f"download-{i}" for i in range(8)]
+    # Eight 200 ms calls run back to back would take 1.6 s
+    assert elapsed < 0.8
+
+@pytest.mark.asyncio
+async def test_create_batch_writes_records_and_fans_out(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.name = 'downloads'
+    mock_downloader.scheduler.transfer.submit = MagicMock()
+    urls = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(3)]
+
+    result = await mock_downloader.create_batch("test-user", video_urls=urls)
+
+    assert result['count'] == 3
+    writer = mock_downloader.downloads_table.batch_writer.return_value.__enter__.return_value
+    records = [c.kwargs['Item'] for c in writer.put_item.call_args_list]
+    assert len(records) == 4
+    assert records[-1]['record_type'] == 'batch'
+    assert all(r['batch_id'] == result['batch_id'] for r in records[:3])
+    assert records[0]['video_info']['video_id'] == 'video000000'
+    # Stored like a single download's info, without the formats
+    assert 'formats' not in records[0]['video_info']
+    assert mock_downloader.scheduler.transfer.submit.call_count == 3
+
+@pytest.mark.asyncio
+async def test_playlist_over_the_remaining_quota_is_refused(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.scheduler.transfer.submit = MagicMock()
+    quota = QuotaCounter(MagicMock())
+    quota.table.update_item.return_value = {'Attributes': {'jobs': 99, 'bytes': 0}}
+    limiter = RateLimiter(quota)
+    entries = [{'url': f"https://www.youtube.com/watch?v=video{i:06d}"} for i in range(5)]
+
+    with patch.object(mock_downloader, '_expand_playlist', return_value=entries):
+        with pytest.raises(CustomException) as exc:
+            await mock_downloader.create_batch(
+                "test-user",
+                playlist_url="https://www.youtube.com/playlist?list=PL1",
+                check_quota=partial(limiter.check_quota, "test-user", ['download'])
+            )
+
+    assert exc.value.error_code == ErrorCode.QUOTA_EXCEEDED
+    mock_downloader.downloads_table.batch_writer.assert_not_called()
+    mock_downloader.scheduler.transfer.submit.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_status_long_poll_returns_on_change(mock_downloader):
+    mock_downloader.status_poll_interval = 0.01
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.get_item.side_effect = [
+        {'Item': {'download_id': 'd1', 'user_id': 'test-user', 'status': 'downloading', 'version': 2}},
+        {'Item': {'download_id': 'd1', 'user_id': 'test-user', 'status': 'downloading', 'version': 2}},
+        {'Item': {'download_id': 'd1', 'user_id': 'test-user', 'status': 'downloading', 'version': 3}},
+    ]
+
+    status = await mock_downloader.get_download_status('d1', 'test-user', wait=5, since=2)
+
+    assert status['version'] == 3
+    assert mock_downloader.downloads_table.get_item.call_count == 3
+
+def test_resume_point_uses_parts_held_by_s3(mock_downloader):
+    part_size = mock_downloader.stream_part_size
+    size = 2 * part_size + 100
+    paginator = mock_downloader.s3_client.get_paginator.return_value
+    paginator.paginate.return_value = [{'Parts': [
+        {'PartNumber': 1, 'ETag': 'etag-1', 'Size': part_size},
+        {'PartNumber': 3, 'ETag': 'etag-3', 'Size': 100},
+    ]}]
+    checkpoint = {'upload_id': 'upload-123', 's3_key': 'key', 'total_size': size, 'part_size': part_size, 'parts': []}
+
+    upload_id, parts = mock_downloader._resume_point(checkpoint, 'key', size)
+
+    assert upload_id == 'upload-123'
+    assert [p['PartNumber'] for p in parts] == [1, 3]
+    # A different size means a different format: start over
+    assert mock_downloader._resume_point(checkpoint, 'key', size + 1) == (None, [])
+
+@pytest.mark.asyncio
+async def test_status_read_signs_download_url(mock_downloader):
+    mock_downloader.s3_client.generate_presigned_url.return_value = "https://signed.example/video.mp4"
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.get_item.side_effect = lambda **kwargs: {'Item': {
+        'download_id': 'd1',
+        'user_id': 'test-user',
+        'status': 'completed',
+        's3_key': 'downloads/d1/d1.mp4'
+    }}
+
+    first = await mock_downloader.get_download_status('d1', 'test-user')
+    second = await mock_downloader.get_download_status('d1', 'test-user')
+
+    assert first['download_url'] == second['download_url'] == "https://signed.example/video.mp4"
+    # Signed once per expiry bucket, not once per read
+    mock_downloader.s3_client.generate_presigned_url.assert_called_once()
+    assert mock_downloader.s3_client.generate_presigned_url.call_args.kwargs['ExpiresIn'] == mock_downloader.presign_expiry
+
+def test_plan_download_refuses_jobs_over_the_time_limit(mock_downloader):
+    mock_downloader.throughput = MagicMock()
+    mock_downloader.throughput.rate.return_value = 1024 * 1024
+    mock_downloader.job_time_limit = 300
+    video_info = {'duration': 600, 'formats': [
+        {'format_id': '22', 'ext': 'mp4', 'height': 720, 'video': True, 'audio': True,
+         'protocol': 'https', 'filesize': 100 * 1024 * 1024, 'tbr': None}
+    ]}
+
+    selected, estimated = mock_downloader._plan_download(video_info, '720p', 'mp4')
+    assert selected['format_id'] == '22'
+    assert estimated == pytest.approx(110, abs=1)
+
+    mock_downloader.throughput.rate.return_value = 256 * 1024
+    with pytest.raises(CustomException) as exc:
+        mock_downloader._plan_download(video_info, '720p', 'mp4')
+    assert exc.value.error_code == ErrorCode.VIDEO_TOO_LARGE
+
+@pytest.mark.asyncio
+async def test_cached_content_is_served_without_planning(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.content_cache = MagicMock()
+    mock_downloader.content_cache.cache_key.return_value = 'key'
+    mock_downloader.content_cache.lookup.return_value = {'s3_key': 'downloads/content/key.mp4'}
+    mock_downloader.job_time_limit = 1
+    video_info = {'video_id': 'abc', 'extractor': 'Youtube', 'duration': 7200, 'formats': []}
+
+    with patch.object(mock_downloader, '_extract_video_info', return_value=(video_info, None)), \
+            patch.object(mock_downloader, '_plan_download') as plan:
+        result = await mock_downloader.download_video("https://youtube.com/watch?v=abc", user_id="test-user")
+
+    # Too slow to download now, but already stored
+    assert result['status'] == 'completed'
+    plan.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_download_of_inflight_content_follows_the_leader(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.content_cache = MagicMock()
+    mock_downloader.content_cache.cache_key.return_value = 'key'
+    mock_downloader.content_cache.lookup.return_value = None
+    mock_downloader.inflight = MagicMock()
+    mock_downloader.inflight.join.return_value = 'leader'
+    mock_downloader.scheduler.transfer.submit = MagicMock()
+    video_info = {'video_id': 'abc', 'extractor': 'Youtube', 'duration': 60, 'formats': []}
+
+    with patch.object(mock_downloader, '_extract_video_info', return_value=(video_info, None)):
+        result = await mock_downloader.download_video("https://youtube.com/watch?v=abc", user_id="test-user")
+
+    assert result['status'] == 'queued'
+    mock_downloader.scheduler.transfer.submit.assert_not_called()
+    follower = mock_downloader.downloads_table.update_item.call_args.kwargs['ExpressionAttributeValues']
+    assert follower[':leader_id'] == 'leader'
+
+    # Until the leader hands over its outcome, reads show the leader's status
+    records = {
+        result['download_id']: {'download_id': result['download_id'], 'user_id': 'test-user',
+                                'status': 'queued', 'leader_id': 'leader', 'version': 1},
+        'leader': {'download_id': 'leader', 'user_id': 'other-user', 'status': 'completed',
+                   's3_key': 'downloads/content/key.mp4', 'version': 4}
+    }
+    mock_downloader.downloads_table.get_item.side_effect = lambda Key: {'Item': dict(records[Key['download_id']])}
+    mock_downloader.s3_client.generate_presigned_url.return_value = "https://signed.example/video.mp4"
+
+    status = await mock_downloader.get_download_status(result['download_id'], 'test-user')
+    assert status['status'] == 'completed'
+    assert status['download_url'] == "https://signed.example/video.mp4"
+
+def test_clip_downloads_only_its_segment(mock_downloader):
+    mock_downloader.ffmpeg_available = True
+    mock_downloader.throughput = MagicMock()
+    mock_downloader.throughput.rate.return_value = 1024 * 1024
+    video_info = {'duration': 7200, 'formats': [
+        {'format_id': '22', 'ext': 'mp4', 'height': 720, 'video': True, 'audio': True,
+         'protocol': 'https', 'filesize': 720 * 1024 * 1024, 'tbr': None}
+    ]}
+
+    clip = mock_downloader._resolve_clip(video_info, 60, 90)
+    assert clip == {'start': 60, 'end': 90}
+    # Whole-video "clips" share the full download
+    assert mock_downloader._resolve_clip(video_info, 0, 8000) is None
+    with pytest.raises(CustomException):
+        mock_downloader._resolve_clip(video_info, 7200, None)
+
+    _, full = mock_downloader._plan_download(video_info, '720p', 'mp4')
+    _, clipped = mock_downloader._plan_download(video_info, '720p', 'mp4', clip)
+    assert full > mock_downloader.estimate_overhead + 700
+    assert clipped <= mock_downloader.estimate_overhead + 4
+
+    mock_downloader.downloads_table = MagicMock()
+    info = {'id': 'test', 'title': 'Test Video', 'duration': 7200, 'formats': []}
+    with patch('yt_dlp.YoutubeDL') as mock_ydl, patch('os.path.getsize', return_value=1024):
+        ydl = mock_ydl.return_value.__enter__.return_value
+        ydl.process_ie_result.return_value = {'protocol': 'https', 'url': 'https://example.com/v.mp4'}
+        mock_downloader._download_to_s3(
+            "https://youtube.com/watch?v=test", "720p", "mp4", "clip-download", info=info, clip=clip
+        )
+
+    ydl_opts = mock_ydl.call_args.args[0]
+    assert ydl_opts['force_keyframes_at_cuts'] is False
+    assert list(ydl_opts['download_ranges']({}, ydl)) == [{'start_time': 60, 'end_time': 90}]
+    # Cut by ffmpeg through yt-dlp rather than streamed whole
+    ydl.process_ie_result.assert_called_with(info, download=True)
+
+def test_retried_job_extracts_again_and_is_not_failed_early(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.get_item.return_value = {
+        'Item': {'download_id': 'retried', 'status': 'queued', 'user_id': 'u1'}
+    }
+    mock_downloader._load_info = MagicMock(return_value={'id': 'test', 'formats': []})
+    job = {
+        'download_id': 'retried', 'video_url': "https://youtube.com/watch?v=test",
+        'quality': '720p', 'format_type': 'mp4', 'info_key': 'jobs/retried.json'
+    }
+
+    def last_status():
+        return mock_downloader.downloads_table.update_item.call_args.kwargs['ExpressionAttributeValues'][':status']
+
+    with patch('yt_dlp.YoutubeDL') as mock_ydl:
+        ydl = mock_ydl.return_value.__enter__.return_value
+        ydl.process_ie_result.side_effect = RuntimeError("HTTP Error 403")
+
+        with pytest.raises(RuntimeError):
+            mock_downloader.run_job(job, attempt=1)
+        mock_downloader._load_info.assert_called_once()
+        ydl.extract_info.assert_not_called()
+        assert last_status() == 'retrying'
+
+        # The stash may hold the URLs that just failed
+        with pytest.raises(RuntimeError):
+            mock_downloader.run_job(job, attempt=2)
+        mock_downloader._load_info.assert_called_once()
+        ydl.extract_info.assert_called_once()
+        assert last_status() == 'retrying'
+
+        with pytest.raises(RuntimeError):
+            mock_downloader.run_job(job, attempt=mock_downloader.job_max_attempts)
+        assert last_status() == 'failed'
+
+        # A redelivery after the final failure does not download again
+        mock_downloader.downloads_table.get_item.return_value = {
+            'Item': {'download_id': 'retried', 'status': 'failed', 'user_id': 'u1'}
+        }
+        assert mock_downloader.run_job(job, attempt=6)['status'] == 'failed'
+        assert ydl.process_ie_result.call_count == 3
+
+def test_followers_wait_for_the_leaders_final_attempt(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.get_item.return_value = {
+        'Item': {'download_id': 'leader', 'status': 'queued', 'user_id': 'u1'}
+    }
+    mock_downloader.content_cache = MagicMock()
+    mock_downloader.content_cache.lookup.return_value = None
+    mock_downloader.inflight = MagicMock()
+    mock_downloader.inflight.release.return_value = ['follower']
+    job = {
+        'download_id': 'leader', 'video_url': "https://youtube.com/watch?v=test",
+        'quality': '720p', 'format_type': 'mp4', 'cache_key': 'key'
+    }
+
+    with patch('yt_dlp.YoutubeDL') as mock_ydl:
+        mock_ydl.return_value.__enter__.return_value.process_ie_result.side_effect = RuntimeError("HTTP Error 403")
+        with pytest.raises(RuntimeError):
+            mock_downloader.run_job(job, attempt=1)
+        mock_downloader.inflight.renew.assert_called_with('key', 'leader')
+        mock_downloader.inflight.release.assert_not_called()
+
+        with pytest.raises(RuntimeError):
+            mock_downloader.run_job(job, attempt=mock_downloader.job_max_attempts)
+    mock_downloader.inflight.release.assert_called_once_with('key', 'leader')
+    assert mock_downloader.status_writer.flush(timeout=5)
+    follower = mock_downloader.downloads_table.update_item.call_args.kwargs
+    assert follower['Key'] == {'download_id': 'follower'}
+    assert follower['ExpressionAttributeValues'][':status'] == 'failed'
+
+@pytest.mark.asyncio
+async def test_batch_info_reports_failures_per_url(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.metadata_cache = MagicMock()
+    mock_downloader.info_concurrency = 2
+    # One summary and one failure already cached
+    cached_urls = {"https://youtube.com/watch?v=c": {'title': 'c', 'formats': [{'format_id': '18'}]},
+                   "https://example.com/gone": {'error': 'Video unavailable'}}
+    mock_downloader.metadata_cache.get_many.side_effect = lambda keys: {
+        _video_cache_key(url): entry for url, entry in cached_urls.items()
+    }
+    in_flight = []
+    peak = []
+
+    async def extract(video_url, user_id=None, priority='normal'):
+        in_flight.append(video_url)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(video_url)
+        if 'bad' in video_url:
+            raise CustomException(ErrorCode.INVALID_URL, "Failed to extract video information")
+        return {'title': video_url, 'formats': [{'format_id': '22'}]}, None
+
+    urls = ["https://youtube.com/watch?v=a", "https://example.com/bad", "https://youtube.com/watch?v=b",
+            "https://youtube.com/watch?v=a", "https://youtube.com/watch?v=c", "https://example.com/gone"]
+    with patch.object(mock_downloader, '_extract_video_info', side_effect=extract) as mock_extract:
+        result = await mock_downloader.get_video_infos(urls, user_id="test-user")
+
+    assert [r['status'] for r in result['results']] == ['ok', 'failed', 'ok', 'ok', 'ok', 'failed']
+    assert result['failed'] == 2
+    assert result['results'][1]['error'] == 'INVALID_URL'
+    assert result['results'][5]['error'] == 'INVALID_URL'
+    assert 'formats' not in result['results'][0]['video_info']
+    assert result['results'][4]['video_info'] == {'title': 'c'}
+    # Only misses are extracted: duplicates once, no more than info_concurrency at a time
+    assert mock_extract.call_count == 3
+    assert max(peak) == 2
+    mock_downloader.metadata_cache.get_many.assert_called_once()
+    mock_downloader.downloads_table.put_item.assert_not_called()
+    mock_downloader.downloads_table.update_item.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_bulk_status_reads_status_fields_in_one_batch(mock_downloader):
+    mock_downloader.downloads_table = MagicMock()
+    mock_downloader.downloads_table.name = 'downloads'
+    mock_downloader.dynamodb = MagicMock()
+    records = {
+        'd1': {'download_id': 'd1', 'user_id': 'test-user', 'status': 'downloading', 'version': 2},
+        'd2': {'download_id': 'd2', 'user_id': 'test-user', 'status': 'queued', 'leader_id': 'd9', 'version': 1},
+        'd3': {'download_id': 'd3', 'user_id': 'other-user', 'status': 'completed'},
+        'd9': {'download_id': 'd9', 'user_id': 'other-user', 'status': 'downloading', 'version': 5},
+    }
+
+    def batch_get_item(RequestItems):
+        request = RequestItems['downloads']
+        return {'Responses': {'downloads': [
+            records[key['download_id']] for key in request['Keys'] if key['download_id'] in records
+        ]}, 'UnprocessedKeys': {}}
+    mock_downloader.dynamodb.batch_get_item.side_effect = batch_get_item
+
+    result = await mock_downloader.get_download_statuses(['d1', 'd2', 'd3', 'missing', 'd1'], 'test-user')
+
+    assert [d['download_id'] for d in result['downloads']] == ['d1', 'd2']
+    assert result['not_found'] == ['d3', 'missing']
+    # The follower shows its leader's progress
+    assert result['downloads'][1]['status'] == 'downloading'
+    first = mock_downloader.dynamodb.batch_get_item.call_args_list[0].kwargs['RequestItems']['downloads']
+    assert len(first['Keys']) == 4
+    assert 'status' in first['ExpressionAttributeNames'].values()
+    assert 'video_info' not in first['ExpressionAttributeNames'].values()
+    assert mock_downloader.dynamodb.batch_get_item.call_count == 2
@@ -0,0 +1,39 @@
+import jwt
+import pytest
+from src.utils.auth import AuthManager
+from src.utils.errors import CustomException
+from unittest.mock import patch
+
+@pytest.fixture
+def auth():
+    return AuthManager()
+
+def test_verified_tokens_are_cached(auth):
+    token = auth.generate_token("user-1", "user@example.com")
+
+    with patch('src.utils.auth.jwt.decode', wraps=jwt.decode) as decode:
+        first = auth.verify_token(token)
+        second = auth.verify_token(token)
+
+    assert first is second
+    assert decode.call_count == 1
+    assert auth.cache_stats()['hits'] == 1
+
+def test_evicted_token_is_verified_again(auth):
+    token = auth.generate_token("user-1", "user@example.com")
+    auth.verify_token(token)
+
+    auth.evict_token(token)
+
+    assert auth.cache_stats()['size'] == 0
+    assert auth.verify_token(token).user_id == "user-1"
+
+def test_revoked_token_is_rejected(auth):
+    token = auth.generate_token("user-1", "user@example.com")
+    auth.verify_token(token)
+
+    auth.revoke_token(token)
+
+    with pytest.raises(CustomException):
+        auth.verify_token(token)
+    assert auth.cache_stats()['revoked'] == 1
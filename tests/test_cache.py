@@ -0,0 +1,104 @@
+import time
+import pytest
+from src.utils.cache import ContentCache, MetadataCache, TTLCache
+from unittest.mock import MagicMock
+
+@pytest.fixture
+def content_cache():
+    mock_dynamodb = MagicMock()
+    cache = ContentCache(mock_dynamodb, MagicMock(), "test-bucket")
+    cache.table.update_item.return_value = {'Attributes': {'refs': 1}}
+    return cache
+
+def test_content_cache_key(content_cache):
+    info = {'video_id': 'abc', 'extractor': 'Youtube'}
+    key = content_cache.cache_key(info, 'best[height<=720]', 'mp4')
+
+    assert key == content_cache.cache_key(dict(info), 'best[height<=720]', 'mp4')
+    assert key != content_cache.cache_key(info, 'best[height<=480]', 'mp4')
+    assert content_cache.cache_key({'title': 'No id'}, 'best', 'mp4') is None
+    assert content_cache.s3_key(key, 'mp4').startswith('downloads/content/')
+
+def test_content_cache_hit_takes_reference(content_cache):
+    content_cache.table.get_item.return_value = {'Item': {
+        's3_key': 'downloads/content/abc.mp4',
+        'expires_at': int(time.time()) + 5 * 24 * 3600
+    }}
+
+    item = content_cache.lookup('abc')
+
+    assert item['s3_key'] == 'downloads/content/abc.mp4'
+    content_cache.table.update_item.assert_called_once()
+
+def test_content_cache_skips_entries_near_expiry(content_cache):
+    content_cache.table.get_item.return_value = {'Item': {
+        's3_key': 'downloads/content/abc.mp4',
+        'expires_at': int(time.time()) + 60
+    }}
+
+    assert content_cache.lookup('abc') is None
+    content_cache.table.update_item.assert_not_called()
+
+def test_content_cache_refreshes_popular_entries_that_can_be_copied(content_cache):
+    content_cache.table.update_item.return_value = {'Attributes': {'refs': content_cache.refresh_min_refs}}
+    item = {
+        's3_key': 'downloads/content/abc.mp4',
+        'size_bytes': 100 * 1024 * 1024,
+        'expires_at': int(time.time()) + 36 * 3600
+    }
+    content_cache.table.get_item.return_value = {'Item': item}
+
+    assert content_cache.lookup('abc') is not None
+    content_cache.s3_client.copy_object.assert_called_once()
+
+    # Beyond what CopyObject can copy: left to expire
+    item['size_bytes'] = 6 * 1024 ** 3
+    assert content_cache.lookup('abc') is not None
+    content_cache.s3_client.copy_object.assert_called_once()
+
+def test_ttl_cache_lru_and_expiry():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    cache.set('d', 4, ttl=0)
+    assert cache.get('d') is None
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['hits'] == 2
+
+def test_metadata_cache_tiers():
+    cache = MetadataCache(MagicMock())
+    cache.table.get_item.return_value = {'Item': {
+        'video_info': {'title': 'Shared'},
+        'expires_at': int(time.time()) + 600
+    }}
+
+    assert cache.get('Youtube:abc') == {'title': 'Shared'}
+    assert cache.get('Youtube:abc') == {'title': 'Shared'}
+    assert cache.table.get_item.call_count == 1
+
+    cache.put_failure('Youtube:bad', 'Video unavailable')
+    assert cache.get('Youtube:bad') == {'error': 'Video unavailable'}
+    assert cache.stats()['shared']['hits'] == 1
+
+def test_metadata_cache_get_many_batches_shared_reads():
+    cache = MetadataCache(MagicMock())
+    cache.table.name = 'download-cache'
+    cache.local.set('local-key', {'title': 'Local'})
+    cache.dynamodb.batch_get_item.return_value = {'Responses': {'download-cache': [
+        {'cache_key': 'meta#shared-key', 'video_info': {'title': 'Shared'}, 'expires_at': int(time.time()) + 60},
+        {'cache_key': 'meta#stale-key', 'video_info': {'title': 'Stale'}, 'expires_at': int(time.time()) - 1}
+    ]}}
+
+    found = cache.get_many(['local-key', 'shared-key', 'stale-key', 'shared-key'])
+
+    assert found == {'local-key': {'title': 'Local'}, 'shared-key': {'title': 'Shared'}}
+    keys = cache.dynamodb.batch_get_item.call_args.kwargs['RequestItems']['download-cache']['Keys']
+    assert keys == [{'cache_key': 'meta#shared-key'}, {'cache_key': 'meta#stale-key'}]
+    # Later single lookups are served locally
+    assert cache.get('shared-key') == {'title': 'Shared'}
+    cache.table.get_item.assert_not_called()
@@ -0,0 +1,39 @@
+import pytest
+from src.utils.formats import ThroughputEstimator, compact_formats, estimate_size, select_format
+from unittest.mock import MagicMock
+
+FORMATS = compact_formats([
+    {'format_id': '18', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1', 'acodec': 'mp4a', 'protocol': 'https', 'filesize': 20_000_000},
+    {'format_id': '22', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1', 'acodec': 'mp4a', 'protocol': 'https', 'tbr': 1500.5},
+    {'format_id': '136', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1', 'acodec': 'none', 'protocol': 'https', 'filesize': 40_000_000},
+    {'format_id': '137', 'ext': 'mp4', 'height': 1080, 'vcodec': 'avc1', 'acodec': 'none', 'protocol': 'https'},
+    {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a', 'protocol': 'https', 'tbr': 128},
+    {'format_id': 'sb0', 'ext': 'mhtml', 'vcodec': 'none', 'acodec': 'none'}
+])
+
+def test_prefers_progressive_format_at_the_best_height():
+    assert [f['format_id'] for f in FORMATS] == ['18', '22', '136', '137', '140']
+    assert select_format(FORMATS, '720p', 'mp4', 600)['format_id'] == '22'
+    assert select_format(FORMATS, '360p', 'mp4', 600)['format_id'] == '18'
+    # 1080p only exists as separate streams; a 720p progressive file is not a substitute
+    assert select_format(FORMATS, '1080p', 'mp4', 600) is None
+    assert select_format(FORMATS, '720p', 'mp3', 600)['format_id'] == '140'
+
+def test_size_budget_excludes_large_formats():
+    # 1500 kbit/s for 600s is about 112 MB
+    assert estimate_size(FORMATS[1], 600) == 112_500_000
+    assert select_format(FORMATS, '720p', 'mp4', 600, max_bytes=100_000_000) is None
+    assert select_format(FORMATS, '360p', 'mp4', 600, max_bytes=100_000_000)['format_id'] == '18'
+
+def test_throughput_estimator_uses_measured_rate():
+    dynamodb = MagicMock()
+    table = dynamodb.Table.return_value
+    table.get_item.return_value = {}
+    estimator = ThroughputEstimator(dynamodb)
+    assert estimator.rate() == estimator.default_rate
+
+    estimator.observe(100 * 1024 * 1024, 10)
+    estimator.observe(50 * 1024 * 1024, 10)
+    # Smoothed towards the newer, slower transfer; published once per interval
+    assert 5 * 1024 * 1024 < estimator.rate() < 10 * 1024 * 1024
+    assert table.put_item.call_count == 1
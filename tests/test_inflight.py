@@ -0,0 +1,59 @@
+import pytest
+from botocore.exceptions import ClientError
+from src.utils.inflight import InflightDownloads
+from unittest.mock import MagicMock
+
+def conditional_failure(operation):
+    return ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, operation)
+
+@pytest.fixture
+def inflight():
+    return InflightDownloads(MagicMock())
+
+def test_first_download_leads(inflight):
+    assert inflight.join('key', 'd1') is None
+
+    inflight.table.update_item.assert_called_once()
+    acquire = inflight.table.update_item.call_args.kwargs
+    assert acquire['ExpressionAttributeValues'][':leader_id'] == 'd1'
+    # Taking over an expired lease keeps the followers waiting on it
+    assert 'followers' not in acquire['UpdateExpression']
+    inflight.table.put_item.assert_not_called()
+
+def test_later_downloads_follow_the_leader(inflight):
+    inflight.table.update_item.side_effect = [
+        conditional_failure('UpdateItem'),
+        {'Attributes': {'leader_id': 'd1', 'followers': {'d2'}}}
+    ]
+
+    assert inflight.join('key', 'd2') == 'd1'
+    assert inflight.table.update_item.call_args.kwargs['ExpressionAttributeValues'][':follower'] == {'d2'}
+
+def test_local_leader_is_joined_without_a_conditional_acquire(inflight):
+    inflight.join('key', 'd1')
+    inflight.table.update_item.return_value = {'Attributes': {'leader_id': 'd1'}}
+
+    assert inflight.join('key', 'd2') == 'd1'
+    assert inflight.table.update_item.call_count == 2
+    assert inflight.table.update_item.call_args.kwargs['UpdateExpression'] == 'ADD followers :follower'
+
+def test_leader_renews_its_lease(inflight):
+    assert inflight.renew('key', 'd1') is True
+    renewal = inflight.table.update_item.call_args.kwargs
+    assert renewal['ConditionExpression'] == 'leader_id = :leader_id'
+    assert renewal['ExpressionAttributeValues'][':leader_id'] == 'd1'
+
+    # Lost the lease to another download
+    inflight.table.update_item.side_effect = conditional_failure('UpdateItem')
+    assert inflight.renew('key', 'd1') is False
+
+def test_release_returns_followers(inflight):
+    inflight.join('key', 'd1')
+    inflight.table.delete_item.return_value = {'Attributes': {'leader_id': 'd1', 'followers': {'d3', 'd2'}}}
+
+    assert inflight.release('key', 'd1') == ['d2', 'd3']
+    assert inflight.table.delete_item.call_args.kwargs['ExpressionAttributeValues'] == {':leader_id': 'd1'}
+
+    # Not the leader (any more): nothing to hand over
+    inflight.table.delete_item.side_effect = conditional_failure('DeleteItem')
+    assert inflight.release('key', 'd1') == []
@@ -0,0 +1,58 @@
+import sqlite3
+import pytest
+from src.utils.job_queue import create_job_queue
+from src.worker import Worker
+from unittest.mock import MagicMock
+
+@pytest.fixture
+def job_queue(tmp_path):
+    return create_job_queue(f"sqlite:///{tmp_path}/jobs.db")
+
+def test_claimed_job_is_leased(job_queue):
+    job_queue.enqueue({'download_id': 'd1'})
+
+    job = job_queue.claim(lease_seconds=60)
+    assert job.payload == {'download_id': 'd1'}
+    assert job.attempts == 1
+    assert job_queue.claim(lease_seconds=60) is None
+
+    job_queue.release(job)
+    retried = job_queue.claim(lease_seconds=60)
+    assert retried.attempts == 2
+
+    job_queue.complete(retried)
+    job_queue.release(retried)
+    assert job_queue.claim(lease_seconds=60) is None
+
+def test_worker_completes_and_retries_jobs(job_queue):
+    downloader = MagicMock(job_max_attempts=5)
+    downloader.run_job.side_effect = [Exception("Transfer failed"), {'status': 'completed'}]
+    worker = Worker(downloader, job_queue, lease_seconds=60)
+    job_queue.enqueue({'download_id': 'd1'})
+
+    assert worker.run_once() is True
+    # Failed jobs come back after a backoff
+    assert worker.run_once() is False
+    with sqlite3.connect(job_queue.path) as conn:
+        conn.execute("UPDATE jobs SET lease_until = 0")
+
+    assert worker.run_once() is True
+    assert downloader.run_job.call_count == 2
+    assert job_queue.claim(lease_seconds=60) is None
+
+def test_worker_gives_up_after_the_last_attempt(job_queue):
+    downloader = MagicMock(job_max_attempts=3)
+    downloader.run_job.side_effect = Exception("Transfer failed")
+    worker = Worker(downloader, job_queue, lease_seconds=60)
+    job_queue.enqueue({'download_id': 'd1'})
+
+    for _ in range(5):
+        worker.run_once()
+        with sqlite3.connect(job_queue.path) as conn:
+            conn.execute("UPDATE jobs SET lease_until = 0")
+
+    assert downloader.run_job.call_count == 3
+    assert [c.kwargs['attempt'] for c in downloader.run_job.call_args_list] == [1, 2, 3]
+    assert job_queue.claim(lease_seconds=60) is None
+    with sqlite3.connect(job_queue.path) as conn:
+        assert conn.execute("SELECT attempts FROM dead_jobs").fetchall() == [(3,)]
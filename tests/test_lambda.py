@@ -1,6 +1,7 @@
 import pytest
-from unittest.mock import MagicMock, patch
-from src.lambda_function import app
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.lambda_function import app, parse_clip_time
+from src.utils.auth import TokenData
 from src.utils.errors import CustomException, ErrorCode
 from fastapi.testclient import TestClient
 
@@ -21,7 +22,10 @@ def test_download_endpoint_unauthorized():
     assert response.json()["error"] == "AUTH_FAILED"
 
 def test_download_endpoint_missing_url():
-    with patch('src.lambda_function.verify_token', return_value={"user_id": "test"}):
+    user = TokenData(user_id="test", email="test@example.com", permissions=["download"], expires_at=None)
+    with patch('src.lambda_function.verify_token', return_value=user), \
+            patch('src.lambda_function.get_rate_limiter', return_value=MagicMock(check_quota=AsyncMock())), \
+            patch('src.lambda_function.get_downloader') as get_downloader:
         response = client.post(
             "/download",
             json={},
@@ -29,6 +33,63 @@ def test_download_endpoint_missing_url():
         )
         assert response.status_code == 400
         assert response.json()["error"] == "INVALID_REQUEST"
+    # Rejected requests don't use up the quota
+    get_downloader.return_value.quota.add.assert_not_called()
+
+def test_download_quota_counts_accepted_jobs_only():
+    user = TokenData(user_id="test", email="test@example.com", permissions=["download"], expires_at=None)
+    downloader = MagicMock()
+    downloader.download_video = AsyncMock(side_effect=[
+        {'download_id': 'd1', 'status': 'completed'},
+        {'download_id': 'd2', 'status': 'queued'}
+    ])
+    with patch('src.lambda_function.verify_token', return_value=user), \
+            patch('src.lambda_function.get_rate_limiter', return_value=MagicMock(check_quota=AsyncMock())), \
+            patch('src.lambda_function.get_downloader', return_value=downloader):
+        for _ in range(2):
+            response = client.post(
+                "/download",
+                json={"url": "https://youtube.com/watch?v=dQw4w9WgXcQ"},
+                headers={"Authorization": "Bearer test"}
+            )
+            assert response.status_code == 200
+
+    # The cache hit is free, the queued job is counted
+    downloader.quota.add.assert_called_once_with("test", jobs=1)
+
+def test_parse_clip_time():
+    assert parse_clip_time(None, 'start') is None
+    assert parse_clip_time(90, 'start') == 90
+    assert parse_clip_time("1:02:03.5", 'start') == 3723
+    # End bounds round up so the clip covers what was asked for
+    assert parse_clip_time(12.2, 'end') == 13
+    for bad in ("abc", -5, True, "1:xx"):
+        # lambda_function raises its own import of the error types
+        with pytest.raises(Exception) as exc:
+            parse_clip_time(bad, 'start')
+        assert exc.value.error_code.value == "INVALID_REQUEST"
+
+def test_status_stream_reports_errors_as_events():
+    user = TokenData(user_id="test", email="test@example.com", permissions=["download"], expires_at=None)
+    downloader = MagicMock(status_max_wait=20)
+    downloader.get_download_status = AsyncMock(side_effect=[
+        {'download_id': 'd1', 'status': 'downloading', 'version': 3},
+        Exception("table unavailable")
+    ])
+    with patch('src.lambda_function.verify_token', return_value=user), \
+            patch('src.lambda_function.get_rate_limiter'), \
+            patch('src.lambda_function.get_downloader', return_value=downloader):
+        response = client.get(
+            "/downloads/d1/events",
+            headers={"Authorization": "Bearer test", "Last-Event-ID": "2"}
+        )
+
+    assert response.status_code == 200
+    assert "id: 3\nevent: status\n" in response.text
+    assert response.text.endswith('event: error\ndata: {"error":"INTERNAL_ERROR","message":"Failed to read download status"}\n\n')
+    # Resumed from the client's last event, within the long-poll limit
+    assert downloader.get_download_status.call_args.kwargs['since'] == 3
+    assert downloader.get_download_status.call_args.kwargs['wait'] <= 20
 
 @pytest.mark.asyncio
 async def test_custom_exception_handler():
@@ -45,4 +106,21 @@ async def test_custom_exception_handler():
             headers={"Authorization": "Bearer invalid"}
         )
         assert response.status_code == 400
-        assert response.json()["error"] == "INVALID_URL"
\ No newline at end of file
+        assert response.json()["error"] == "INVALID_URL"
+
+def test_import_does_not_load_yt_dlp_or_clients():
+    import os
+    import subprocess
+    import sys
+
+    src = os.path.join(os.path.dirname(__file__), '..', 'src')
+    code = (
+        "import sys, lambda_function;"
+        "assert 'yt_dlp' not in sys.modules;"
+        "assert lambda_function.downloader is None;"
+        "assert lambda_function.s3_client is None;"
+        "assert lambda_function.rate_limiter is None"
+    )
+    env = dict(os.environ, PYTHONPATH=src, JWT_SECRET_KEY='test', AWS_DEFAULT_REGION='us-east-1')
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,50 @@
+import json
+import pytest
+from src.utils.metrics import Metrics
+from unittest.mock import MagicMock
+
+def test_timer_records_outcome_bytes_and_job_timings():
+    metrics = Metrics()
+
+    with metrics.job({'extract_ms': 5}) as timings:
+        with metrics.timer('stream') as span:
+            span['bytes'] = 2048
+        with pytest.raises(ValueError):
+            with metrics.timer('upload'):
+                raise ValueError("boom")
+
+    assert timings['extract_ms'] == 5
+    assert {'stream_ms', 'upload_ms'} <= set(timings)
+    text = metrics.render_prometheus()
+    assert 'stage_duration_ms_count{outcome="ok",stage="stream"} 1' in text
+    assert 'stage_duration_ms_count{outcome="error",stage="upload"} 1' in text
+    assert 'stage_bytes_total{stage="stream"} 2048' in text
+
+def test_instrumented_calls_are_timed_under_the_component():
+    metrics = Metrics()
+    table = MagicMock()
+    table.get_item.return_value = {'Item': {}}
+    instrumented = metrics.instrument(table, 'dynamodb', ['get_item'])
+
+    with metrics.job() as timings:
+        assert instrumented.get_item(Key={'download_id': 'x'}) == {'Item': {}}
+    assert instrumented.name == table.name
+    assert 'dynamodb_ms' in timings
+    assert 'stage="dynamodb.get_item"' in metrics.render_prometheus()
+
+def test_flush_writes_emf_documents(monkeypatch, capsys):
+    monkeypatch.setenv('METRICS_EMF', 'true')
+    monkeypatch.setenv('METRICS_NAMESPACE', 'Test')
+    metrics = Metrics()
+    for _ in range(150):
+        metrics.observe('stage_duration_ms', 12.5, stage='extract', outcome='ok')
+
+    metrics.flush()
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(documents) == 2
+    directive = documents[0]['_aws']['CloudWatchMetrics'][0]
+    assert directive['Namespace'] == 'Test'
+    assert directive['Dimensions'] == [['outcome', 'stage']]
+    assert documents[0]['stage'] == 'extract'
+    assert len(documents[0]['stage_duration_ms']) == 100
+    assert len(documents[1]['stage_duration_ms']) == 50
@@ -0,0 +1,34 @@
+import pytest
+from src.utils.progress import ProgressReporter
+from unittest.mock import MagicMock
+
+def test_progress_updates_are_coalesced():
+    write = MagicMock()
+    reporter = ProgressReporter(write, interval=60)
+
+    for downloaded in range(0, 1000, 10):
+        reporter.hook({'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': 1000})
+
+    # First update goes out immediately, the rest wait for the interval
+    assert write.call_count == 1
+    reporter.flush()
+    assert write.call_count == 2
+    assert write.call_args.args[0]['progress']['downloaded_bytes'] == 990
+    assert write.call_args.args[0]['progress']['percent'] == 99
+
+def test_finished_hook_writes_immediately():
+    write = MagicMock()
+    reporter = ProgressReporter(write, interval=60)
+
+    reporter.hook({'status': 'downloading', 'downloaded_bytes': 10, 'total_bytes': 100})
+    reporter.hook({'status': 'finished', 'downloaded_bytes': 100, 'total_bytes': 100})
+
+    assert write.call_count == 2
+    assert write.call_args.args[0]['progress']['percent'] == 100
+
+def test_progress_write_errors_are_swallowed():
+    reporter = ProgressReporter(MagicMock(side_effect=RuntimeError("throttled")), interval=0)
+
+    reporter.update(10, 100)
+
+    assert reporter.writes == 0
@@ -0,0 +1,44 @@
+import pytest
+from src.utils.errors import CustomException, ErrorCode
+from src.utils.rate_limit import QuotaCounter, RateLimiter, TokenBucket, tier_for
+from unittest.mock import MagicMock
+
+@pytest.fixture
+def limiter():
+    quota = QuotaCounter(MagicMock())
+    quota.table.update_item.return_value = {'Attributes': {'jobs': 0, 'bytes': 0}}
+    return RateLimiter(quota)
+
+def test_token_bucket_absorbs_burst_then_refuses():
+    bucket = TokenBucket(rate=1.0, capacity=3)
+
+    assert [bucket.acquire()[0] for _ in range(4)] == [True, True, True, False]
+    assert 0 < bucket.acquire()[1] <= 1.0
+
+def test_rate_limit_depends_on_tier(limiter):
+    for _ in range(limiter.tiers['standard']['burst']):
+        limiter.check_rate('user-1', ['download'])
+
+    with pytest.raises(CustomException) as exc:
+        limiter.check_rate('user-1', ['download'])
+    assert exc.value.error_code == ErrorCode.RATE_LIMIT_EXCEEDED
+
+    # Admins are not limited
+    for _ in range(1000):
+        limiter.check_rate('admin-1', ['admin'])
+    assert tier_for(['premium', 'download']) == 'premium'
+
+@pytest.mark.asyncio
+async def test_quota_uses_shared_counter(limiter):
+    limiter.quota.table.update_item.return_value = {'Attributes': {'jobs': 99, 'bytes': 0}}
+
+    await limiter.check_quota('user-1', ['download'])
+    # Checking alone does not use up the quota
+    await limiter.check_quota('user-1', ['download'])
+    limiter.quota.add('user-1', jobs=1)
+    with pytest.raises(CustomException) as exc:
+        await limiter.check_quota('user-1', ['download'])
+
+    assert exc.value.error_code == ErrorCode.QUOTA_EXCEEDED
+    # The second check is answered locally, within the sync interval
+    assert limiter.quota.table.update_item.call_count == 1
@@ -0,0 +1,49 @@
+import json
+from decimal import Decimal
+from src.utils.responses import DownloadStatus, from_dynamodb, success
+
+def test_from_dynamodb_converts_decimals_and_sets():
+    item = {
+        'ttl': Decimal(1700000000),
+        'video_info': {'duration': Decimal(212), 'rating': Decimal('4.5')},
+        'followers': {'b', 'a'},
+        'progress': [Decimal(1), 'x']
+    }
+
+    converted = from_dynamodb(item)
+
+    assert converted == {
+        'ttl': 1700000000,
+        'video_info': {'duration': 212, 'rating': 4.5},
+        'followers': ['a', 'b'],
+        'progress': [1, 'x']
+    }
+    assert type(converted['ttl']) is int
+
+def test_download_status_keeps_client_fields_only():
+    status = DownloadStatus.from_item({
+        'download_id': 'd1',
+        'user_id': 'test-user',
+        'status': 'completed',
+        'ttl': 1700000000,
+        'checkpoint': None,
+        's3_key': 'downloads/d1/d1.mp4',
+        'download_url': 'https://signed.example/video.mp4',
+        'version': 3
+    })
+
+    assert status.to_dict() == {
+        'download_id': 'd1',
+        'status': 'completed',
+        'download_url': 'https://signed.example/video.mp4',
+        'version': 3
+    }
+
+def test_success_renders_models_without_jsonable_encoder():
+    response = success({'downloads': [DownloadStatus(download_id='d1', status='queued')], 'count': 1})
+
+    body = json.loads(response.body)
+    assert body['status'] == 'success'
+    assert body['data'] == {'downloads': [{'download_id': 'd1', 'status': 'queued'}], 'count': 1}
+    assert body['timestamp']
+    assert response.media_type == 'application/json'
@@ -0,0 +1,47 @@
+import threading
+from src.utils.scheduler import WorkPool, priority_for
+
+def test_pool_shares_slots_between_users():
+    pool = WorkPool('test', max_workers=1, per_user_limit=1)
+    gate = threading.Event()
+    order = []
+
+    first = pool.submit('heavy-user', 'normal', gate.wait)
+    futures = [pool.submit('heavy-user', 'normal', order.append, f"heavy-{i}") for i in range(5)]
+    futures.append(pool.submit('light-user', 'normal', order.append, 'light'))
+    gate.set()
+    for future in [first] + futures:
+        future.result(timeout=5)
+    pool.shutdown()
+
+    # The light user's single job is not stuck behind the heavy backlog
+    assert order.index('light') <= 1
+    stats = pool.stats()
+    assert stats['completed'] == 7
+    assert stats['max_queue_depth'] >= 6
+
+def test_pool_enforces_per_user_limit():
+    pool = WorkPool('test', max_workers=3, per_user_limit=1)
+    gate = threading.Event()
+    started = threading.Event()
+    running = pool.submit('user', 'normal', lambda: started.set() or gate.wait())
+    started.wait(timeout=5)
+    queued = pool.submit('user', 'normal', lambda: 'done')
+
+    assert queued.done() is False
+    assert pool.stats()['queue_depth'] == 1
+    gate.set()
+    assert queued.result(timeout=5) == 'done'
+    running.result(timeout=5)
+    pool.shutdown()
+
+def test_priority_for_permissions():
+    assert priority_for(['download', 'admin']) == 'high'
+    assert priority_for(['download', 'premium']) == 'elevated'
+    assert priority_for(['download']) == 'normal'
+
+def test_pool_passes_user_id_keyword_to_task():
+    pool = WorkPool('test', max_workers=1, per_user_limit=1)
+    future = pool.submit('user', 'normal', lambda url, user_id=None: (url, user_id), 'video', user_id='user')
+    assert future.result(timeout=5) == ('video', 'user')
+    pool.shutdown()
@@ -0,0 +1,106 @@
+import time
+import random
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from src.utils.downloader import YouTubeDownloader, TERMINAL_STATUSES
+from src.utils.metrics import Metrics
+from src.utils.status_writer import StatusWriter
+from unittest.mock import MagicMock, patch
+
+def throttled():
+    return ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'UpdateItem')
+
+def test_updates_to_a_busy_record_are_merged_in_order():
+    gate = threading.Event()
+    written = []
+
+    def write(download_id, updates):
+        gate.wait(5)
+        written.append(dict(updates))
+
+    writer = StatusWriter(write, workers=2)
+    first = writer.submit('job', {'status': 'downloading', 'progress': 1})
+    while not writer.stats()['in_flight']:
+        time.sleep(0.001)
+    writer.submit('job', {'progress': 2})
+    last = writer.submit('job', {'progress': 3, 'status': 'completed'})
+    gate.set()
+    last.result(timeout=5)
+    first.result(timeout=5)
+
+    assert written == [
+        {'status': 'downloading', 'progress': 1},
+        {'progress': 3, 'status': 'completed'}
+    ]
+    assert writer.stats()['merged'] == 1
+
+def test_writes_count_towards_the_submitters_job_timings():
+    metrics = Metrics()
+
+    def write(download_id, updates):
+        metrics.record('dynamodb', 5)
+
+    writer = StatusWriter(write)
+    with metrics.job() as timings:
+        writer.write_and_wait('job', {'status': 'downloading'}, timeout=5)
+    writer.write_and_wait('job', {'status': 'completed'}, timeout=5)
+
+    # Written on a writer thread, timed for the job that submitted it
+    assert timings == {'dynamodb_ms': 5}
+
+def test_throttled_writes_are_retried():
+    write = MagicMock(side_effect=[throttled(), throttled(), None])
+    writer = StatusWriter(write, base_delay=0.001)
+    writer.write_and_wait('job', {'status': 'completed'}, timeout=5)
+    assert write.call_count == 3
+    assert writer.stats()['retries'] == 2
+
+    write.side_effect = ClientError({'Error': {'Code': 'ValidationException'}}, 'UpdateItem')
+    with pytest.raises(ClientError):
+        writer.write_and_wait('job', {'status': 'completed'}, timeout=5)
+
+def test_every_job_reaches_a_terminal_state():
+    records = {}
+    lock = threading.Lock()
+
+    class FlakyTable:
+        def update_item(self, Key, ExpressionAttributeNames, ExpressionAttributeValues, **kwargs):
+            if random.random() < 0.3:
+                raise throttled()
+            with lock:
+                item = records.setdefault(Key['download_id'], {})
+                for placeholder, name in ExpressionAttributeNames.items():
+                    if name != 'version':
+                        item[name] = ExpressionAttributeValues[':' + placeholder[1:]]
+
+    downloader = YouTubeDownloader(MagicMock(), 'test-bucket')
+    downloader.downloads_table = FlakyTable()
+    downloader.throughput = MagicMock()
+    downloader.status_writer.base_delay = 0.001
+    downloader.status_writer.max_retries = 20
+    download_ids = [f"job-{i}" for i in range(40)]
+
+    def process(info, download):
+        if download and int(info['id'].split('-')[1]) % 3 == 0:
+            raise RuntimeError("extraction broke")
+        return {'requested_formats': [{}, {}], 'format_id': '137+140'}
+
+    def run(download_id):
+        try:
+            downloader._download_to_s3(
+                "https://youtube.com/watch?v=x", "720p", "mp4", download_id,
+                info={'id': download_id, 'formats': []}
+            )
+        except RuntimeError:
+            pass
+
+    with patch('yt_dlp.YoutubeDL') as mock_ydl, patch('os.path.getsize', return_value=1024):
+        mock_ydl.return_value.__enter__.return_value.process_ie_result.side_effect = process
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(run, download_ids))
+
+    assert downloader.status_writer.flush(timeout=10)
+    assert all(records[i]['status'] in TERMINAL_STATUSES for i in download_ids)
+    assert sum(records[i]['status'] == 'failed' for i in download_ids) == 14
@@ -0,0 +1,134 @@
+import pytest
+import urllib.error
+from src.utils.streaming import (
+    AdaptiveConcurrency, ParallelRangeTransfer, S3MultipartWriter, TransferInterrupted, MIN_PART_SIZE
+)
+from unittest.mock import MagicMock, patch
+
+@pytest.fixture
+def mock_s3():
+    s3 = MagicMock()
+    s3.create_multipart_upload.return_value = {'UploadId': 'upload-123'}
+    s3.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+    return s3
+
+def test_multipart_writer_uploads_parts(mock_s3):
+    with S3MultipartWriter(mock_s3, "test-bucket", "key", part_size=MIN_PART_SIZE) as writer:
+        for _ in range(11):
+            writer.write(b"x" * (1024 * 1024))
+
+    assert writer.bytes_written == 11 * 1024 * 1024
+    assert mock_s3.upload_part.call_count == 3
+    parts = mock_s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+    assert [p['PartNumber'] for p in parts] == [1, 2, 3]
+    mock_s3.abort_multipart_upload.assert_not_called()
+
+def test_multipart_writer_aborts_on_upload_error(mock_s3):
+    mock_s3.upload_part.side_effect = Exception("S3 unavailable")
+
+    with pytest.raises(Exception):
+        with S3MultipartWriter(mock_s3, "test-bucket", "key", part_size=MIN_PART_SIZE) as writer:
+            for _ in range(20):
+                writer.write(b"x" * (1024 * 1024))
+
+    mock_s3.complete_multipart_upload.assert_not_called()
+    mock_s3.abort_multipart_upload.assert_called_once()
+
+def test_parallel_transfer_maps_ranges_to_parts(mock_s3):
+    total = 2 * MIN_PART_SIZE + 10
+    transfer = ParallelRangeTransfer(
+        mock_s3, "test-bucket", "key", "http://example.com/video", total,
+        part_size=MIN_PART_SIZE, concurrency=AdaptiveConcurrency(initial=3)
+    )
+
+    with patch.object(transfer, '_fetch_range', side_effect=lambda start, end: b"x" * (end - start + 1)):
+        assert transfer.run() == total
+
+    sizes = {c.kwargs['PartNumber']: len(c.kwargs['Body']) for c in mock_s3.upload_part.call_args_list}
+    assert sizes == {1: MIN_PART_SIZE, 2: MIN_PART_SIZE, 3: 10}
+    parts = mock_s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+    assert [p['PartNumber'] for p in parts] == [1, 2, 3]
+
+def test_parallel_transfer_aborts_on_fetch_error(mock_s3):
+    transfer = ParallelRangeTransfer(
+        mock_s3, "test-bucket", "key", "http://example.com/video", 3 * MIN_PART_SIZE,
+        part_size=MIN_PART_SIZE
+    )
+
+    with patch.object(transfer, '_fetch_range', side_effect=IOError("connection reset")):
+        with pytest.raises(IOError):
+            transfer.run()
+
+    mock_s3.complete_multipart_upload.assert_not_called()
+    mock_s3.abort_multipart_upload.assert_called_once()
+
+def test_fetch_range_retries_dropped_connections(mock_s3):
+    transfer = ParallelRangeTransfer(
+        mock_s3, "test-bucket", "key", "http://example.com/video", MIN_PART_SIZE, max_retries=3
+    )
+    response = MagicMock()
+    response.__enter__.return_value.read.return_value = b"x" * 10
+    failures = [ConnectionResetError("reset by peer"), urllib.error.URLError(TimeoutError("timed out"))]
+
+    with patch('urllib.request.urlopen', side_effect=failures + [response]) as urlopen, \
+            patch('time.sleep') as sleep:
+        assert transfer._fetch_range(0, 9) == b"x" * 10
+    assert urlopen.call_count == 3
+    assert [c.args[0] for c in sleep.call_args_list] == [0.5, 1.0]
+
+    # Errors that would fail the same way again are not retried
+    with patch('urllib.request.urlopen', side_effect=urllib.error.URLError("unknown url type")) as urlopen:
+        with pytest.raises(urllib.error.URLError):
+            transfer._fetch_range(0, 9)
+    assert urlopen.call_count == 1
+
+def test_adaptive_concurrency_grows_and_backs_off():
+    concurrency = AdaptiveConcurrency(initial=2, maximum=8)
+    for _ in range(10):
+        concurrency.record(MIN_PART_SIZE, 1.0)
+    assert concurrency.limit > 2
+
+    grown = concurrency.limit
+    concurrency.throttle()
+    assert concurrency.limit == grown // 2
+
+    # A connection at a fraction of the best speed shrinks the window
+    before = concurrency.limit
+    concurrency.record(MIN_PART_SIZE, 10.0)
+    assert concurrency.limit == max(1, before - 1)
+
+def test_parallel_transfer_resumes_missing_parts(mock_s3):
+    transfer = ParallelRangeTransfer(
+        mock_s3, "test-bucket", "key", "http://example.com/video", 3 * MIN_PART_SIZE,
+        part_size=MIN_PART_SIZE, upload_id="upload-123",
+        completed_parts=[{'PartNumber': 1, 'ETag': 'etag-1'}, {'PartNumber': 3, 'ETag': 'etag-3'}]
+    )
+
+    with patch.object(transfer, '_fetch_range', side_effect=lambda start, end: b"x" * (end - start + 1)):
+        transfer.run()
+
+    mock_s3.create_multipart_upload.assert_not_called()
+    assert [c.kwargs['PartNumber'] for c in mock_s3.upload_part.call_args_list] == [2]
+    parts = mock_s3.complete_multipart_upload.call_args.kwargs['MultipartUpload']['Parts']
+    assert [p['PartNumber'] for p in parts] == [1, 2, 3]
+
+def test_parallel_transfer_stops_at_deadline(mock_s3):
+    checkpoints = []
+    transfer = ParallelRangeTransfer(
+        mock_s3, "test-bucket", "key", "http://example.com/video", 4 * MIN_PART_SIZE,
+        part_size=MIN_PART_SIZE, concurrency=AdaptiveConcurrency(initial=1, maximum=1),
+        deadline=float('inf'), abort_on_error=False
+    )
+
+    def fetch(start, end):
+        # Deadline passes while the first range is in flight
+        transfer.deadline = 0
+        return b"x" * (end - start + 1)
+
+    with patch.object(transfer, '_fetch_range', side_effect=fetch):
+        with pytest.raises(TransferInterrupted):
+            transfer.run(on_part=lambda parts: checkpoints.append(list(parts)))
+
+    assert checkpoints == [[{'PartNumber': 1, 'ETag': 'etag-1'}]]
+    mock_s3.complete_multipart_upload.assert_not_called()
+    mock_s3.abort_multipart_upload.assert_not_called()